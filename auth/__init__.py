@@ -1,54 +1,117 @@
+import os
+import threading
 from logging import Logger
-from typing import Callable, Optional
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Optional, Tuple
 
 from slack_bolt.authorization import AuthorizeResult
 from slack_bolt.middleware import RequestVerification
 from slack_bolt.request import BoltRequest
 from slack_bolt.response import BoltResponse
+from utils import metrics
 from utils.loader import read_yaml
 
+if TYPE_CHECKING:
+    # the async stack pulls in aiohttp, keep it out of the sync cold start
+    from slack_bolt.request.async_request import AsyncBoltRequest
+
 SECRET_PATH = "/secrets/SECRETS"
 
+# process-wide installation registry: {(enterprise_id, team_id): installation}
+_registry: Dict[Tuple[Optional[str], str], dict] = {}
+_registry_stat: Optional[Tuple[str, int, int, int]] = None  # (path, st_ino, st_mtime_ns, st_size)
+_registry_lock = threading.Lock()
+
+
+def load_installations(path: str) -> Dict[Tuple[Optional[str], str], dict]:
+    """
+    load installations from the secrets file and index them
+
+    Args:
+        path (str): path of the secrets file
+
+    Returns:
+        (dict): installations keyed by (enterprise_id, team_id)
+            - enterprise_id is None if the team doesn't have enterprise_id
+    """
+    secrets = read_yaml(path) or {}
+    installations = secrets.get("INSTALLATIONS") or []
+    return {(team.get("enterprise_id"), team["team_id"]): team for team in installations if team.get("team_id")}
+
+
+def get_registry() -> Dict[Tuple[Optional[str], str], dict]:
+    """
+    get the installation registry, reload it only if the secrets file has been changed
+
+    Returns:
+        (dict): installations keyed by (enterprise_id, team_id)
+    """
+    global _registry, _registry_stat
+
+    path = SECRET_PATH
+    st = os.stat(path)
+    stat = (path, st.st_ino, st.st_mtime_ns, st.st_size)
+    metrics.cache_lookup("installations", stat == _registry_stat)
+    if stat == _registry_stat:
+        return _registry
+
+    with _registry_lock:
+        if stat != _registry_stat:
+            _registry = load_installations(path)
+            _registry_stat = stat
+    return _registry
+
+
+def get_installation(enterprise_id: Optional[str], team_id: Optional[str]) -> Optional[dict]:
+    """
+    get the installation of the team
+
+    Args:
+        enterprise_id (str): enterprise id of the request
+        team_id (str): team id of the request
+
+    Returns:
+        (dict): installation of the team (None if not found)
+    """
+    registry = get_registry()
+    # enterprise_id doesn't exist for some teams
+    return registry.get((enterprise_id, team_id)) or registry.get((None, team_id))
+
 
 def authorize(enterprise_id: str, team_id: str, logger: Logger) -> AuthorizeResult:
-    secrets = read_yaml(SECRET_PATH)
-    installations = secrets.get("INSTALLATIONS")
-    for team in installations:
-        # enterprise_id doesn't exist for some teams
-        is_valid_enterprise = (
-            True
-            if "enterprise_id" not in team or enterprise_id == team["enterprise_id"]
-            else False
+    if team := get_installation(enterprise_id, team_id):
+        # Return an instance of AuthorizeResult
+        # If you don't store bot_id and bot_user_id, could also call `from_auth_test_response` with your bot_token to automatically fetch them
+        return AuthorizeResult(
+            enterprise_id=enterprise_id,
+            team_id=team_id,
+            bot_token=team.get("bot_token"),
+            bot_user_id=team.get("bot_user_id"),
         )
-        if is_valid_enterprise and (team["team_id"] == team_id):
-            # Return an instance of AuthorizeResult
-            # If you don't store bot_id and bot_user_id, could also call `from_auth_test_response` with your bot_token to automatically fetch them
-            return AuthorizeResult(
-                enterprise_id=enterprise_id,
-                team_id=team_id,
-                bot_token=team.get("bot_token"),
-                bot_user_id=team.get("bot_user_id"),
-            )
 
     logger.error("No authorization information was found")
 
 
 def verify(req: BoltRequest, resp: BoltResponse, next: Callable[[], BoltResponse], logger: Optional[Logger] = None) -> BoltResponse:  # type: ignore
-    enterprise_id = req.context.enterprise_id
-    team_id = req.context.team_id
-    secrets = read_yaml(SECRET_PATH)
-    installations = secrets.get("INSTALLATIONS")
-    for team in installations:
-        # enterprise_id doesn't exist for some teams
-        is_valid_enterprise = (
-            True
-            if "enterprise_id" not in team or enterprise_id == team["enterprise_id"]
-            else False
-        )
-        if is_valid_enterprise and (team["team_id"] == team_id):
-            # Return an instance of BoltResponse
-            return RequestVerification(
-                signing_secret=team.get("signing_secret"), base_logger=logger
-            ).process(req=req, resp=resp, next=next)
+    if team := get_installation(req.context.enterprise_id, req.context.team_id):
+        # Return an instance of BoltResponse
+        return RequestVerification(
+            signing_secret=team.get("signing_secret"), base_logger=logger
+        ).process(req=req, resp=resp, next=next)
+
+    logger.error("No verification information was found")
+
+
+async def async_authorize(enterprise_id: str, team_id: str, logger: Logger) -> AuthorizeResult:
+    return authorize(enterprise_id, team_id, logger)
+
+
+async def async_verify(req: "AsyncBoltRequest", resp: BoltResponse, next: Callable[[], Awaitable[BoltResponse]], logger: Optional[Logger] = None) -> BoltResponse:  # type: ignore
+    from slack_bolt.middleware.request_verification.async_request_verification import AsyncRequestVerification
+
+    if team := get_installation(req.context.enterprise_id, req.context.team_id):
+        # Return an instance of BoltResponse
+        return await AsyncRequestVerification(
+            signing_secret=team.get("signing_secret"), base_logger=logger
+        ).async_process(req=req, resp=resp, next=next)
 
     logger.error("No verification information was found")
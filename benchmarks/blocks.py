@@ -0,0 +1,86 @@
+"""Render time of the Block Kit messages
+
+Compares building the messages from `utils.models` objects and serializing
+them (what `say`/`chat_update` do) with filling the `utils.blocks` templates.
+
+    python -m benchmarks.blocks [repeat]
+"""
+import sys
+import timeit
+
+import utils.blocks as b
+import utils.models as m
+
+MEMBERS = [f"U{i:010d}" for i in range(10)]
+LINK = "https://accounts.google.com/AccountChooser?hd=g.skku.edu&continue=https://g.co/meet/echo-devs"
+TEXT = "회의록 공유합니다 " * 20
+
+
+def serialize(objects: list) -> list:
+    return [o.to_dict() for o in objects]
+
+
+def model_rand() -> list:
+    text = "".join(f"{i + 1}. <@{user}>\n" for i, user in enumerate(MEMBERS))
+    return serialize(
+        [
+            m.Section(text=m.mrkdwn(text=text)),
+            m.Divider(),
+            m.Context(elements=[m.mrkdwn(text="<@U0000000001>님이 `/shuffle`를 실행하였습니다.")]),
+        ]
+    )
+
+
+def model_meet() -> list:
+    return serialize(
+        [
+            m.Actions(elements=[m.button(text=m.plain_text(text="Google Meet 참여하기"), url=LINK, action_id="join_meet")]),
+            m.Divider(),
+            m.Context(elements=[m.mrkdwn(text="<@U0000000001>님이 `/meet`를 실행하였습니다.")]),
+        ]
+    )
+
+
+def model_edit() -> list:
+    return serialize(
+        [
+            m.Input(
+                block_id="edit_message",
+                element=m.plain_text_input(
+                    action_id="input",
+                    multiline=True,
+                    placeholder=m.plain_text(text="메시지 편집"),
+                    initial_value=TEXT,
+                    focus_on_load=True,
+                ),
+                label=m.plain_text(text="메시지 편집"),
+            ),
+            m.Actions(
+                elements=[
+                    m.button(text=m.plain_text(text=":x: 취소", emoji=True), action_id="cancel_edit", style="danger"),
+                    m.button(text=m.plain_text(text=":heavy_check_mark: 저장", emoji=True), action_id="save_edit", style="primary"),
+                ]
+            ),
+        ]
+    )
+
+
+def model_attachments() -> list:
+    return serialize([m.block_attachment(color="#d0d0d0", blocks=[m.Section(text=m.mrkdwn(text=TEXT))])])
+
+
+CASES = {
+    "rand": (model_rand, lambda: b.rand_blocks(MEMBERS, "U0000000001", "/shuffle")),
+    "meet": (model_meet, lambda: b.meet_blocks(LINK, "U0000000001", "/meet")),
+    "edit": (model_edit, lambda: b.edit_blocks(TEXT)),
+    "attachments": (model_attachments, lambda: b.text_attachments(TEXT)),
+}
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for name, (model, template) in CASES.items():
+        assert model() == template(), name
+        before = min(timeit.repeat(model, number=repeat, repeat=5)) / repeat * 1e6
+        after = min(timeit.repeat(template, number=repeat, repeat=5)) / repeat * 1e6
+        print(f"{name:12s} models {before:8.2f} us, templates {after:8.2f} us ({before / after:5.1f}x)")
@@ -0,0 +1,56 @@
+"""Selection cost of `/choices` by channel size
+
+Compares collecting every member of the channel (then choosing with
+`random.choices`, as before) with streaming the `conversations.members` pages
+through `utils.sampling.Reservoir`, on the paginated fake WebClient.
+
+    python -m benchmarks.choices [k]
+"""
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+from benchmarks.fixtures import FakeWebClient
+from utils import members
+from utils.sampling import Reservoir
+
+SIZES = (100, 1_000, 10_000, 50_000)
+BOTS = {"U0BOT000000"}
+
+
+def collect(client: FakeWebClient, k: int) -> list:
+    population = [user for page in members.iter_member_pages(client, "C0123456789") for user in page if user not in BOTS]
+    counter = Counter(population)
+    return random.choices(tuple(counter.keys()), weights=counter.values(), k=k)
+
+
+def stream(client: FakeWebClient, k: int) -> list:
+    reservoir: Reservoir[str] = Reservoir(k)
+    for page in members.iter_member_pages(client, "C0123456789"):
+        reservoir.extend([user for user in page if user not in BOTS])
+    return reservoir.sample()
+
+
+def measure(func, client: FakeWebClient, k: int, repeat: int = 20):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(client, k)
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func(client, k)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(samples) * 1000, peak / 1024
+
+
+if __name__ == "__main__":
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    # the pages are held by the fake client, only the selection is measured
+    for size in SIZES:
+        client = FakeWebClient(token="xoxb-benchmark", members=[f"U{i:010d}" for i in range(size)] + list(BOTS))
+        for name, func in (("collect", collect), ("reservoir", stream)):
+            ms, kib = measure(func, client, k)
+            print(f"{size:6d} members {name:9s} {ms:8.3f} ms, peak {kib:8.1f} KiB")
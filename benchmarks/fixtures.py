@@ -0,0 +1,208 @@
+"""Request payloads and in-process Slack stand-ins for the benchmarks
+
+The payloads follow the shapes documented in the `get_values` docstrings of
+`listeners.commands`, `listeners.actions` and `listeners.shortcuts.message_shortcut`.
+
+- `FakeWebClient`: records every Web API call and answers from canned responses
+- `FakeRespond`: records every message sent to the response_url
+- `seed_config`: serves the config file from the `utils.loader` cache, no GitHub request
+"""
+import json
+import math
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
+
+from slack_sdk import WebClient
+from slack_sdk.web import SlackResponse
+
+import utils.loader
+
+TEAM_ID = "T0123456789"
+ENTERPRISE_ID = "E0123456789"
+API_APP_ID = "A0123456789"
+CHANNEL_ID = "C0123456789"
+CHANNEL_NAME = "echo_devs_weekly-sync"
+USER_ID = "U0123456789"
+USER_NAME = "gildong.hong"
+BOT_USER_ID = "U0BOT000000"
+MESSAGE_TS = "1700000000.000100"
+RESPONSE_URL = "https://hooks.slack.com/commands/T0123456789/1234567890123/abcdefghijklmnopqrstuvwx"
+
+# other channels and users mentioned in the payloads
+CHANNEL_IDS = [f"C0{i:09d}" for i in range(1, 4)]
+USER_IDS = [f"U0{i:09d}" for i in range(1, 40)]
+
+
+def command(name: str, text: str = "") -> Dict[str, str]:
+    """
+    payload of the slash command
+    """
+    return {
+        "token": "abcdefghijklmnopqrstuvwx",
+        "team_id": TEAM_ID,
+        "team_domain": "echo-devs",
+        "enterprise_id": ENTERPRISE_ID,
+        "enterprise_name": "Echo",
+        "channel_id": CHANNEL_ID,
+        "channel_name": CHANNEL_NAME,
+        "user_id": USER_ID,
+        "user_name": USER_NAME,
+        "command": name,
+        "text": text,
+        "api_app_id": API_APP_ID,
+        "is_enterprise_install": "false",
+        "response_url": RESPONSE_URL,
+        "trigger_id": "1234567890123.1234567890123.0123456789abcdef0123456789abcdef",
+    }
+
+
+def echo_message(text: str) -> Dict[str, Any]:
+    """
+    message sent by `/echo`, as attached to the shortcuts and actions
+    """
+    return {
+        "type": "message",
+        "subtype": "bot_message",
+        "text": text,
+        "ts": MESSAGE_TS,
+        "bot_id": "B0123456789",
+        "app_id": API_APP_ID,
+        "team": TEAM_ID,
+        "metadata": {"event_type": "echo", "event_payload": {"context": f"/echo {text}", "text": text}},
+    }
+
+
+def _interaction(type: str, text: str) -> Dict[str, Any]:
+    return {
+        "type": type,
+        "token": "abcdefghijklmnopqrstuvwx",
+        "api_app_id": API_APP_ID,
+        "team": {"id": TEAM_ID, "domain": "echo-devs", "enterprise_id": ENTERPRISE_ID},
+        "enterprise": None,
+        "is_enterprise_install": False,
+        "user": {"id": USER_ID, "name": USER_NAME, "username": USER_NAME, "team_id": TEAM_ID},
+        "channel": {"id": CHANNEL_ID, "name": CHANNEL_NAME},
+        "message": echo_message(text),
+        "response_url": RESPONSE_URL,
+        "trigger_id": "1234567890123.1234567890123.0123456789abcdef0123456789abcdef",
+    }
+
+
+def shortcut(callback_id: str, text: str) -> Dict[str, Any]:
+    """
+    payload of the message shortcut on a message sent by `/echo`
+    """
+    payload = _interaction("message_action", text)
+    payload.update(callback_id=callback_id, message_ts=MESSAGE_TS, action_ts="1700000001.000200")
+    return payload
+
+
+def block_action(action_id: str, text: str, value: Optional[str] = None) -> Dict[str, Any]:
+    """
+    payload of the button on a message sent by `/echo` (or `/meet`)
+    """
+    payload = _interaction("block_actions", text)
+    payload.update(
+        container={"type": "message", "channel_id": CHANNEL_ID, "message_ts": MESSAGE_TS, "is_ephemeral": False},
+        actions=[
+            {
+                "type": "button",
+                "action_id": action_id,
+                "block_id": "actions",
+                "action_ts": "1700000001.000200",
+                "text": {"type": "plain_text", "text": action_id},
+            }
+        ],
+        state={"values": {"edit_message": {"input": {"type": "plain_text_input", "value": value}}}} if value else {"values": {}},
+    )
+    return payload
+
+
+def encode(payload: Dict[str, Any]) -> str:
+    """
+    raw body of the request, as sent by Slack
+    """
+    if "command" in payload:
+        return urlencode(payload)
+    return urlencode({"payload": json.dumps(payload)})
+
+
+def seed_config(path: str, data: Any) -> None:
+    """
+    serve the config file from the `utils.loader` cache, it never goes stale
+    """
+    for parser in ("_parse_yaml", "_parse_json"):
+        utils.loader._cache[(path, parser)] = {"data": data, "etag": "", "fetched_at": math.inf, "refreshing": False}
+
+
+class FakeWebClient(WebClient):
+    """
+    WebClient answering from canned responses, records every call in `calls`
+
+        client = FakeWebClient(token="xoxb-...")
+        client.chat_postMessage(channel="C0123456789", text="hi")
+        client.calls  # [("chat.postMessage", {...})]
+    """
+
+    def __init__(self, *args, members: Optional[List[str]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.members = members if members is not None else [USER_ID, BOT_USER_ID, *USER_IDS]
+        self.calls: List[tuple] = []
+
+    def __deepcopy__(self, memo: dict) -> "FakeWebClient":
+        # keep recording into the same client from the lazy listeners
+        return self
+
+    def api_call(self, api_method: str, *, http_verb: str = "POST", files=None, data=None, params=None, json=None, headers=None, auth=None) -> SlackResponse:
+        args = {**(params or {}), **(data or {}), **(json or {})}
+        self.calls.append((api_method, args))
+        return SlackResponse(
+            client=self,
+            http_verb=http_verb,
+            api_url=self.base_url + api_method,
+            req_args={},
+            data=self.response(api_method, args),
+            headers={},
+            status_code=200,
+        ).validate()
+
+    def response(self, api_method: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        if api_method == "chat.postMessage":
+            return {"ok": True, "channel": args.get("channel"), "ts": f"{time.time():.6f}", "message": {"text": args.get("text", "")}}
+        if api_method == "chat.update":
+            return {"ok": True, "channel": args.get("channel"), "ts": args.get("ts"), "text": args.get("text", "")}
+        if api_method == "conversations.members":
+            # the cursor is the offset of the next page
+            start, limit = int(args.get("cursor") or 0), int(args.get("limit") or 100)
+            next_cursor = str(start + limit) if start + limit < len(self.members) else ""
+            return {"ok": True, "members": self.members[start : start + limit], "response_metadata": {"next_cursor": next_cursor}}
+        if api_method == "users.list":
+            start, limit = int(args.get("cursor") or 0), int(args.get("limit") or 100)
+            next_cursor = str(start + limit) if start + limit < len(self.members) else ""
+            users = [self.user(user_id) for user_id in self.members[start : start + limit]]
+            return {"ok": True, "members": users, "response_metadata": {"next_cursor": next_cursor}}
+        if api_method == "conversations.open":
+            users = str(args.get("users", "")).split(",")
+            return {"ok": True, "channel": {"id": f"D{users[0][1:]}" if len(users) == 1 else f"G{len(users)}{users[0][1:]}"}}
+        if api_method == "users.info":
+            return {"ok": True, "user": self.user(args.get("user"))}
+        return {"ok": True}
+
+    def user(self, user_id: str) -> Dict[str, Any]:
+        return {"id": user_id, "team_id": TEAM_ID, "name": user_id.lower(), "deleted": False, "is_bot": user_id == BOT_USER_ID}
+
+
+class FakeRespond:
+    """
+    `respond` recording every message sent to the response_url in `messages`
+    """
+
+    def __init__(self):
+        self.messages: List[dict] = []
+
+    def __deepcopy__(self, memo: dict) -> "FakeRespond":
+        return self
+
+    def __call__(self, text: str = "", **kwargs) -> None:
+        self.messages.append({"text": text, **{k: v for k, v in kwargs.items() if v is not None}})
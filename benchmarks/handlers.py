@@ -0,0 +1,193 @@
+"""In-process latency of the listeners
+
+Replays the payloads of `benchmarks.fixtures` through an app wired by
+`listeners.listen(app)`, with the lazy listeners run synchronously, a fake
+WebClient and respond, and the config served from the loader cache. Reports
+for each handler the p50/p99 latency of the whole request (ack and lazy
+listeners), the peak memory allocated per request and the Slack calls issued.
+
+    python -m benchmarks.handlers [--repeat N] [--output FILE] [--baseline FILE] [--tolerance RATIO]
+
+With `--baseline`, exits with status 1 if the p50 of any handler is slower than
+the baseline (saved by `--output`) by more than the tolerance.
+
+The caches (channel members, config) are warm after the first request, as on a
+warm instance. `/>` is not replayed, it runs a shell command. `/send` only
+enqueues its deliveries (`utils.jobs`), the queue has no workers here.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from slack_bolt import App, BoltRequest
+from slack_bolt.authorization import AuthorizeResult
+
+import listeners
+import listeners.commands
+from benchmarks import fixtures as f
+from utils import jobs, messages
+from utils.lazy import SyncLazyListenerRunner
+from utils.messages import index_messages
+
+CHANNELS = " ".join(f"<#{channel}>" for channel in f.CHANNEL_IDS)
+USERS = " ".join(f"<@{user}>" for user in f.USER_IDS[:3])
+TEXT = "이번 주 회의는 목요일 오후 3시에 진행합니다. 자료는 미리 확인 부탁드립니다."
+
+CASES: Dict[str, Dict[str, Any]] = {
+    "echo": f.command("/echo", TEXT),
+    "echo (mentions)": f.command("/echo", f"{TEXT} {CHANNELS}"),
+    "anonymous": f.command("/anonymous", TEXT),
+    "disguise": f.command("/disguise", f":smile: 홍길동 {TEXT}"),
+    "echo (help)": f.command("/echo"),
+    "echo (purge)": f.command("/echo", "purge 1d"),
+    "send": f.command("/send", f"{CHANNELS} {TEXT}"),
+    "shuffle": f.command("/shuffle"),
+    "choices": f.command("/choices", "3"),
+    "meet": f.command("/meet"),
+    "meet (users)": f.command("/meet", USERS),
+    "meet (8 users)": f.command("/meet", " ".join(f"<@{user}>" for user in f.USER_IDS[:8])),
+    "delete_message": f.shortcut("delete_message", TEXT),
+    "edit_message": f.shortcut("edit_message", TEXT),
+    "save_edit": f.block_action("save_edit", TEXT, value=f"{TEXT} (수정됨)"),
+    "cancel_edit": f.block_action("cancel_edit", TEXT),
+    "join_meet": f.block_action("join_meet", TEXT),
+}
+
+
+def authorize(enterprise_id: str, team_id: str, logger: logging.Logger) -> AuthorizeResult:
+    return AuthorizeResult(enterprise_id=enterprise_id, team_id=team_id, bot_token="xoxb-benchmark", bot_user_id=f.BOT_USER_ID)
+
+
+def create_app(client: f.FakeWebClient, respond: f.FakeRespond, process_before_response: bool = True) -> App:
+    """
+    create the app with the listeners, talking to the fakes instead of Slack
+
+    With `process_before_response`, the lazy listeners run before the response
+    is returned, else in the thread pool of the app (as on Socket Mode).
+    """
+    app = App(process_before_response=process_before_response, authorize=authorize, request_verification_enabled=False)
+
+    def fake_slack(context, next):
+        context["client"] = client
+        context["respond"] = respond
+        context.pop("say", None)  # built from the client of the authorization
+        next()
+
+    app.middleware(fake_slack)
+    app.middleware(index_messages)
+    listeners.listen(app)
+    if process_before_response:
+        app.listener_runner.lazy_listener_runner = SyncLazyListenerRunner(app.logger)
+    return app
+
+
+def build_request(raw_body: str) -> Callable[[], BoltRequest]:
+    headers = {"content-type": ["application/x-www-form-urlencoded"]}
+    return lambda: BoltRequest(body=raw_body, headers=headers)
+
+
+def percentile(samples: List[float], q: float) -> float:
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1] if len(samples) > 1 else samples[0]
+
+
+def run(name: str, payload: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    client, respond = f.FakeWebClient(token="xoxb-benchmark"), f.FakeRespond()
+    app = create_app(client, respond)
+    request = build_request(f.encode(payload))
+
+    # warm up the caches and check that the handler has been matched
+    response = app.dispatch(request())
+    if response.status != 200:
+        raise RuntimeError(f"{name}: {response.status} {response.body}")
+    del client.calls[:], respond.messages[:]
+
+    samples = []
+    for _ in range(repeat):
+        req = request()
+        start = time.perf_counter()
+        app.dispatch(req)
+        samples.append(time.perf_counter() - start)
+    calls = [method for method, _ in client.calls]
+    responses = len(respond.messages)
+
+    # allocations are measured apart, tracemalloc slows every allocation down
+    peaks = []
+    tracemalloc.start()
+    for _ in range(min(repeat, 50)):
+        req = request()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        app.dispatch(req)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - base)
+    tracemalloc.stop()
+
+    return {
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "peak_kib": statistics.mean(peaks) / 1024,
+        "web_api": {method: calls.count(method) / repeat for method in dict.fromkeys(calls)},
+        "response_url": responses / repeat,
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[Tuple[str, float, float]]:
+    """
+    get the handlers slower than the baseline by more than the tolerance
+
+    Returns:
+        (list): [(handler, baseline p50, p50), ...]
+    """
+    return [
+        (name, baseline[name]["p50_ms"], result["p50_ms"])
+        for name, result in results.items()
+        if name in baseline and result["p50_ms"] > baseline[name]["p50_ms"] * (1 + tolerance)
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200, help="number of requests per handler")
+    parser.add_argument("--output", help="save the results as json")
+    parser.add_argument("--baseline", help="fail if slower than the results saved in this file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p50 regression over the baseline")
+    args = parser.parse_args()
+
+    with open("config.yaml") as file:
+        import yaml
+
+        f.seed_config(listeners.commands.YAML_FILE, yaml.safe_load(file))
+    # time the enqueue of /send, not the deliveries
+    directory = tempfile.mkdtemp()
+    jobs._pool = jobs.WorkerPool(jobs.JobQueue(os.path.join(directory, "jobs.sqlite3")), workers=0)
+    messages._index = messages.MessageIndex(os.path.join(directory, "messages.sqlite3"))
+
+    results = {}
+    print(f"{'handler':16s} {'p50 ms':>8s} {'p99 ms':>8s} {'peak KiB':>9s} {'respond':>8s}  web api calls")
+    for name, payload in CASES.items():
+        result = results[name] = run(name, payload, args.repeat)
+        calls = ", ".join(f"{method} x{count:g}" for method, count in result["web_api"].items())
+        print(f"{name:16s} {result['p50_ms']:8.3f} {result['p99_ms']:8.3f} {result['peak_kib']:9.1f} {result['response_url']:8g}  {calls}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for name, before, after in regressions:
+            print(f"regression: {name} p50 {before:.3f} ms -> {after:.3f} ms")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
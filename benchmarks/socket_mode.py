@@ -0,0 +1,88 @@
+"""Ack latency of the listeners over Socket Mode
+
+Connects the app of `benchmarks.handlers` (fake WebClient and respond) with
+`main_socket.connect` to a local `benchmarks.socket_mode_stub.SocketModeStub`, sends
+the payloads of `benchmarks.handlers.CASES` as envelopes and reports for each
+handler the p50/p99 latency from the envelope to its ack on the socket. The
+lazy listeners keep running in the thread pool of the app after the ack.
+
+A burst of envelopes is then sent at once to measure the acks per second of
+the dispatcher.
+
+    python -m benchmarks.socket_mode [--repeat N] [--connections N] [--concurrency N] [--burst N]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import yaml
+from slack_sdk import WebClient
+
+import listeners.commands
+import main_socket
+from benchmarks import fixtures as f
+from benchmarks.handlers import CASES, create_app, percentile
+from benchmarks.socket_mode_stub import SocketModeStub
+from utils import jobs, messages
+
+
+def get_type(payload: Dict[str, Any]) -> str:
+    return "slash_commands" if "command" in payload else "interactive"
+
+
+def measure(stub: SocketModeStub, payload: Dict[str, Any], repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        envelope_id = stub.send(get_type(payload), payload)
+        if stub.wait_for_ack(envelope_id) is None:
+            raise RuntimeError(f"no ack for {envelope_id}")
+        samples.append(stub.acked_at[envelope_id] - stub.sent_at[envelope_id])
+    return samples
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=100, help="number of envelopes per handler")
+    parser.add_argument("--connections", type=int, default=2, help="number of connections (app tokens)")
+    parser.add_argument("--concurrency", type=int, default=main_socket.CONCURRENCY, help="threads per connection")
+    parser.add_argument("--burst", type=int, default=1000, help="number of envelopes sent at once")
+    args = parser.parse_args()
+
+    with open("config.yaml") as file:
+        f.seed_config(listeners.commands.YAML_FILE, yaml.safe_load(file))
+    directory = tempfile.mkdtemp()
+    jobs._pool = jobs.WorkerPool(jobs.JobQueue(os.path.join(directory, "jobs.sqlite3")), workers=0)
+    messages._index = messages.MessageIndex(os.path.join(directory, "messages.sqlite3"))
+
+    client, respond = f.FakeWebClient(token="xoxb-benchmark"), f.FakeRespond()
+    app = create_app(client, respond, process_before_response=False)
+    with SocketModeStub() as stub:
+        tokens = [f"xapp-benchmark-{i}" for i in range(args.connections)]
+        handlers = main_socket.connect(app, tokens, args.concurrency, web_client=WebClient(base_url=stub.api_url))
+        stub.wait_for_connections(len(tokens))
+
+        print(f"{'handler':16s} {'ack p50 ms':>10s} {'ack p99 ms':>10s}")
+        for name, payload in CASES.items():
+            measure(stub, payload, 3)  # warm up the caches
+            samples = measure(stub, payload, args.repeat)
+            print(f"{name:16s} {percentile(samples, 50) * 1000:10.3f} {percentile(samples, 99) * 1000:10.3f}")
+
+        payload = CASES["echo"]
+        started_at = time.perf_counter()
+        envelope_ids = [stub.send(get_type(payload), payload) for _ in range(args.burst)]
+        acked = [stub.wait_for_ack(envelope_id) is not None for envelope_id in envelope_ids]
+        elapsed = time.perf_counter() - started_at
+        latencies = [stub.acked_at[envelope_id] - stub.sent_at[envelope_id] for envelope_id in envelope_ids if envelope_id in stub.acked_at]
+        print(f"burst: {sum(acked)}/{args.burst} acks in {elapsed:.2f} s ({sum(acked) / elapsed:.0f}/s), p50 {statistics.median(latencies) * 1000:.1f} ms")
+
+        for handler in handlers:
+            handler.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
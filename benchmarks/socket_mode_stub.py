@@ -0,0 +1,190 @@
+"""Local stand-in for Slack's Socket Mode endpoints (for tests and benchmarks)
+
+`SocketModeStub` serves `apps.connections.open` and the WebSocket it points
+to, on 127.0.0.1. Envelopes are sent to the connected clients in turn (as
+Slack spreads them over the connections of an app), and their acks are
+recorded by envelope_id.
+
+    with SocketModeStub() as stub:
+        handler = SocketModeHandler(app, "xapp-test", web_client=WebClient(base_url=stub.api_url))
+        handler.connect()
+        stub.wait_for_connections(1)
+        envelope_id = stub.send("slash_commands", payload)
+        stub.wait_for_ack(envelope_id, timeout=3)  # {"envelope_id": ..., "payload": {...}}
+"""
+import base64
+import hashlib
+import itertools
+import json
+import socket
+import struct
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OPCODE_TEXT, OPCODE_CLOSE, OPCODE_PING, OPCODE_PONG = 0x1, 0x8, 0x9, 0xA
+
+
+def build_frame(opcode: int, payload: bytes) -> bytes:
+    """
+    build an unmasked frame (server to client)
+    """
+    header = bytes([0x80 | opcode])
+    if len(payload) <= 125:
+        header += bytes([len(payload)])
+    elif len(payload) <= 0xFFFF:
+        header += struct.pack("!BH", 126, len(payload))
+    else:
+        header += struct.pack("!BQ", 127, len(payload))
+    return header + payload
+
+
+def read_frame(sock: socket.socket) -> Optional[tuple]:
+    """
+    read a masked frame (client to server)
+
+    Returns:
+        (tuple): (opcode, payload), None once the connection is closed
+    """
+
+    def read(size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            if not (chunk := sock.recv(size - len(data))):
+                raise ConnectionError("closed")
+            data += chunk
+        return data
+
+    try:
+        b1, b2 = read(2)
+        length = b2 & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", read(2))
+        elif length == 127:
+            (length,) = struct.unpack("!Q", read(8))
+        mask = read(4) if b2 & 0x80 else b"\0\0\0\0"
+        payload = bytes(byte ^ key for byte, key in zip(read(length), itertools.cycle(mask)))
+    except (ConnectionError, OSError, ValueError):
+        return None
+    return b1 & 0x0F, payload
+
+
+class SocketModeStub:
+    """
+    local Socket Mode server, records the acks in `acks` ({envelope_id: ack})
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.acks: Dict[str, Dict[str, Any]] = {}
+        self.sent_at: Dict[str, float] = {}
+        self.acked_at: Dict[str, float] = {}
+        self.connections: List[socket.socket] = []
+        self.lock = threading.Condition()
+        self.next_connection = itertools.count()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                # apps.connections.open
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                body = json.dumps({"ok": True, "url": f"ws://{host}:{stub.port}/link/?ticket={uuid.uuid4()}"}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                key = self.headers.get("Sec-WebSocket-Key", "")
+                accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+                self.send_response(101, "Switching Protocols")
+                self.send_header("Upgrade", "websocket")
+                self.send_header("Connection", "Upgrade")
+                self.send_header("Sec-WebSocket-Accept", accept)
+                self.end_headers()
+                self.wfile.flush()
+                stub.serve(self.connection)
+                self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.api_url = f"http://{host}:{self.port}/api/"
+
+    def serve(self, sock: socket.socket) -> None:
+        """
+        say hello to the client, then answer its pings and record its acks until it disconnects
+        """
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        hello = {"type": "hello", "num_connections": len(self.connections) + 1, "debug_info": {"host": "stub"}}
+        sock.sendall(build_frame(OPCODE_TEXT, json.dumps(hello).encode()))
+        with self.lock:
+            self.connections.append(sock)
+            self.lock.notify_all()
+        try:
+            while (frame := read_frame(sock)) is not None:
+                opcode, payload = frame
+                if opcode == OPCODE_PING:
+                    sock.sendall(build_frame(OPCODE_PONG, payload))
+                elif opcode == OPCODE_CLOSE:
+                    sock.sendall(build_frame(OPCODE_CLOSE, payload[:2]))
+                    break
+                elif opcode == OPCODE_TEXT:
+                    ack = json.loads(payload)
+                    with self.lock:
+                        self.acks[ack["envelope_id"]] = ack
+                        self.acked_at[ack["envelope_id"]] = time.perf_counter()
+                        self.lock.notify_all()
+        finally:
+            with self.lock:
+                self.connections.remove(sock)
+
+    def send(self, type: str, payload: Dict[str, Any], accepts_response_payload: bool = True) -> str:
+        """
+        send an envelope to the next connection
+
+        Args:
+            type (str): `slash_commands`, `interactive` or `events_api`
+            payload (dict): payload of the envelope (body of the request)
+            accepts_response_payload (bool): the ack may carry a response
+
+        Returns:
+            (str): envelope_id
+        """
+        envelope_id = str(uuid.uuid4())
+        envelope = {"envelope_id": envelope_id, "type": type, "payload": payload, "accepts_response_payload": accepts_response_payload}
+        with self.lock:
+            sock = self.connections[next(self.next_connection) % len(self.connections)]
+            self.sent_at[envelope_id] = time.perf_counter()
+        sock.sendall(build_frame(OPCODE_TEXT, json.dumps(envelope).encode()))
+        return envelope_id
+
+    def wait_for_connections(self, count: int, timeout: float = 10) -> bool:
+        with self.lock:
+            return self.lock.wait_for(lambda: len(self.connections) >= count, timeout)
+
+    def wait_for_ack(self, envelope_id: str, timeout: float = 10) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            self.lock.wait_for(lambda: envelope_id in self.acks, timeout)
+            return self.acks.get(envelope_id)
+
+    def __enter__(self) -> "SocketModeStub":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for sock in list(self.connections):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,75 @@
+"""Cold-start import time and peak memory
+
+Runs each target in a fresh interpreter with `-X importtime` and tracemalloc
+and reports the total import time, the slowest imports and the peak memory.
+
+    python -m benchmarks.startup [--budget-ms MS] [--top N]
+
+Exits with status 1 if a target exceeds the import time budget.
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+TARGETS = {
+    "import main": "import main",
+    "first invocation": "import main; main.get_handler()",
+    "import listeners": "import listeners",
+}
+
+PROBE = """
+import json, sys, time, tracemalloc
+preloaded = list(sys.modules)
+tracemalloc.start()
+start = time.perf_counter()
+exec({code!r})
+elapsed = time.perf_counter() - start
+_, peak = tracemalloc.get_traced_memory()
+sys.stdout.write(json.dumps({{"elapsed_ms": elapsed * 1000, "peak_kib": peak / 1024, "preloaded": preloaded}}))
+"""
+
+
+def run(code: str) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(code=code)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        imports.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))
+    result = json.loads(proc.stdout)
+    preloaded = set(result.pop("preloaded"))
+    # imports done by the interpreter and the probe itself are not part of the target
+    imports = [i for i in imports if i[0].strip() not in preloaded]
+    # top-level imports (no indentation) add up to the total import time
+    result["import_ms"] = sum(cumulative for name, _, cumulative in imports if not name.startswith(" ")) / 1000
+    result["imports"] = imports
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail if the import time exceeds this budget")
+    parser.add_argument("--top", type=int, default=10, help="number of the slowest imports to show")
+    args = parser.parse_args()
+
+    status = 0
+    for label, code in TARGETS.items():
+        result = run(code)
+        print(f"{label}: {result['elapsed_ms']:.1f} ms wall, {result['import_ms']:.1f} ms imports, peak {result['peak_kib']:.0f} KiB")
+        for name, self_us, cumulative_us in sorted(result["imports"], key=lambda i: -i[1])[: args.top]:
+            print(f"  {self_us / 1000:8.2f} ms self {cumulative_us / 1000:8.2f} ms cumulative  {name.strip()}")
+        if args.budget_ms is not None and result["import_ms"] > args.budget_ms:
+            print(f"  over budget ({args.budget_ms:.1f} ms)")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Entity extraction on long messages
+
+Compares the previous extraction (four uncompiled `re.findall` scans, plus
+the `re.sub` patterns built from user input on `/disguise`) with the
+single-pass `utils.text.tokenize`.
+
+    python -m benchmarks.text [repeat]
+"""
+import re
+import sys
+import timeit
+
+from utils.text import cut, get_channels, get_emojis, get_urls, get_users, tokenize
+
+CHUNK = "회의록 공유합니다 <#C0123456789|general> <@U0123456789> :memo: 자세한 내용은 <https://example.com/docs|문서> 참고 "
+
+
+def findall(text: str) -> tuple:
+    return (
+        re.findall(r"[C|G][A-Z0-9]{10}", text),
+        re.findall(r"U[A-Z0-9]{10}", text),
+        re.findall(r":[^\s]+:", text),
+        re.findall(r"<https?://[^\s]+>", text),
+    )
+
+
+def single_pass(text: str) -> tuple:
+    tokens = tokenize(text)
+    return (
+        get_channels(text, tokens),
+        get_users(text, tokens),
+        get_emojis(text, tokens),
+        get_urls(text, tokens),
+    )
+
+
+def disguise_before(text: str) -> tuple:
+    findall(text)  # get_values
+    url, *_ = re.findall(r"<https?://[^\s]+>", text) or ("",)
+    text = re.sub(re.escape(url) + r"\s+", "", text) if url else text
+    emoji, *_ = (None,) if url else (re.findall(r":[^\s]+:", text) or (":bust_in_silhouette:",))
+    text = re.sub(emoji + r"\s+", "", text, 1) if emoji else text
+    username, *_ = text.split()
+    text = re.sub(username + r"\s+", "", text, 1)
+    return username, text, re.findall(r"[C|G][A-Z0-9]{10}", text)
+
+
+def disguise_after(text: str) -> tuple:
+    tokens = tokenize(text)  # get_values
+    get_channels(text, tokens), get_users(text, tokens), get_emojis(text, tokens), get_urls(text, tokens)
+    url = next((t for t in tokens if t.kind == "url"), None)
+    emoji = None if url else next((t for t in tokens if t.kind == "emoji"), None)
+    if profile := url or emoji:
+        text = cut(text, profile)
+    username, text = text.split(None, 1)
+    return username, text, get_channels(text, tokens)
+
+
+def measure(func, text: str, repeat: int) -> float:
+    return min(timeit.repeat(lambda: func(text), number=repeat, repeat=5)) / repeat * 1e6
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    for size in (1, 10, 100):
+        text = CHUNK * size
+        disguise = ":ghost: 유령 " + text
+        print(
+            f"{len(text):6d} chars:"
+            f" extract {measure(findall, text, repeat):8.1f} -> {measure(single_pass, text, repeat):8.1f} us,"
+            f" /disguise {measure(disguise_before, disguise, repeat):8.1f} -> {measure(disguise_after, disguise, repeat):8.1f} us"
+        )
@@ -0,0 +1,43 @@
+"""Per-invocation overhead of the Cloud Function entry point
+
+Compares building the app on every invocation (cold path) with reusing the
+module-level handler (warm path). Requests are Slack `ssl_check` pings so
+that no network or secrets are needed.
+
+    python -m benchmarks.warm_start [invocations]
+"""
+import sys
+import time
+
+from flask import Flask
+from slack_bolt.adapter.flask import SlackRequestHandler
+
+import main
+
+BODY = "ssl_check=1&token=xxx"
+
+
+def invoke(flask_app: Flask, handle) -> None:
+    with flask_app.test_request_context(
+        "/", method="POST", data=BODY, content_type="application/x-www-form-urlencoded"
+    ) as ctx:
+        handle(ctx.request)
+
+
+def measure(flask_app: Flask, handle, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        invoke(flask_app, handle)
+    return (time.perf_counter() - start) / n * 1000
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    flask_app = Flask(__name__)
+
+    cold = measure(flask_app, lambda request: SlackRequestHandler(main.create_app()).handle(request), n)
+    warm = measure(flask_app, main.echo_bot, n)
+
+    print(f"invocations: {n}")
+    print(f"rebuild per invocation: {cold:.3f} ms")
+    print(f"reuse warm handler    : {warm:.3f} ms")
@@ -0,0 +1,38 @@
+"""gunicorn settings of `main_wsgi`
+
+    gunicorn "main_wsgi:create_wsgi_app()"
+
+The workers are preforked from a master holding the app and its caches
+(`preload_app`), each serves WSGI_THREADS requests at once (gthread). On
+SIGTERM (or SIGHUP/USR2 for a reload) the workers finish their requests,
+then drain the lazy listeners and the `/send` jobs within `graceful_timeout`.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 3000)}"
+workers = int(os.environ.get("WSGI_WORKERS", multiprocessing.cpu_count()))
+threads = int(os.environ.get("WSGI_THREADS", 8))
+worker_class = "gthread"
+preload_app = True
+# Slack waits 3 seconds for the ack, the listeners run after the response
+timeout = 30
+graceful_timeout = int(os.environ.get("WSGI_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+# recycle the workers to bound the growth of their copied pages
+max_requests = int(os.environ.get("WSGI_MAX_REQUESTS", 10000))
+max_requests_jitter = max_requests // 10
+accesslog = None
+
+
+def post_fork(server, worker):
+    import main_wsgi
+
+    main_wsgi.post_fork()
+
+
+def worker_exit(server, worker):
+    import main_wsgi
+
+    # leave a second to exit before the master kills the worker
+    main_wsgi.drain(max(graceful_timeout - 1, 0))
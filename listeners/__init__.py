@@ -1,4 +1,4 @@
-from . import actions, commands
+from . import actions, commands, events
 from .shortcuts import message_shortcut
 
 
@@ -7,22 +7,34 @@ def is_echo(shortcut):
     return event_type == "echo"
 
 
+def acknowledge(ack):
+    """
+    acknowledge the request right away, the work is done by the lazy listeners
+    """
+    ack()
+
+
 def listen(app):
     # commands
-    app.command("/echo")(commands.echo)
-    app.command("/anonymous")(commands.echo)
-    app.command("/disguise")(commands.echo)
-    app.command("/>")(commands.echo)
-    app.command("/send")(commands.send)
-    app.command("/shuffle")(commands.rand)
-    app.command("/choices")(commands.rand)
-    app.command("/meet")(commands.meet)
+    # ack first, then run the slow work (Slack/GitHub I/O) in lazy listeners
+    app.command("/echo")(ack=acknowledge, lazy=[commands.echo])
+    app.command("/anonymous")(ack=acknowledge, lazy=[commands.echo])
+    app.command("/disguise")(ack=acknowledge, lazy=[commands.echo])
+    app.command("/>")(ack=acknowledge, lazy=[commands.echo])
+    app.command("/send")(ack=commands.ack_send, lazy=[commands.send])
+    app.command("/shuffle")(ack=acknowledge, lazy=[commands.rand])
+    app.command("/choices")(ack=acknowledge, lazy=[commands.rand])
+    app.command("/meet")(ack=acknowledge, lazy=[commands.meet])
 
     # shortcuts
-    app.shortcut("delete_message", [is_echo])(message_shortcut.delete_message)
-    app.shortcut("edit_message", [is_echo])(message_shortcut.edit_message)
+    app.shortcut("delete_message", [is_echo])(ack=acknowledge, lazy=[message_shortcut.delete_message])
+    app.shortcut("edit_message", [is_echo])(ack=acknowledge, lazy=[message_shortcut.edit_message])
 
     # actions
-    app.action("save_edit")(actions.save_edit)
-    app.action("cancel_edit")(actions.cancel_edit)
+    app.action("save_edit")(ack=acknowledge, lazy=[actions.save_edit])
+    app.action("cancel_edit")(ack=acknowledge, lazy=[actions.cancel_edit])
     app.action("join_meet")(actions.join_meet)
+
+    # events
+    app.event("member_joined_channel")(events.member_joined_channel)
+    app.event("member_left_channel")(events.member_left_channel)
@@ -1,8 +1,7 @@
-import logging
 from typing import Any, Dict, Iterable
 
 import slack_sdk
-import utils.models as m
+import utils.blocks as b
 from slack_bolt import Ack, Respond
 
 
@@ -94,34 +93,29 @@ def get_values(body: Dict[str, Any], values: Iterable[Any]) -> Any:
 
 def cancel_edit(
     body: Dict[str, Any],
-    logger: logging.Logger,
-    ack: Ack,
     respond: Respond,
 ):
     """
     cancel editing message which is sent by the bot
-    """
-    logger.info(body)
 
+    lazy listener, the request is acknowledged by `listeners.acknowledge`
+    """
     metadata = body["message"]["metadata"]
     text = metadata["event_payload"].get("text")
 
-    ack()
-    respond(blocks=[m.Section(text=m.mrkdwn(text=text))])
+    respond(blocks=[b.section(text)])
 
 
 def save_edit(
     body: Dict[str, Any],
-    logger: logging.Logger,
     client: slack_sdk.web.client.WebClient,
-    ack: Ack,
     respond: Respond,
 ):
     """
     save editing message which is sent by the bot
-    """
-    logger.info(body)
 
+    lazy listener, the request is acknowledged by `listeners.acknowledge`
+    """
     channel, message, state = get_values(body, ["channel", "message", "state"])
     channel_id = channel.get("id")
     message_ts = message.get("ts")
@@ -135,12 +129,11 @@ def save_edit(
     else:
         text = metadata["event_payload"].get("text")
 
-    ack()
     if text:
         client.chat_update(
             channel=channel_id,
             ts=message_ts,
-            blocks=[m.Section(text=m.mrkdwn(text=text))],
+            blocks=[b.section(text)],
             metadata=metadata,
         )
     else:
@@ -148,13 +141,10 @@ def save_edit(
 
 
 def join_meet(
-    body: Dict[str, Any],
-    logger: logging.Logger,
     client: slack_sdk.web.client.WebClient,
     ack: Ack,
 ):
     """
     join_meet action for `/meet` command
     """
-    logger.info(body)
     ack()
@@ -0,0 +1,29 @@
+"""asyncio version of the listeners for `AsyncApp` (see `main_async.py`)"""
+from .. import is_echo
+from . import actions, commands, events
+from .shortcuts import message_shortcut
+
+
+def listen(app):
+    # commands
+    app.command("/echo")(commands.echo)
+    app.command("/anonymous")(commands.echo)
+    app.command("/disguise")(commands.echo)
+    app.command("/>")(commands.echo)
+    app.command("/send")(commands.send)
+    app.command("/shuffle")(commands.rand)
+    app.command("/choices")(commands.rand)
+    app.command("/meet")(commands.meet)
+
+    # shortcuts
+    app.shortcut("delete_message", [is_echo])(message_shortcut.delete_message)
+    app.shortcut("edit_message", [is_echo])(message_shortcut.edit_message)
+
+    # actions
+    app.action("save_edit")(actions.save_edit)
+    app.action("cancel_edit")(actions.cancel_edit)
+    app.action("join_meet")(actions.join_meet)
+
+    # events
+    app.event("member_joined_channel")(events.member_joined_channel)
+    app.event("member_left_channel")(events.member_left_channel)
@@ -0,0 +1,65 @@
+from typing import Any, Dict
+
+import slack_sdk
+import utils.blocks as b
+from slack_bolt.async_app import AsyncAck, AsyncRespond
+
+from ..actions import get_values
+
+
+async def cancel_edit(
+    body: Dict[str, Any],
+    ack: AsyncAck,
+    respond: AsyncRespond,
+):
+    """
+    cancel editing message which is sent by the bot
+    """
+    metadata = body["message"]["metadata"]
+    text = metadata["event_payload"].get("text")
+
+    await ack()
+    await respond(blocks=[b.section(text)])
+
+
+async def save_edit(
+    body: Dict[str, Any],
+    client: slack_sdk.web.async_client.AsyncWebClient,
+    ack: AsyncAck,
+    respond: AsyncRespond,
+):
+    """
+    save editing message which is sent by the bot
+    """
+    channel, message, state = get_values(body, ["channel", "message", "state"])
+    channel_id = channel.get("id")
+    message_ts = message.get("ts")
+    metadata = message["metadata"]
+
+    if state_values := state.get("values"):
+        _, block = state_values.popitem()  # block_id, block: {action_id, block_element}
+        _, state_value = block.popitem()  # action_id, state_value
+        text = state_value.get("value")
+        metadata["event_payload"].update(text=text)
+    else:
+        text = metadata["event_payload"].get("text")
+
+    await ack()
+    if text:
+        await client.chat_update(
+            channel=channel_id,
+            ts=message_ts,
+            blocks=[b.section(text)],
+            metadata=metadata,
+        )
+    else:
+        await respond(delete_original=True)
+
+
+async def join_meet(
+    ack: AsyncAck,
+):
+    """
+    join_meet action for `/meet` command
+    """
+    await ack()
@@ -0,0 +1,252 @@
+import asyncio
+from typing import Any, Dict, FrozenSet, Iterable, List
+
+import slack_sdk
+import utils.blocks as b
+from slack_bolt.async_app import AsyncAck, AsyncBoltContext, AsyncRespond, AsyncSay
+from utils import executor, jobs, lookups, messages
+from utils import members as channel_members
+from utils.fanout import async_fan_out
+from utils.text import Token, get_channels, get_users, tokenize
+
+from ..commands import (
+    MAX_PURGE,
+    choose_members,
+    get_bot_user_ids,
+    get_choices_number,
+    get_failure_message,
+    get_help_message,
+    get_meet_groups,
+    get_meet_link,
+    get_meet_targets,
+    get_profile,
+    get_purge_range,
+    get_purge_report,
+    get_purge_text,
+    get_send_batch,
+    get_values,
+)
+
+
+async def get_members(client: slack_sdk.web.async_client.AsyncWebClient, team_id: str, channel_id: str) -> list:
+    """
+    async version of `listeners.commands.get_members`
+    """
+    members = await channel_members.async_get_members(client, team_id, channel_id)
+    return list(members - await get_excluded_user_ids(client, team_id, members))
+
+
+async def get_excluded_user_ids(client: slack_sdk.web.async_client.AsyncWebClient, team_id: str, user_ids: Iterable[str] = ()) -> FrozenSet[str]:
+    """
+    async version of `listeners.commands.get_excluded_user_ids`
+    """
+    return await lookups.async_get_excluded_users(client, team_id, user_ids) | await asyncio.to_thread(get_bot_user_ids)
+
+
+async def is_admin(client: slack_sdk.web.async_client.AsyncWebClient, team_id: str, user_id: str) -> bool:
+    """
+    async version of `listeners.commands.is_admin`
+    """
+    user = (await lookups.async_lookup(client, team_id, "users.info", user=user_id)).get("user", {})
+    return bool(user.get("is_admin") or user.get("is_owner"))
+
+
+async def purge(
+    client: slack_sdk.web.async_client.AsyncWebClient,
+    team_id: str,
+    channel_id: str,
+    user_id: str,
+    text: str,
+    tokens: List[Token],
+    respond: AsyncRespond,
+):
+    """
+    async version of `listeners.commands.purge`
+    """
+    channels = get_channels(text, tokens) or [channel_id]
+    authors = get_users(text, tokens)
+    if not await is_admin(client, team_id, user_id):
+        if set(authors) - {user_id}:
+            await respond(text="다른 사용자의 메시지는 관리자만 삭제할 수 있습니다.")
+            return
+        authors = [user_id]
+    since, until = get_purge_range(text)
+
+    index = messages.get_index()
+    found = {f"{m.channel_id}:{m.ts}": m for m in await asyncio.to_thread(index.find, team_id, channels, authors, since, until, MAX_PURGE)}
+    if not found:
+        await respond(text="삭제할 메시지가 없습니다.")
+        return
+
+    failures = await async_fan_out(lambda key: client.chat_delete(channel=found[key].channel_id, ts=found[key].ts), found)
+    failures = {key: error for key, error in failures.items() if error != "message_not_found"}
+    await asyncio.to_thread(index.remove, team_id, [(m.channel_id, m.ts) for key, m in found.items() if key not in failures])
+    await respond(text=get_purge_report(len(found), failures))
+
+
+async def echo(
+    client: slack_sdk.web.async_client.AsyncWebClient,
+    command: Dict[str, Any],
+    ack: AsyncAck,
+    respond: AsyncRespond,
+    say: AsyncSay,
+):
+    """
+    `/echo` : @echo will send a message on the channel instead of you. (anonymous message)
+    `/anonymous` : send a message on the channel as "익명" with an anonymous profile image. (anonymous message)
+    `/disguise` : send a message on the channel in disguise as you wish. (anonymous message)
+    `/echo purge` : delete the messages sent by the bot
+    """
+    team_id, channel_id, user_id, text, context, tokens = get_values(command, ["team_id", "channel_id", "user_id", "text", "context", "tokens"])  # type: ignore
+    metadata = b.metadata(event_type="echo", event_payload={"context": context, "text": text})
+
+    # if the message is valid, send the message to the channel
+    # else the message is invalid, send help message
+    if (purge_text := get_purge_text(context, text)) is not None:
+        await ack()
+        await purge(client, team_id, channel_id, user_id, purge_text, tokenize(purge_text), respond)
+        return
+    elif context.startswith("/echo"):
+        if text:
+            await ack()
+            await say(text=text, metadata=metadata)
+        else:
+            await ack(text=await asyncio.to_thread(get_help_message, "echo"))
+            return
+    elif context.startswith("/anonymous"):
+        if text:
+            await ack()
+            await say(
+                text=text,
+                username="익명",
+                icon_emoji=":bust_in_silhouette:",
+                metadata=metadata,
+            )
+        else:
+            await ack(text=await asyncio.to_thread(get_help_message, "anonymous"))
+            return
+    elif context.startswith("/disguise"):
+        if text and (profile := get_profile(text, tokens)):
+            username, emoji, url, text = profile
+
+            metadata["event_payload"].update(text=text)
+            await ack()
+            await say(
+                text=text,
+                username=username,
+                icon_emoji=emoji,
+                icon_url=url,
+                metadata=metadata,
+            )
+        else:
+            await ack(text=await asyncio.to_thread(get_help_message, "disguise"))
+            return
+    elif context.startswith("/>"):
+        if text:
+            # ack first, the output is streamed into the message
+            await ack()
+            text = await executor.async_run(client, say, text, metadata)
+            tokens = tokenize(text)
+        else:
+            await ack(text=await asyncio.to_thread(get_help_message, "cmd"))
+
+    # the profile cut from /disguise text is never a channel, so the tokens are still valid
+    channels = get_channels(text, tokens)
+    # mention the channel in the message
+    attachments = b.text_attachments(text)
+    failures = await async_fan_out(
+        lambda channel: say(
+            text=f"이 채널이 <#{channel_id}>에서 멘션되었습니다.",
+            attachments=attachments,
+            channel=channel,
+            metadata=metadata,
+        ),
+        channels,
+    )
+    if failures:
+        await respond(text=get_failure_message(failures, "메시지를 보낸 후 <#{channel}>로 멘션 알림에 실패하였습니다."))
+
+
+async def send(
+    context: AsyncBoltContext,
+    command: Dict[str, Any],
+    ack: AsyncAck,
+):
+    """
+    `/send` : send a message to mentioned channels
+
+    the messages are sent by the workers of `utils.jobs` (with the sync client of the installation)
+    """
+    text, channels = get_values(dict(command), ["text", "channels"])
+
+    # if any channel is mentioned, send the message to the channel
+    # else no channel is mentioned, send help message
+    if not channels:
+        await ack(text=await asyncio.to_thread(get_help_message, "send"))
+        return
+    await ack(text=f"<#{'> <#'.join(dict.fromkeys(channels))}>로 메시지를 보냅니다.\n> {text}")
+
+    # enqueue a job per channel, the workers send the messages and the report
+    await asyncio.to_thread(jobs.enqueue, get_send_batch(context, command), channels)
+
+
+async def rand(
+    client: slack_sdk.web.async_client.AsyncWebClient,
+    command: Dict[str, Any],
+    ack: AsyncAck,
+    respond: AsyncRespond,
+    say: AsyncSay,
+):
+    """
+    `/shuffle` : shuffle the members of the channel
+    `/choices` : choose a random member of the channel
+    """
+    team_id, channel_id, user_id, text, context = get_values(command, ["team_id", "channel_id", "user_id", "text", "context"])  # type: ignore
+    metadata = b.metadata(event_type="rand", event_payload={"context": context, "text": text})
+
+    # the members may need a users.list scan, ack within 3 seconds first
+    await ack()
+    if context.startswith("/choices help"):
+        await respond(text=await asyncio.to_thread(get_help_message, "choices"))
+        return
+    if (num := get_choices_number(context, text)) is None:
+        members = choose_members(await get_members(client, team_id, channel_id), context, text)
+    else:
+        members = await channel_members.async_sample_members(
+            client, team_id, channel_id, num, exclude=lambda users: get_excluded_user_ids(client, team_id, users)
+        )
+
+    # send the message
+    await say(blocks=b.rand_blocks(members, user_id, context), metadata=metadata)
+
+
+async def meet(
+    client: slack_sdk.web.async_client.AsyncWebClient,
+    command: Dict[str, Any],
+    ack: AsyncAck,
+    respond: AsyncRespond,
+    say: AsyncSay,
+):
+    """
+    `/meet` : create a link for google meet
+    """
+    team_id, channel_id, channel_name, user_id, user_name, users, context = get_values(
+        command, ["team_id", "channel_id", "channel_name", "user_id", "user_name", "users", "context"]
+    )  # type: ignore
+    metadata = b.metadata(event_type="meet", event_payload={"context": context})
+
+    # get the meeting link
+    link = get_meet_link(channel_name, user_name, users)
+    blocks = b.meet_blocks(link, user_id, context)
+
+    # send the message to the channel and the DMs at once, the DM channels are opened once and cached
+    await ack()
+    targets = get_meet_targets(channel_id, get_meet_groups(user_id, users))
+
+    async def post(target: str):
+        group = targets[target]
+        channel = await lookups.async_get_dm_channel(client, team_id, group) if group else channel_id
+        await say(username="Google Meet", icon_emoji=":meet:", blocks=blocks, channel=channel, metadata=metadata)
+
+    if failures := await async_fan_out(post, targets):
+        await respond(text=get_failure_message(failures, "{channel}로 회의 링크 보내기를 실패하였습니다."))
@@ -0,0 +1,42 @@
+import asyncio
+from typing import Any, Dict
+
+import slack_sdk
+import utils.blocks as b
+from slack_bolt.async_app import AsyncAck, AsyncBoltContext, AsyncRespond
+from utils import messages
+
+from ...shortcuts.message_shortcut import get_values
+
+
+async def delete_message(
+    context: AsyncBoltContext,
+    shortcut: Dict[str, Any],
+    ack: AsyncAck,
+    respond: AsyncRespond,
+):
+    """
+    delete message which is sent by the bot
+    """
+    await ack()
+    await respond(delete_original=True)
+    await asyncio.to_thread(messages.get_index().remove, context.team_id, [(context.channel_id, shortcut["message_ts"])])
+
+
+async def edit_message(
+    client: slack_sdk.web.async_client.AsyncWebClient,
+    shortcut: Dict[str, Any],
+    ack: AsyncAck,
+):
+    """
+    edit message which is sent by the bot
+    """
+    channel, message, ts = get_values(shortcut, ["channel", "message", "message_ts"])
+    channel_id = channel.get("id")
+    metadata = message["metadata"]
+    text = metadata["event_payload"].get("text")
+
+    blocks = b.edit_blocks(text)
+
+    await ack()
+    await client.chat_update(channel=channel_id, ts=ts, blocks=blocks, metadata=metadata)
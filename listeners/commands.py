@@ -1,17 +1,42 @@
 import html
-import logging
+import os
 import random
 import re
+import time
+import uuid
 from collections import Counter
-from typing import Any, Dict, Iterable
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
 
 import slack_sdk
-import utils.models as m
-from slack_bolt import Ack, Say
+import utils.blocks as b
+from slack_bolt import Ack, BoltContext, Respond, Say
+from slack_sdk.errors import SlackApiError
+from utils import config, executor, jobs, loader, lookups, messages
+from utils import members as channel_members
+from utils.fanout import fan_out
 from utils.loader import read_yaml
-from utils.text import get_channels, get_emojis, get_urls, get_users
+from utils.text import Token, cut, get_channels, get_emojis, get_urls, get_users, tokenize
 
 YAML_FILE = "https://api.github.com/repos/skkuinit/echo/contents/config.yaml"
+# a cold instance starts from the compiled config.yaml (`python -m utils.config`) if built
+loader.seed(YAML_FILE, config.load_snapshot)
+
+ERROR_MESSAGES = {
+    "channel_not_found": "채널에 앱이 존재하지 않습니다.",
+    "is_archived": "채널이 보관되어 있습니다.",
+    "cant_delete_message": "앱이 보낸 메시지가 아닙니다.",
+}
+
+# time range of `/echo purge`: `2h` (the last 2 hours) or `7d-1d` (from 7 days ago to 1 day ago)
+PURGE_RANGE_RE = re.compile(r"(?<!\S)(\d+)([mhd])(?:-(\d+)([mhd]))?(?!\S)")
+PURGE_UNITS = {"m": 60, "h": 3600, "d": 86400}
+# max number of messages deleted by `/echo purge`
+MAX_PURGE = 1000
+
+# `/meet` to the mentioned users: `group` (one group DM of them) or `direct` (a DM per user)
+MEET_DELIVERY = os.environ.get("MEET_DELIVERY", "group")
+# max users of a group DM (conversations.open), more are sent a DM each
+MAX_GROUP_DM = 8
 
 
 def get_values(command: Dict[str, Any], values: Iterable[str]) -> Iterable[str]:
@@ -35,6 +60,7 @@ def get_values(command: Dict[str, Any], values: Iterable[str]) -> Iterable[str]:
         - emojis : :emoji:
         - urls : <https?://[^\s]+>
         - users : U[A-Z0-9]{10}
+        - tokens : [Token(kind, value, start, end), ...] (utils.text.tokenize)
     - token : [0-9a-zA-Z]{24}
     - trigger_id : [0-9]{13}.[0-9]{13}.[0-9a-z]{32}
     - user_id : U[A-Z0-9]{10}
@@ -47,36 +73,54 @@ def get_values(command: Dict[str, Any], values: Iterable[str]) -> Iterable[str]:
     command.update(text=html.unescape(text := command.pop("text", "")))
     filtered_dict = {k: v for k, v in command.items() if k in values}
 
+    tokens = tokenize(text) if {"channels", "users", "emojis", "urls", "tokens"} & set(values) else []
     if "channels" in values:
-        filtered_dict.update(channels=get_channels(text))
+        filtered_dict.update(channels=get_channels(text, tokens))
     if "users" in values:
-        filtered_dict.update(users=get_users(text))
+        filtered_dict.update(users=get_users(text, tokens))
     if "emojis" in values:
-        filtered_dict.update(emojis=get_emojis(text))
+        filtered_dict.update(emojis=get_emojis(text, tokens))
     if "urls" in values:
-        filtered_dict.update(urls=get_urls(text))
+        filtered_dict.update(urls=get_urls(text, tokens))
+    if "tokens" in values:
+        filtered_dict.update(tokens=tokens)
     if "context" in filtered_dict and text:
         filtered_dict.update(context=filtered_dict.pop("context") + " " + text)
 
     return (filtered_dict.get(k, "") for k in values)
 
 
-def get_members(client: slack_sdk.web.client.WebClient, channel_id: str) -> list:
+def get_members(client: slack_sdk.web.client.WebClient, team_id: str, channel_id: str) -> list:
     """
-    get members of the channel
+    get members of the channel except the bots and the deactivated users
 
     Args:
         client (slack_sdk.web.client.WebClient): client of slack api
+        team_id (str): team id of the channel
         channel_id (str): channel id to get members
 
     Returns:
         (list): members of the channel
     """
-    SLACK_BOT_USER_ID = read_yaml(YAML_FILE).get("SLACK_BOT_USER_ID")
+    members = channel_members.get_members(client, team_id, channel_id)
+    return list(members - get_excluded_user_ids(client, team_id, members))
+
+
+def get_excluded_user_ids(client: slack_sdk.web.client.WebClient, team_id: str, user_ids: Iterable[str] = ()) -> FrozenSet[str]:
+    """
+    get user ids never chosen by `/shuffle` and `/choices`
+
+    - bots and deactivated users of the team (indexed from users.list, `user_ids` missing from it are looked up)
+    - SLACK_BOT_USER_ID of the yaml file, if any
+    """
+    return lookups.get_excluded_users(client, team_id, user_ids) | get_bot_user_ids()
+
 
-    members = client.conversations_members(channel=channel_id).get("members")
-    members = list(set(members) - set(SLACK_BOT_USER_ID))
-    return members
+def get_bot_user_ids() -> set:
+    """
+    get user ids of the extra bots from the yaml file (optional)
+    """
+    return set(read_yaml(YAML_FILE).get("SLACK_BOT_USER_ID") or [])
 
 
 def get_help_message(context: str) -> str:
@@ -87,35 +131,273 @@ def get_help_message(context: str) -> str:
     return help_msg.get(context)
 
 
+def get_failure_message(failures: Dict[str, str], message: str) -> str:
+    """
+    get a summary message of the failed channels
+
+    Args:
+        failures (dict): {channel: error} returned by `fan_out`
+        message (str): message for each channel, formatted with `channel`
+
+    Returns:
+        (str): summary message
+    """
+    return "\n".join(
+        f"{message.format(channel=channel)} {ERROR_MESSAGES.get(error, f'({error})')}"
+        for channel, error in failures.items()
+    )
+
+
+def get_purge_text(context: str, text: str) -> Optional[str]:
+    """
+    get the arguments of `/echo purge`
+
+    Args:
+        context (str): `/echo ...`
+        text (str): text of the command
+
+    Returns:
+        (str): text after `purge`, None if the command isn't `/echo purge` (`/echo purged ...` is echoed)
+    """
+    words = text.split(maxsplit=1)
+    if not context.startswith("/echo") or words[:1] != ["purge"]:
+        return None
+    return words[1] if len(words) > 1 else ""
+
+
+def get_purge_range(text: str, now: Optional[float] = None) -> Tuple[Optional[float], Optional[float]]:
+    """
+    get the time range of `/echo purge` from the text
+
+    Args:
+        text (str): `... [30m|2h|7d|7d-1d] ...`
+        now (float): unix time of the request
+
+    Returns:
+        (tuple): (since, until) unix times, None if not bounded
+    """
+    if not (match := PURGE_RANGE_RE.search(text)):
+        return None, None
+    now = time.time() if now is None else now
+    since = now - int(match[1]) * PURGE_UNITS[match[2]]
+    until = now - int(match[3]) * PURGE_UNITS[match[4]] if match[3] else None
+    return since, until
+
+
+def get_purge_report(total: int, failures: Dict[str, str]) -> str:
+    """
+    get a summary message of `/echo purge`
+
+    Args:
+        total (int): number of the messages to delete
+        failures (dict): {message: error} returned by `fan_out`
+
+    Returns:
+        (str): summary message
+    """
+    report = f"{total - len(failures)}개의 메시지를 삭제하였습니다."
+    for error, count in Counter(failures.values()).items():
+        report += f"\n{count}개의 메시지 삭제를 실패하였습니다. {ERROR_MESSAGES.get(error, f'({error})')}"
+    return report
+
+
+def is_admin(client: slack_sdk.web.client.WebClient, team_id: str, user_id: str) -> bool:
+    """
+    check if the user is an admin or an owner of the team
+    """
+    user = lookups.lookup(client, team_id, "users.info", user=user_id).get("user", {})
+    return bool(user.get("is_admin") or user.get("is_owner"))
+
+
+def get_profile(text: str, tokens: List[Token]) -> Optional[Tuple[str, Optional[str], str, str]]:
+    """
+    get the profile for `/disguise` from the text
+
+    Args:
+        text (str): `[:emoji: or <url>] [username] [message]`
+        tokens (list): tokens of the text
+
+    Returns:
+        (tuple): (username, icon_emoji, icon_url, message), None if the username is missing
+    """
+    # get url or emoji for profile image
+    url = next((t for t in tokens if t.kind == "url"), None)
+    emoji = None if url else next((t for t in tokens if t.kind == "emoji"), None)
+    if profile := url or emoji:
+        text = cut(text, profile)
+
+    # get username for profile
+    if not (words := text.split(None, 1)):
+        return None
+    username, text = words if len(words) > 1 else (words[0], text)
+
+    if url:
+        return username, None, url.value, text
+    return username, emoji.value if emoji else ":bust_in_silhouette:", "", text
+
+
+def get_choices_number(context: str, text: str) -> Optional[int]:
+    """
+    get the number of members to choose for `/choices`
+
+    Args:
+        context (str): `/shuffle` | `/choices [number|all]`
+        text (str): text of the command
+
+    Returns:
+        (int): number of members to choose (1 by default), None to shuffle all of them
+    """
+    if context.startswith("/shuffle") or context.startswith("/choices all"):
+        return None
+    if text and (num := re.search(r"^[1-9]\d*", text)):
+        return int(num.group())
+    return 1
+
+
+def choose_members(members: list, context: str, text: str) -> list:
+    """
+    shuffle or choose the members for `/shuffle` and `/choices`
+
+    Args:
+        members (list): members of the channel
+        context (str): `/shuffle` | `/choices [number|all]`
+        text (str): text of the command
+
+    Returns:
+        (list): shuffled or chosen members (each member at most once)
+    """
+    random.seed()
+
+    if (num := get_choices_number(context, text)) is None:
+        random.shuffle(members)
+        return members
+    return random.sample(members, min(num, len(members)))
+
+
+def get_meet_link(channel_name: str, user_name: str, users: list) -> str:
+    """
+    get the google meet link for `/meet`
+
+    Args:
+        channel_name (str): name of the channel (the meeting code is its last `_` part)
+        user_name (str): name of the user (the meeting code if any user is mentioned)
+        users (list): mentioned users
+
+    Returns:
+        (str): link of the meeting
+    """
+    if users:
+        code = user_name.replace(".", "-")
+    else:
+        *_, code = channel_name.split("_")
+        code = re.sub("[^a-z0-9-]+", "", code)
+
+    return (
+        "https://accounts.google.com/AccountChooser"
+        + "?hd=g.skku.edu"
+        + f"&continue=https://g.co/meet/{code}"
+        + "&flowName=GlifWebSignIn"
+        + "&flowEntry=AccountChooser"
+    )
+
+
+def get_meet_groups(user_id: str, users: list) -> List[List[str]]:
+    """
+    get the DMs of `/meet`, each as the list of its users
+
+    Args:
+        user_id (str): user of the command, left out (the link is posted to the channel too)
+        users (list): mentioned users
+
+    Returns:
+        (list): a group DM of the mentioned users (MEET_DELIVERY=group, up to MAX_GROUP_DM users),
+            else a DM per mentioned user
+    """
+    invitees = [user for user in dict.fromkeys(users) if user != user_id]
+    if MEET_DELIVERY == "group" and 1 < len(invitees) <= MAX_GROUP_DM:
+        return [invitees]
+    return [[user] for user in invitees]
+
+
+def get_meet_targets(channel_id: str, groups: List[List[str]]) -> Dict[str, Optional[List[str]]]:
+    """
+    get the targets of `/meet` keyed by their mention (used in the failure message)
+
+    Returns:
+        (dict): {"<#channel>": None, "<@user> <@user>": users of the DM, ...}
+    """
+    return {f"<#{channel_id}>": None, **{" ".join(f"<@{user}>" for user in group): group for group in groups}}
+
+
+def purge(
+    client: slack_sdk.web.client.WebClient,
+    team_id: str,
+    channel_id: str,
+    user_id: str,
+    text: str,
+    tokens: List[Token],
+    respond: Respond,
+):
+    """
+    `/echo purge [#채널] [@사용자] [기간]` : delete the messages of the bot recorded in `utils.messages`
+
+    - #채널: channels of the messages (default: the current channel)
+    - @사용자: users who sent the messages (default: everyone), only their own messages for non-admins
+    - 기간: `30m`, `2h`, `7d` for the last ..., `7d-1d` from 7 days ago to 1 day ago
+    """
+    channels = get_channels(text, tokens) or [channel_id]
+    authors = get_users(text, tokens)
+    if not is_admin(client, team_id, user_id):
+        if set(authors) - {user_id}:
+            respond(text="다른 사용자의 메시지는 관리자만 삭제할 수 있습니다.")
+            return
+        authors = [user_id]
+    since, until = get_purge_range(text)
+
+    index = messages.get_index()
+    found = {f"{m.channel_id}:{m.ts}": m for m in index.find(team_id, channels, authors, since, until, limit=MAX_PURGE)}
+    if not found:
+        respond(text="삭제할 메시지가 없습니다.")
+        return
+
+    # deleted concurrently, within the rate limit of chat.delete (see `utils.ratelimit`)
+    failures = fan_out(lambda key: client.chat_delete(channel=found[key].channel_id, ts=found[key].ts), found)
+    # the messages already deleted by someone else are gone too
+    failures = {key: error for key, error in failures.items() if error != "message_not_found"}
+    index.remove(team_id, [(m.channel_id, m.ts) for key, m in found.items() if key not in failures])
+    respond(text=get_purge_report(len(found), failures))
+
+
 def echo(
-    body: Dict[str, Any],
-    logger: logging.Logger,
+    client: slack_sdk.web.client.WebClient,
     command: Dict[str, Any],
-    ack: Ack,
+    respond: Respond,
     say: Say,
 ):
     """
     `/echo` : @echo will send a message on the channel instead of you. (anonymous message)
     `/anonymous` : send a message on the channel as "익명" with an anonymous profile image. (anonymous message)
     `/disguise` : send a message on the channel in disguise as you wish. (anonymous message)
-    """
-    logger.info(body)
+    `/echo purge` : delete the messages sent by the bot (see `purge`)
 
-    channel_id, text, context = get_values(command, ["channel_id", "text", "context"])
-    metadata = m.metadata(event_type="echo", event_payload={"context": context, "text": text})  # type: ignore
+    lazy listener, the command is acknowledged by `listeners.acknowledge`
+    """
+    team_id, channel_id, user_id, text, context, tokens = get_values(command, ["team_id", "channel_id", "user_id", "text", "context", "tokens"])  # type: ignore
+    metadata = b.metadata(event_type="echo", event_payload={"context": context, "text": text})
 
     # if the message is valid, send the message to the channel
     # else the message is invalid, send help message
-    if context.startswith("/echo"):
+    if (purge_text := get_purge_text(context, text)) is not None:
+        purge(client, team_id, channel_id, user_id, purge_text, tokenize(purge_text), respond)
+        return
+    elif context.startswith("/echo"):
         if text:
-            ack()
             say(text=text, metadata=metadata)
         else:
-            ack(text=get_help_message("echo"))
+            respond(text=get_help_message("echo"))
             return
     elif context.startswith("/anonymous"):
         if text:
-            ack()
             say(
                 text=text,
                 username="익명",
@@ -123,25 +405,13 @@ def echo(
                 metadata=metadata,
             )
         else:
-            ack(text=get_help_message("anonymous"))
+            respond(text=get_help_message("anonymous"))
             return
     elif context.startswith("/disguise"):
-        if text:
-            # get url for profile image
-            url, *_ = get_urls(text) or ("",)
-            text = re.sub(re.escape(url) + "\s+", "", text) if url else text
-            url = url.strip("<>")
-
-            # get emoji for profile image
-            emoji, *_ = (None,) if url else (get_emojis(text) or (":bust_in_silhouette:",))  # type: ignore
-            text = re.sub(emoji + "\s+", "", text, 1) if emoji else text
+        if text and (profile := get_profile(text, tokens)):
+            username, emoji, url, text = profile
 
-            # get username for profile
-            username, *_ = text.split()
-            text = re.sub(username + "\s+", "", text, 1)
-
-            metadata.event_payload.update(text=text)
-            ack()
+            metadata["event_payload"].update(text=text)
             say(
                 text=text,
                 username=username,
@@ -150,197 +420,199 @@ def echo(
                 metadata=metadata,
             )
         else:
-            ack(text=get_help_message("disguise"))
+            respond(text=get_help_message("disguise"))
             return
     elif context.startswith("/>"):
         if text:
-            import os
-
-            text = f"$ {text}\n```{os.popen(text).read()}```"
-            metadata.event_payload.update(text=text)
-            ack()
-            say(text=text, metadata=metadata)
+            # streamed into the message, the request has already been acknowledged
+            text = executor.run(client, say, text, metadata)
+            tokens = tokenize(text)
         else:
-            ack(text=get_help_message("cmd"))
+            respond(text=get_help_message("cmd"))
 
-    channels = get_channels(text)
+    # the profile cut from /disguise text is never a channel, so the tokens are still valid
+    channels = get_channels(text, tokens)
     # mention the channel in the message
-    for channel in channels:
-        try:
-            say(
-                text=f"이 채널이 <#{channel_id}>에서 멘션되었습니다.",
-                attachments=[
-                    m.block_attachment(
-                        color="#d0d0d0", blocks=[m.Section(text=m.mrkdwn(text=text))]
-                    )
-                ],
-                channel=channel,
-                metadata=metadata,
-            )
-        except slack_sdk.errors.SlackApiError as e:
-            error = e.response["error"]
-            logger.error(error)
-            if error == "channel_not_found":
-                ack(text=f"메시지를 보낸 후 <#{channel}>로 멘션 알림에 실패하였습니다. 채널에 앱이 존재하지 않습니다.")
-            elif error == "is_archived":
-                ack(text=f"메시지를 보낸 후 <#{channel}>로 멘션 알림에 실패하였습니다. 채널이 보관되어 있습니다.")
+    attachments = b.text_attachments(text)
+    failures = fan_out(
+        lambda channel: say(
+            text=f"이 채널이 <#{channel_id}>에서 멘션되었습니다.",
+            attachments=attachments,
+            channel=channel,
+            metadata=metadata,
+        ),
+        channels,
+    )
+    if failures:
+        respond(text=get_failure_message(failures, "메시지를 보낸 후 <#{channel}>로 멘션 알림에 실패하였습니다."))
 
 
-def send(
-    body: Dict[str, Any],
-    logger: logging.Logger,
+def ack_send(
     command: Dict[str, Any],
     ack: Ack,
-    say: Say,
 ):
     """
-    `/send` : send a message to mentioned channels
+    acknowledge `/send` with the preview of the message, the message is sent by `send`
     """
-    logger.info(body)
-
-    user_id, text, channels = get_values(command, ["user_id", "text", "channels"])
-    metadata = m.metadata(event_type="send", event_payload={"text": text})
+    # get_values pops the keys, keep the command for the lazy listener
+    text, channels = get_values(dict(command), ["text", "channels"])
 
     # TODO:
     # [-] preview message
-    # if any channel is mentioned, send the message to the channel
-    # else no channel is mentioned, send help message
+    # if any channel is mentioned, preview the message
+    # else no channel is mentioned, the help message is sent by `send`
     if channels:
-        ack(text=f"<#{'> <#'.join(channels)}>로 메시지를 보냅니다.\n> {text}")
+        ack(text=f"<#{'> <#'.join(dict.fromkeys(channels))}>로 메시지를 보냅니다.\n> {text}")
     else:
-        ack(text=get_help_message("send"))
+        ack()
+
+
+def get_send_batch(context: BoltContext, command: Dict[str, Any]) -> jobs.Batch:
+    """
+    get the batch of `/send`, one delivery job per mentioned channel
+
+    Args:
+        context (BoltContext): context of the request
+        command (dict): payload of the app.command
+
+    Returns:
+        (jobs.Batch): batch keyed by the trigger id, a repeated request is enqueued once
+    """
+    user_id, channel_id, response_url, trigger_id, text = get_values(command, ["user_id", "channel_id", "response_url", "trigger_id", "text"])
+    return jobs.Batch(
+        id=f"send:{trigger_id or uuid.uuid4().hex}",
+        kind="send",
+        enterprise_id=context.enterprise_id,
+        team_id=context.team_id,
+        user_id=user_id,
+        channel_id=channel_id,
+        response_url=response_url or None,
+        payload={"user_id": user_id, "text": text},
+        created_at=time.time(),
+    )
+
+
+def deliver_send(client: slack_sdk.web.client.WebClient, batch: jobs.Batch, job: jobs.Job) -> None:
+    """
+    send the message of `/send` to the channel of the job
+    """
+    text = batch.payload["text"]
+    metadata = b.metadata(event_type="send", event_payload={"text": text, "job": job.key})
+    response = client.chat_postMessage(
+        text=f"<@{batch.payload['user_id']}>님이 보낸 메시지 입니다.",
+        attachments=b.text_attachments(text),
+        channel=job.target,
+        metadata=metadata,
+    )
+    messages.record(response, batch.team_id, batch.user_id, metadata)
+
+
+def is_sent(client: slack_sdk.web.client.WebClient, batch: jobs.Batch, job: jobs.Job) -> bool:
+    """
+    check if the message of the job is in the channel (its metadata has the job key)
+    """
+    try:
+        response = client.conversations_history(channel=job.target, oldest=str(batch.created_at), include_all_metadata=True, limit=200)
+    except SlackApiError:
+        return False  # e.g. missing scope, send it again
+    return any(message.get("metadata", {}).get("event_payload", {}).get("job") == job.key for message in response.get("messages", []))
+
+
+def report_send(batch: jobs.Batch, failures: Dict[str, str], total: int) -> str:
+    """
+    get the delivery report of `/send` for the sender
+    """
+    report = f"{total - len(failures)}/{total}개 채널로 메시지를 보냈습니다."
+    if failures:
+        report += "\n" + get_failure_message(failures, "<#{channel}>로 메시지 보내기를 실패하였습니다.")
+    return report
 
-    # send the message to the channels in the message
-    for channel in channels:
-        try:
-            say(
-                text=f"<@{user_id}>님이 보낸 메시지 입니다.",
-                attachments=[
-                    m.block_attachment(
-                        color="#d0d0d0", blocks=[m.Section(text=m.mrkdwn(text=text))]
-                    )
-                ],
-                channel=channel,
-                metadata=metadata,
-            )
-        except slack_sdk.errors.SlackApiError as e:
-            error = e.response["error"]
-            logger.error(error)
-            if error == "channel_not_found":
-                ack(text=f"<#{channel}>로 메시지 보내기를 실패하였습니다. 채널에 앱이 존재하지 않습니다.")
-            elif error == "is_archived":
-                ack(text=f"<#{channel}>로 메시지 보내기를 실패하였습니다. 채널이 보관되어 있습니다.")
+
+jobs.register("send", jobs.Handler(deliver=deliver_send, report=report_send, delivered=is_sent))
+
+
+def send(
+    client: slack_sdk.web.client.WebClient,
+    context: BoltContext,
+    command: Dict[str, Any],
+    respond: Respond,
+):
+    """
+    `/send` : send a message to mentioned channels
+
+    lazy listener, the command is acknowledged by `ack_send`. The messages are
+    sent by the workers of `utils.jobs`, and the delivery report once all are done
+    """
+    # get_values pops the keys, keep the command for the batch
+    channels = next(iter(get_values(dict(command), ["channels"])))
+
+    if not channels:
+        respond(text=get_help_message("send"))
+        return
+
+    # enqueue a job per channel and return, the workers send the messages
+    batch = get_send_batch(context, command)
+    pool = jobs.enqueue(batch, channels, client)
+    if jobs.DRAIN_TIMEOUT:
+        # the threads are throttled once the invocation returns on FaaS, keep it alive while draining
+        pool.wait(batch.id, jobs.DRAIN_TIMEOUT)
 
 
 def rand(
-    body: Dict[str, Any],
-    logger: logging.Logger,
     client: slack_sdk.web.client.WebClient,
     command: Dict[str, Any],
-    ack: Ack,
+    respond: Respond,
     say: Say,
 ):
     """
     `/shuffle` : shuffle the members of the channel
     `/choices` : choose a random member of the channel
-    """
-    logger.info(body)
-
-    channel_id, user_id, text, context = get_values(command, ["channel_id", "user_id", "text", "context"])  # type: ignore
-    members = get_members(client, channel_id)
-    metadata = m.metadata(event_type="rand", event_payload={"context": context, "text": text})  # type: ignore
 
-    random.seed()
+    lazy listener, the command is acknowledged by `listeners.acknowledge`
+    """
+    team_id, channel_id, user_id, text, context = get_values(command, ["team_id", "channel_id", "user_id", "text", "context"])  # type: ignore
+    metadata = b.metadata(event_type="rand", event_payload={"context": context, "text": text})
 
-    # handle the context
-    if context.startswith("/shuffle") or context.startswith("/choices all"):
-        random.shuffle(members)
-    elif context.startswith("/choices help"):
-        ack(text=get_help_message("choices"))
+    if context.startswith("/choices help"):
+        respond(text=get_help_message("choices"))
         return
-    elif context.startswith("/choices"):
-        # get the number to choose
-        if text and (num := re.search(r"^[1-9]\d*", text)):
-            num = int(num.group())
-        else:
-            num = 1
-        counter = Counter(members)  # Counter({'Uxxxxxxxxxx': 1, ...}): Counter
-        members = random.choices(tuple(counter.keys()), weights=counter.values(), k=num)
-
-    # build the message to send
-    members = map(lambda i, user: f"{i + 1}. <@{user}>\n", *zip(*enumerate(members)))
+    if (num := get_choices_number(context, text)) is None:
+        members = choose_members(get_members(client, team_id, channel_id), context, text)
+    else:
+        # stream the members through a reservoir, only the chosen ones are kept
+        members = channel_members.sample_members(client, team_id, channel_id, num, exclude=lambda users: get_excluded_user_ids(client, team_id, users))
 
     # send the message
-    ack()
-    say(
-        blocks=[
-            m.Section(text=m.mrkdwn(text="".join(members))),
-            m.Divider(),
-            m.Context(
-                elements=[m.mrkdwn(text=f"<@{user_id}>님이 `{context}`를 실행하였습니다.")]
-            ),
-        ],
-        metadata=metadata,
-    )
+    say(blocks=b.rand_blocks(members, user_id, context), metadata=metadata)
 
 
 def meet(
-    body: Dict[str, Any],
-    logger: logging.Logger,
+    client: slack_sdk.web.client.WebClient,
     command: Dict[str, Any],
-    ack: Ack,
+    respond: Respond,
     say: Say,
 ):
     """
     `/meet` : create a link for google meet
-    """
-    logger.info(body)
 
-    channel_name, user_id, user_name, users, context = get_values(command, ["channel_name", "user_id", "user_name", "users", "context"])  # type: ignore
-    metadata = m.metadata(event_type="meet", event_payload={"context": context})
+    lazy listener, the command is acknowledged by `listeners.acknowledge`
+    """
+    team_id, channel_id, channel_name, user_id, user_name, users, context = get_values(
+        command, ["team_id", "channel_id", "channel_name", "user_id", "user_name", "users", "context"]
+    )  # type: ignore
+    metadata = b.metadata(event_type="meet", event_payload={"context": context})
 
     # get the meeting link
-    if users:
-        code = user_name.replace(".", "-")
-    else:
-        *_, code = channel_name.split("_")
-        code = re.sub("[^a-z0-9-]+", "", code)
+    link = get_meet_link(channel_name, user_name, users)
+    blocks = b.meet_blocks(link, user_id, context)
 
-    link = (
-        "https://accounts.google.com/AccountChooser"
-        + "?hd=g.skku.edu"
-        + f"&continue=https://g.co/meet/{code}"
-        + "&flowName=GlifWebSignIn"
-        + "&flowEntry=AccountChooser"
-    )
-    blocks = [
-        m.Actions(
-            elements=[
-                m.button(
-                    text=m.plain_text(text="Google Meet 참여하기"),
-                    url=link,
-                    action_id="join_meet",
-                )
-            ]
-        ),
-        m.Divider(),
-        m.Context(elements=[m.mrkdwn(text=f"<@{user_id}>님이 `{context}`를 실행하였습니다.")]),
-    ]
+    # send the message to the channel and the DMs at once, the DM channels are opened once and cached
+    targets = get_meet_targets(channel_id, get_meet_groups(user_id, users))
 
-    # send the message
-    ack()
-    for user in users:
-        say(
-            username="Google Meet",
-            icon_emoji=":meet:",
-            blocks=blocks,
-            channel=user,
-            metadata=metadata,
-        )
-    else:
-        say(
-            username="Google Meet",
-            icon_emoji=":meet:",
-            blocks=blocks,
-            metadata=metadata,
-        )
+    def post(target: str):
+        group = targets[target]
+        channel = lookups.get_dm_channel(client, team_id, group) if group else channel_id
+        say(username="Google Meet", icon_emoji=":meet:", blocks=blocks, channel=channel, metadata=metadata)
+
+    if failures := fan_out(post, targets):
+        respond(text=get_failure_message(failures, "{channel}로 회의 링크 보내기를 실패하였습니다."))
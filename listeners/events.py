@@ -0,0 +1,23 @@
+from typing import Any, Dict
+
+from utils import members
+
+
+def member_joined_channel(
+    body: Dict[str, Any],
+    event: Dict[str, Any],
+):
+    """
+    patch the cached members of the channel when a user joins it
+    """
+    members.add_member(body.get("team_id"), event.get("channel"), event.get("user"))
+
+
+def member_left_channel(
+    body: Dict[str, Any],
+    event: Dict[str, Any],
+):
+    """
+    patch the cached members of the channel when a user leaves it
+    """
+    members.remove_member(body.get("team_id"), event.get("channel"), event.get("user"))
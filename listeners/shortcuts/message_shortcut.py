@@ -1,9 +1,9 @@
-import logging
 from typing import Any, Dict, Iterable
 
 import slack_sdk
-import utils.models as m
-from slack_bolt import Ack, Respond
+import utils.blocks as b
+from slack_bolt import BoltContext, Respond
+from utils import messages
 
 
 def get_values(shortcut: Dict[str, Any], values: Iterable[Any]) -> Any:
@@ -60,64 +60,33 @@ def get_values(shortcut: Dict[str, Any], values: Iterable[Any]) -> Any:
 
 
 def delete_message(
-    body: Dict[str, Any],
-    logger: logging.Logger,
-    ack: Ack,
+    context: BoltContext,
+    shortcut: Dict[str, Any],
     respond: Respond,
 ):
     """
     delete message which is sent by the bot
-    """
-    logger.info(body)
 
-    ack()
+    lazy listener, the request is acknowledged by `listeners.acknowledge`
+    """
     respond(delete_original=True)
+    messages.get_index().remove(context.team_id, [(context.channel_id, shortcut["message_ts"])])
 
 
 def edit_message(
-    body: Dict[str, Any],
-    logger: logging.Logger,
     client: slack_sdk.web.client.WebClient,
     shortcut: Dict[str, Any],
-    ack: Ack,
 ):
     """
     edit message which is sent by the bot
-    """
-    logger.info(body)
 
+    lazy listener, the request is acknowledged by `listeners.acknowledge`
+    """
     channel, message, ts = get_values(shortcut, ["channel", "message", "message_ts"])
     channel_id = channel.get("id")
     metadata = message["metadata"]
     text = metadata["event_payload"].get("text")
 
-    blocks = [
-        m.Input(
-            block_id="edit_message",
-            element=m.plain_text_input(
-                action_id="input",
-                multiline=True,
-                placeholder=m.plain_text(text="메시지 편집"),
-                initial_value=text,
-                focus_on_load=True,
-            ),
-            label=m.plain_text(text="메시지 편집"),
-        ),
-        m.Actions(
-            elements=[
-                m.button(
-                    text=m.plain_text(text=":x: 취소", emoji=True),
-                    action_id="cancel_edit",
-                    style="danger",
-                ),
-                m.button(
-                    text=m.plain_text(text=":heavy_check_mark: 저장", emoji=True),
-                    action_id="save_edit",
-                    style="primary",
-                ),
-            ]
-        ),
-    ]
+    blocks = b.edit_blocks(text)
 
-    ack()
     client.chat_update(channel=channel_id, ts=ts, blocks=blocks, metadata=metadata)
@@ -1,34 +1,44 @@
 import logging
 import os
+import threading
+from typing import TYPE_CHECKING
 
 from slack_bolt import App
-from slack_bolt.adapter.flask import SlackRequestHandler
 
 import auth
 import listeners
+from utils import dedupe, logs, metrics
+from utils.messages import index_messages
+from utils.ratelimit import rate_limit
 
+# built once per instance and reused by warm invocations
+_handler = None
+_handler_lock = threading.Lock()
 
-# Cloud Function
-def echo_bot(request):
-    """HTTP Cloud Function.
-    Args:
-        request (flask.Request): The request object.
-        <https://flask.palletsprojects.com/en/1.1.x/api/#incoming-request-data>
-    Returns:
-        The response text, or any set of values that can be turned into a
-        Response object using `make_response`
-        <https://flask.palletsprojects.com/en/1.1.x/api/#flask.make_response>.
+if TYPE_CHECKING:
+    from slack_bolt.adapter.flask import SlackRequestHandler
+
+
+def create_app(process_before_response: bool = True) -> App:
     """
-    logging.basicConfig(level=logging.INFO)
+    create the app for multiple workspaces and register the listeners
 
+    Args:
+        process_before_response (bool): run the listeners before the response, must be True when running on FaaS
+            (False for the dev server, the lazy listeners run in threads)
+    """
     # On multiple workspaces
-    # process_before_response must be True when running on FaaS
     app = App(
-        process_before_response=True,
+        process_before_response=process_before_response,
         authorize=auth.authorize,
         request_verification_enabled=False,
     )
+    dedupe.instrument(app)
+    metrics.instrument(app)
+    logs.instrument(app)
     app.middleware(auth.verify)
+    app.middleware(rate_limit)
+    app.middleware(index_messages)
     """
     # On single workspace
     app =App(
@@ -39,19 +49,74 @@ def echo_bot(request):
     """
     listeners.listen(app)
 
+    # the threads of the lazy listeners are throttled after the response on FaaS
+    if process_before_response:
+        from utils.lazy import SelfInvokingLazyListenerRunner, SyncLazyListenerRunner
+
+        if url := os.environ.get("LAZY_FUNCTION_URL"):
+            # run them in new invocations of the function, the command is acknowledged first
+            app.listener_runner.lazy_listener_runner = SelfInvokingLazyListenerRunner(url, app.logger)
+        else:
+            app.logger.warning("LAZY_FUNCTION_URL is not set, the lazy listeners run before the response")
+            app.listener_runner.lazy_listener_runner = SyncLazyListenerRunner(app.logger)
+    return app
+
+
+def get_handler() -> "SlackRequestHandler":
+    """
+    get the Flask adapter of the app, build it on the first (cold) invocation
+    """
+    global _handler
+
+    if _handler is None:
+        with _handler_lock:
+            if _handler is None:
+                # Flask is only needed on the Cloud Function path
+                from slack_bolt.adapter.flask import SlackRequestHandler
+
+                logs.setup(logging.INFO)
+                _handler = SlackRequestHandler(create_app())
+    return _handler
+
+
+# Cloud Function
+def echo_bot(request):
+    """HTTP Cloud Function.
+    Args:
+        request (flask.Request): The request object.
+        <https://flask.palletsprojects.com/en/1.1.x/api/#incoming-request-data>
+    Returns:
+        The response text, or any set of values that can be turned into a
+        Response object using `make_response`
+        <https://flask.palletsprojects.com/en/1.1.x/api/#flask.make_response>.
+    """
     # Flask adapter
-    handler = SlackRequestHandler(app)
-    return handler.handle(request)
+    try:
+        return get_handler().handle(request)
+    finally:
+        # the instance has no metrics endpoint, write them to the structured logs
+        metrics.dump_if_due()
 
 
 if os.environ.get("ENV") == "dev":
     print("Development mode")
-    logging.basicConfig(level=logging.DEBUG)
+    logs.setup(logging.DEBUG)
     auth.SECRET_PATH = "auth/.env.yaml"
     listeners.commands.YAML_FILE = "config.yaml"
 
-    app = App(authorize=auth.authorize, request_verification_enabled=False)
-    app.middleware(auth.verify)
-    listeners.listen(app)
+    from flask import Flask, Response, request
+    from slack_bolt.adapter.flask import SlackRequestHandler as FlaskRequestHandler
+
+    handler = FlaskRequestHandler(create_app(process_before_response=False))
+
+    flask_app = Flask(__name__)
+
+    @flask_app.route("/slack/events", methods=["POST"])
+    def slack_events():
+        return handler.handle(request)
+
+    @flask_app.route("/metrics", methods=["GET"])
+    def serve_metrics():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
-    app.start(port=int(os.environ.get("PORT", 3000)))
+    flask_app.run(port=int(os.environ.get("PORT", 3000)))
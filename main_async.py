@@ -0,0 +1,60 @@
+import logging
+import os
+
+from aiohttp import web
+from slack_bolt.async_app import AsyncApp
+
+import auth
+import listeners
+import listeners.aio
+from utils import dedupe, jobs, logs, metrics
+from utils.messages import async_index_messages
+from utils.ratelimit import async_rate_limit
+
+
+def create_app() -> AsyncApp:
+    """
+    create the asyncio app for multiple workspaces and register the async listeners
+    """
+    app = AsyncApp(
+        authorize=auth.async_authorize,
+        request_verification_enabled=False,
+    )
+    dedupe.async_instrument(app)
+    metrics.async_instrument(app)
+    logs.async_instrument(app)
+    app.middleware(auth.async_verify)
+    app.middleware(async_rate_limit)
+    app.middleware(async_index_messages)
+    listeners.aio.listen(app)
+    return app
+
+
+async def web_app() -> web.Application:
+    """
+    aiohttp application factory
+
+        gunicorn main_async:web_app --worker-class aiohttp.GunicornWebWorker
+    """
+    logs.setup(logging.INFO)
+    jobs.resume()
+    application = create_app().web_app()
+    application.router.add_get("/metrics", serve_metrics)
+    return application
+
+
+async def serve_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=metrics.render(), content_type="text/plain")
+
+
+if __name__ == "__main__":
+    if os.environ.get("ENV") == "dev":
+        print("Development mode")
+        logs.setup(logging.DEBUG)
+        auth.SECRET_PATH = "auth/.env.yaml"
+        listeners.commands.YAML_FILE = "config.yaml"
+    else:
+        logs.setup(logging.INFO)
+
+    jobs.resume()
+    create_app().start(port=int(os.environ.get("PORT", 3000)))
@@ -0,0 +1,143 @@
+"""Socket Mode runtime for an always-on deployment
+
+The app keeps WebSocket connections open to Slack instead of receiving HTTP
+requests: no public URL, no request parsing nor signature verification per
+event, and no cold start. Each app token (`app_token` of the installations,
+or SLACK_APP_TOKEN) gets a connection per process, and the envelopes of each
+connection are dispatched to a pool of SOCKET_MODE_CONCURRENCY threads running
+the listeners of `listeners.listen`. The ack is sent back on the socket as
+soon as the ack function returns, the lazy listeners keep running in the
+thread pool of the app.
+
+With SOCKET_MODE_PROCESSES > 1, the app is built once and forked, and every
+process opens its own connections (Slack spreads the envelopes over up to
+10 connections per app).
+
+    python3 main_socket.py
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+from typing import List, Optional
+
+from slack_bolt import App
+from slack_bolt.adapter.socket_mode import SocketModeHandler
+from slack_sdk import WebClient
+
+import auth
+import listeners
+from utils import jobs, logs, metrics
+from utils.messages import index_messages
+from utils.ratelimit import rate_limit
+
+# number of processes, each with its own connections
+PROCESSES = int(os.environ.get("SOCKET_MODE_PROCESSES", 1))
+# number of threads dispatching the envelopes of each connection
+CONCURRENCY = int(os.environ.get("SOCKET_MODE_CONCURRENCY", 10))
+
+
+def create_app() -> App:
+    """
+    create the app for multiple workspaces and register the listeners
+
+    The envelopes come from the authenticated socket, there is no signature to verify (`auth.verify`).
+    """
+    # ack() is sent right away, the lazy listeners run in the thread pool of the app
+    app = App(authorize=auth.authorize, request_verification_enabled=False, process_before_response=False)
+    metrics.instrument(app)
+    logs.instrument(app)
+    app.middleware(rate_limit)
+    app.middleware(index_messages)
+    listeners.listen(app)
+    return app
+
+
+def get_app_tokens() -> List[str]:
+    """
+    get the app-level tokens (xapp-) of the installations and SLACK_APP_TOKEN
+    """
+    try:
+        tokens = [team.get("app_token") for team in auth.get_registry().values()]
+    except FileNotFoundError:  # single workspace, SLACK_APP_TOKEN only
+        tokens = []
+    tokens.append(os.environ.get("SLACK_APP_TOKEN"))
+    return list(dict.fromkeys(token for token in tokens if token))
+
+
+def connect(app: App, app_tokens: List[str], concurrency: int = CONCURRENCY, web_client: Optional[WebClient] = None) -> List[SocketModeHandler]:
+    """
+    open a connection per app token
+
+    Args:
+        app (App): app dispatching the envelopes
+        app_tokens (list): app-level tokens
+        concurrency (int): number of threads dispatching the envelopes of each connection
+        web_client (WebClient): client calling `apps.connections.open` (e.g. `benchmarks.socket_mode_stub.SocketModeStub`)
+
+    Returns:
+        (list): connected handlers
+    """
+    handlers = [SocketModeHandler(app, app_token=token, web_client=web_client, concurrency=concurrency) for token in app_tokens]
+    for handler in handlers:
+        handler.connect()
+    return handlers
+
+
+def run(app: App, app_tokens: List[str], level: int = logging.INFO) -> None:
+    """
+    connect and serve until SIGTERM or SIGINT, the metrics are written to the logs periodically
+    """
+    # the log writer thread doesn't survive fork, start it in every process
+    logs.setup(level)
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+
+    # the workers of the queue don't survive fork either
+    jobs.resume()
+    handlers = connect(app, app_tokens)
+    while not stopping.wait(max(metrics.DUMP_INTERVAL, 1)):
+        metrics.dump_if_due()
+    for handler in handlers:
+        handler.close()
+
+
+def serve(processes: int = PROCESSES, level: int = logging.INFO) -> None:
+    """
+    build the app once and serve it in the processes
+    """
+    if not (app_tokens := get_app_tokens()):
+        raise RuntimeError("No app token: set `app_token` of the installations or SLACK_APP_TOKEN")
+
+    app = create_app()
+    if processes <= 1:
+        run(app, app_tokens, level)
+        return
+
+    # fork after building the app, the processes share its memory copy-on-write
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=run, args=(app, app_tokens, level), name=f"socket-mode-{i}") for i in range(processes)]
+    for worker in workers:
+        worker.start()
+
+    def stop(*_):
+        for worker in workers:
+            if worker.is_alive():
+                os.kill(worker.pid, signal.SIGTERM)  # type: ignore[arg-type]
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    if os.environ.get("ENV") == "dev":
+        print("Development mode")
+        auth.SECRET_PATH = "auth/.env.yaml"
+        listeners.commands.YAML_FILE = "config.yaml"
+        serve(level=logging.DEBUG)
+    else:
+        serve()
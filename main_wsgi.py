@@ -0,0 +1,192 @@
+"""WSGI app factory for a long-running server (gunicorn)
+
+    gunicorn "main_wsgi:create_wsgi_app()"    # settings in gunicorn.conf.py
+
+With `preload_app` (see gunicorn.conf.py) the factory runs once in the master:
+the app, the installation registry and the remote config are loaded before
+fork, then frozen out of the garbage collector so the workers share them
+copy-on-write. The state that can't be shared (the log writer thread, the
+keep-alive connections of `utils.loader`) is reset in the forked workers.
+
+The app acks right away (process_before_response=False) and runs the lazy
+listeners in a pool of LAZY_WORKERS threads per worker. On shutdown the
+worker stops accepting requests, `/healthz` answers 503, and `drain` waits
+for the lazy listeners and the `/send` jobs in flight before exiting.
+
+- POST /slack/events: Slack requests
+- GET /healthz: 200 while serving, 503 while draining (no Slack, no disk)
+- GET /metrics: Prometheus text format
+"""
+import gc
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, List, Optional, Set
+
+from slack_bolt import App
+from slack_bolt.adapter.wsgi import SlackRequestHandler
+
+import auth
+import listeners
+from utils import dedupe, jobs, logs, metrics
+from utils.loader import read_yaml
+from utils.messages import index_messages
+from utils.ratelimit import rate_limit
+
+# threads running the lazy listeners of each worker
+LAZY_WORKERS = int(os.environ.get("LAZY_WORKERS", 16))
+
+
+class DrainableExecutor(ThreadPoolExecutor):
+    """
+    thread pool tracking its running tasks, so that they can be awaited with a timeout
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tasks: Set[Future] = set()
+        self.tasks_lock = threading.Lock()
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future = super().submit(fn, *args, **kwargs)
+        with self.tasks_lock:
+            self.tasks.add(future)
+        future.add_done_callback(self._discard)
+        return future
+
+    def _discard(self, future: Future) -> None:
+        with self.tasks_lock:
+            self.tasks.discard(future)
+
+    def drain(self, timeout: float) -> bool:
+        """
+        stop accepting tasks and wait for the submitted ones
+
+        Returns:
+            (bool): True if every task has finished in time
+        """
+        self.shutdown(wait=False)
+        with self.tasks_lock:
+            tasks = list(self.tasks)
+        _, pending = wait(tasks, timeout=timeout)
+        return not pending
+
+
+_draining = threading.Event()
+_executor: Optional[DrainableExecutor] = None
+
+
+def create_app() -> App:
+    """
+    create the app for multiple workspaces and register the listeners
+    """
+    global _executor
+
+    # threads are started on the first lazy listener, none of them exists at fork
+    _executor = DrainableExecutor(max_workers=LAZY_WORKERS, thread_name_prefix="lazy")
+    # ack() is sent right away, the lazy listeners run in the executor
+    app = App(
+        authorize=auth.authorize,
+        request_verification_enabled=False,
+        process_before_response=False,
+        listener_executor=_executor,
+    )
+    dedupe.instrument(app)
+    metrics.instrument(app)
+    logs.instrument(app)
+    app.middleware(auth.verify)
+    app.middleware(rate_limit)
+    app.middleware(index_messages)
+    listeners.listen(app)
+    return app
+
+
+def preload() -> None:
+    """
+    load the installation registry and the remote config into the caches of the process
+    """
+    for name, load in (("installations", auth.get_registry), ("config", lambda: read_yaml(listeners.commands.YAML_FILE))):
+        try:
+            load()
+        except Exception as e:
+            # served as before, loaded by the first request of each worker
+            logging.getLogger(__name__).warning(f"Failed to preload the {name}: {e}")
+
+
+def drain(timeout: float = 30) -> None:
+    """
+    fail the health checks, then wait for the lazy listeners and the running jobs (queued jobs stay in the queue)
+
+    Args:
+        timeout (float): seconds to wait for the lazy listeners and the jobs together
+    """
+    _draining.set()
+    deadline = time.monotonic() + timeout
+    if _executor is not None and not _executor.drain(timeout):
+        logging.getLogger(__name__).warning("Lazy listeners still running after the drain timeout")
+    jobs.stop(max(deadline - time.monotonic(), 0))
+    metrics.dump()
+
+
+def post_fork() -> None:
+    """
+    start the state of the worker that can't be forked: the workers of the queue resume the jobs left by a previous process
+    """
+    jobs.resume()
+
+
+def respond(start_response: Callable, status: str, body: str, content_type: str = "text/plain; charset=utf-8") -> List[bytes]:
+    data = body.encode()
+    start_response(status, [("Content-Type", content_type), ("Content-Length", str(len(data)))])
+    return [data]
+
+
+def create_wsgi_app(level: int = logging.INFO) -> Callable:
+    """
+    WSGI application factory
+
+        gunicorn "main_wsgi:create_wsgi_app()"
+
+    Args:
+        level (int): level of the logs
+
+    Returns:
+        (callable): WSGI application
+    """
+    logs.setup(level)
+    handler = SlackRequestHandler(create_app())
+    preload()
+    # keep the loaded objects out of the collections of the workers, which would copy their pages
+    gc.freeze()
+
+    def application(environ: dict, start_response: Callable) -> Iterable[bytes]:
+        path = environ.get("PATH_INFO", "")
+        if path == "/healthz":
+            if _draining.is_set():
+                return respond(start_response, "503 Service Unavailable", "draining")
+            return respond(start_response, "200 OK", "ok")
+        if path == "/metrics":
+            return respond(start_response, "200 OK", metrics.render(), "text/plain; version=0.0.4")
+        try:
+            return handler(environ, start_response)
+        finally:
+            metrics.dump_if_due()
+
+    return application
+
+
+if __name__ == "__main__":
+    # development server of the standard library, single process
+    from wsgiref.simple_server import make_server
+
+    level = logging.INFO
+    if os.environ.get("ENV") == "dev":
+        print("Development mode")
+        auth.SECRET_PATH = "auth/.env.yaml"
+        listeners.commands.YAML_FILE = "config.yaml"
+        level = logging.DEBUG
+    application = create_wsgi_app(level)
+    post_fork()
+    make_server("", int(os.environ.get("PORT", 3000)), application).serve_forever()
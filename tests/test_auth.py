@@ -0,0 +1,65 @@
+import logging
+import os
+
+import pytest
+
+import auth
+
+INSTALLATIONS = """
+INSTALLATIONS:
+    - team_id: T0000000001
+      signing_secret: secret-1
+      bot_token: xoxb-1
+      bot_user_id: U0BOT000001
+    - team_id: T0000000002
+      enterprise_id: E0000000001
+      signing_secret: secret-2
+      bot_token: xoxb-2
+    - team_id:
+      signing_secret:
+"""
+
+
+@pytest.fixture
+def secrets(tmp_path, monkeypatch):
+    path = tmp_path / "SECRETS"
+    path.write_text(INSTALLATIONS)
+    monkeypatch.setattr(auth, "SECRET_PATH", str(path))
+    monkeypatch.setattr(auth, "_registry", {})
+    monkeypatch.setattr(auth, "_registry_stat", None)
+    return path
+
+
+def test_installation_is_found_with_or_without_enterprise_id(secrets):
+    assert set(auth.get_registry()) == {(None, "T0000000001"), ("E0000000001", "T0000000002")}
+    assert auth.get_installation("E0000000001", "T0000000002")["bot_token"] == "xoxb-2"
+    # enterprise_id doesn't exist for some teams
+    assert auth.get_installation("E0000000001", "T0000000001")["bot_token"] == "xoxb-1"
+    assert auth.get_installation(None, "T0000000002") is None
+    assert auth.get_installation(None, "T0000000003") is None
+
+
+def test_registry_is_reloaded_only_when_the_file_changes(secrets, monkeypatch):
+    loads = []
+    load_installations = auth.load_installations
+    monkeypatch.setattr(auth, "load_installations", lambda path: loads.append(path) or load_installations(path))
+
+    registry = auth.get_registry()
+    assert auth.get_registry() is registry and len(loads) == 1
+
+    # replaced atomically (a new inode), as a mounted secret is
+    replacement = secrets.with_name("SECRETS.new")
+    replacement.write_text(INSTALLATIONS.replace("xoxb-1", "xoxb-rotated"))
+    os.replace(replacement, secrets)
+    assert auth.get_installation(None, "T0000000001")["bot_token"] == "xoxb-rotated"
+    assert len(loads) == 2
+
+
+def test_authorize(secrets, caplog):
+    logger = logging.getLogger(__name__)
+    result = auth.authorize(None, "T0000000001", logger)
+    assert (result.team_id, result.bot_token, result.bot_user_id) == ("T0000000001", "xoxb-1", "U0BOT000001")
+
+    with caplog.at_level(logging.ERROR):
+        assert auth.authorize(None, "T0000000003", logger) is None
+    assert "No authorization information was found" in caplog.text
@@ -0,0 +1,27 @@
+import pytest
+
+import utils.blocks as b
+import utils.models as m
+from benchmarks.blocks import CASES
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_template_renders_the_json_of_the_models(name):
+    model, template = CASES[name]
+    assert template() == model()
+
+
+def test_metadata_renders_the_json_of_the_models():
+    payload = {"user_id": "U0000000001", "text": "hi"}
+    assert b.metadata("echo", payload) == m.metadata(event_type="echo", event_payload=payload).to_dict()
+
+
+def test_only_the_dynamic_fields_are_built_per_message():
+    first, second = b.rand_blocks(["U0000000001"], "U0000000001", "/shuffle"), b.rand_blocks(["U0000000002"], "U0000000002", "/choices")
+    assert first[1] is second[1] is b.DIVIDER
+    assert first[0]["text"]["text"] == "1. <@U0000000001>\n" and second[0]["text"]["text"] == "1. <@U0000000002>\n"
+    assert second[2]["elements"][0]["text"] == "<@U0000000002>님이 `/choices`를 실행하였습니다."
+
+    edit = b.edit_blocks("hello")
+    assert edit[1] is b.EDIT_ACTIONS and edit[0]["element"]["initial_value"] == "hello"
+    assert b.edit_blocks("bye")[0]["element"] is not edit[0]["element"]
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+from slack_bolt import Say as BoltSay
+
+from benchmarks.fixtures import CHANNEL_ID, TEAM_ID, USER_ID, USER_IDS, FakeRespond, FakeWebClient, command
+from listeners import commands
+from utils import lookups, messages
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    index = messages.MessageIndex(str(tmp_path / "messages.sqlite3"))
+    monkeypatch.setattr(messages, "_index", index)
+    index.add(messages.Message(TEAM_ID, CHANNEL_ID, f"{time.time() - 60:.6f}", "echo", USER_ID))
+    return index
+
+
+class Say:
+    def __init__(self):
+        self.messages = []
+
+    def __call__(self, text: str = "", **kwargs):
+        self.messages.append(text)
+
+
+@pytest.mark.parametrize("text", ["purgers the old files", "purged", "purge-all"])
+def test_echo_text_starting_with_purge_is_echoed(index, text):
+    client, respond, say = FakeWebClient(token="xoxb-test"), FakeRespond(), Say()
+    commands.echo(client, command("/echo", text), respond, say)
+
+    assert say.messages == [text]
+    assert not [method for method, _ in client.calls if method == "chat.delete"]
+    assert len(index.find(TEAM_ID)) == 1
+
+
+def test_echo_purge_deletes_the_messages_of_the_range(index):
+    client, respond, say = FakeWebClient(token="xoxb-test"), FakeRespond(), Say()
+    commands.echo(client, command("/echo", "purge 2h"), respond, say)
+
+    assert say.messages == []
+    assert [method for method, _ in client.calls if method == "chat.delete"] == ["chat.delete"]
+    assert index.find(TEAM_ID) == []
+
+
+def test_get_purge_text():
+    assert commands.get_purge_text("/echo purge <#C0123456789> 2h", "purge <#C0123456789> 2h") == "<#C0123456789> 2h"
+    assert commands.get_purge_text("/echo purge", "purge") == ""
+    assert commands.get_purge_text("/echo purgers", "purgers") is None
+    assert commands.get_purge_text("/anonymous purge", "purge") is None
+
+
+def test_meet_groups_leave_out_the_user(monkeypatch):
+    monkeypatch.setattr(commands, "MEET_DELIVERY", "group")
+    assert commands.get_meet_groups(USER_ID, USER_IDS[:8]) == [USER_IDS[:8]]
+    assert commands.get_meet_groups(USER_ID, [USER_ID, USER_IDS[0]]) == [[USER_IDS[0]]]
+    assert commands.get_meet_groups(USER_ID, [USER_ID]) == []
+    assert commands.get_meet_groups(USER_ID, USER_IDS[:9]) == [[user] for user in USER_IDS[:9]]
+
+
+class FailingWebClient(FakeWebClient):
+    """
+    fails the posts to the group DMs
+    """
+
+    def response(self, api_method, args):
+        if api_method == "chat.postMessage" and str(args.get("channel")).startswith("G"):
+            return {"ok": False, "error": "channel_not_found"}
+        return super().response(api_method, args)
+
+
+@pytest.mark.parametrize("client_class", [FakeWebClient, FailingWebClient])
+def test_meet_with_8_users_takes_2_posts(monkeypatch, client_class):
+    monkeypatch.setattr(commands, "MEET_DELIVERY", "group")
+    monkeypatch.setattr(lookups, "_responses", lookups.LRUCache(100))
+    client, respond = client_class(token="xoxb-test"), FakeRespond()
+    users = " ".join(f"<@{user}>" for user in USER_IDS[:8])
+    commands.meet(client, command("/meet", users), respond, BoltSay(client, CHANNEL_ID))
+
+    methods = [method for method, _ in client.calls]
+    assert methods.count("conversations.open") == 1 and methods.count("chat.postMessage") == 2
+    if client_class is FailingWebClient:
+        assert respond.messages == [{"text": f"{users}로 회의 링크 보내기를 실패하였습니다. 채널에 앱이 존재하지 않습니다."}]
+    else:
+        assert respond.messages == []
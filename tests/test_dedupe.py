@@ -0,0 +1,27 @@
+from slack_bolt import App, BoltRequest
+
+from utils import dedupe, lookups
+
+
+def test_dedupe_drops_only_retries(monkeypatch):
+    monkeypatch.setattr(dedupe, "_seen", lookups.LRUCache(100))
+    calls = []
+
+    def authorize(team_id):
+        calls.append(team_id)
+
+    app = App(authorize=authorize, request_verification_enabled=False, process_before_response=True)
+    dedupe.instrument(app)
+    body = "command=%2Fecho&text=hi&team_id=T1&trigger_id=111.222.abc&user_id=U1&channel_id=C1"
+
+    app.dispatch(BoltRequest(body=body))
+    # the same request without the retry header is handled again
+    app.dispatch(BoltRequest(body=body))
+    assert len(calls) == 2
+
+    response = app.dispatch(BoltRequest(body=body, headers={"x-slack-retry-num": "1"}))
+    assert response.status == 200 and len(calls) == 2
+
+    # a retry of an unknown request is handled
+    app.dispatch(BoltRequest(body=body.replace("111.222.abc", "333.444.def"), headers={"x-slack-retry-num": "1"}))
+    assert len(calls) == 3
@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.fixtures import CHANNEL_ID, FakeWebClient
+from utils import executor
+
+
+@pytest.fixture(autouse=True)
+def fast(monkeypatch):
+    monkeypatch.setattr(executor, "TIMEOUT", 1.0)
+    monkeypatch.setattr(executor, "UPDATE_INTERVAL", 0.2)
+
+
+def metadata() -> dict:
+    return {"event_type": "echo", "event_payload": {}}
+
+
+def say(text: str = "", **kwargs) -> dict:
+    return {"channel": CHANNEL_ID, "ts": "1700000000.000100"}
+
+
+class AsyncClient:
+    """
+    async client recording the calls of `executor.async_run`
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    async def chat_update(self, **kwargs):
+        self.calls.append(("chat.update", kwargs))
+
+    async def files_upload_v2(self, **kwargs):
+        self.calls.append(("files.upload", kwargs))
+
+
+async def async_say(text: str = "", **kwargs) -> dict:
+    return say(text, **kwargs)
+
+
+def async_run(client: AsyncClient, command: str) -> str:
+    async def run() -> str:
+        text = await executor.async_run(client, async_say, command, metadata())
+        # the transport of the process is closed on the next iterations of the loop
+        await asyncio.sleep(0.1)
+        return text
+
+    return asyncio.run(run())
+
+
+def test_output_keeps_the_head_and_the_tail(monkeypatch):
+    monkeypatch.setattr(executor, "MAX_FILE_SIZE", 5000)
+    output = executor.Output()
+    for i in range(10):
+        output.write(bytes([ord("a") + i]) * 1000)
+
+    assert output.truncated and output.size == 10000
+    assert output.text() == f"{'a' * 1000}\n... (7000 bytes) ...\n{'i' * 1000}{'j' * 1000}"
+    assert output.read() == b"".join(bytes([ord("a") + i]) * 1000 for i in range(5))
+    output.close()
+
+
+def test_short_output_is_not_truncated():
+    output = executor.Output()
+    output.write(b"hello\n")
+    assert not output.truncated and output.text() == "hello\n"
+    output.close()
+
+
+def test_command_runs_with_the_limits():
+    text = executor.run(FakeWebClient(token="xoxb-test"), say, "ulimit -n; grep 'Max processes' /proc/self/limits", metadata())
+    lines = text.split("```")[1].splitlines()
+    assert lines[0] == "64"
+    # over the processes of the user, which may have changed meanwhile
+    assert abs(int(lines[1].split()[2]) - executor.get_process_count() - executor.MAX_PROCESSES) < executor.MAX_PROCESSES
+
+
+def test_timed_out_command_is_killed():
+    client = FakeWebClient(token="xoxb-test")
+    started_at = time.monotonic()
+    text = executor.run(client, say, "echo started; sleep 30", metadata())
+
+    assert time.monotonic() - started_at < 5
+    assert "started" in text and "초가 지나 중단되었습니다" in text
+
+
+@pytest.mark.parametrize("runner", ["sync", "async"])
+def test_background_process_does_not_hold_the_command(runner):
+    started_at = time.monotonic()
+    command = "sleep 30 & echo done"
+    if runner == "sync":
+        text = executor.run(FakeWebClient(token="xoxb-test"), say, command, metadata())
+    else:
+        text = async_run(AsyncClient(), command)
+
+    assert time.monotonic() - started_at < 5
+    assert "done" in text and "중단되었습니다" not in text
+
+
+def test_async_timed_out_command_is_killed():
+    client = AsyncClient()
+    started_at = time.monotonic()
+    text = async_run(client, "echo started; sleep 30")
+
+    assert time.monotonic() - started_at < 5
+    assert "started" in text and "초가 지나 중단되었습니다" in text
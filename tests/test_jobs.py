@@ -0,0 +1,105 @@
+import time
+
+import pytest
+from slack_sdk.errors import SlackApiError
+
+from utils import jobs
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return jobs.JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+def make_batch(batch_id: str = "send:1234.5678.abcd") -> jobs.Batch:
+    return jobs.Batch(batch_id, "test", None, "T1", "U1", "C1", None, {"text": "hi"}, time.time())
+
+
+class Recorder:
+    """
+    handler of the `test` batches, fails the first deliveries with `errors`
+    """
+
+    def __init__(self, *errors: Exception, delivered: bool = False):
+        self.errors = list(errors)
+        self.deliveries = []
+        self.checks = []
+        self.is_delivered = delivered
+
+    def deliver(self, client, batch, job):
+        self.deliveries.append(job)
+        if self.errors:
+            raise self.errors.pop(0)
+
+    def delivered(self, client, batch, job):
+        self.checks.append(job)
+        return self.is_delivered
+
+    def report(self, batch, failures, total):
+        return None
+
+
+@pytest.fixture
+def pool(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "BACKOFF", (0.0, 0.0))
+    pool = jobs.WorkerPool(queue, workers=0)
+    pool.clients[(None, "T1")] = object()
+    return pool
+
+
+def test_enqueue_is_idempotent(queue):
+    batch = make_batch()
+    assert queue.enqueue(batch, ["C2", "C3", "C2"]) == 2
+    # the same request (same trigger_id) again
+    assert queue.enqueue(batch, ["C2", "C3"]) == 0
+    assert list(queue.get_results(batch.id)) == ["C2", "C3"]
+
+
+def test_expired_lease_is_redelivered_as_uncertain(queue, monkeypatch):
+    queue.enqueue(make_batch(), ["C2"])
+    job = queue.claim()
+    assert job is not None and job.attempts == 1 and not job.uncertain
+    # leased: not claimed again
+    assert queue.claim() is None
+
+    # the worker died, its lease expires
+    now = time.time()
+    monkeypatch.setattr(jobs.time, "time", lambda: now + jobs.LEASE + 1)
+    job = queue.claim()
+    assert job is not None and job.attempts == 2 and job.uncertain
+
+
+def test_network_error_makes_the_retry_uncertain(queue, pool):
+    recorder = Recorder(ConnectionResetError(), delivered=True)
+    jobs.register("test", jobs.Handler(recorder.deliver, recorder.report, recorder.delivered))
+    queue.enqueue(make_batch(), ["C2"])
+
+    assert pool.run_once()
+    assert recorder.checks == []
+    assert pool.run_once()
+    # checked, found delivered, not posted again
+    assert len(recorder.checks) == 1 and len(recorder.deliveries) == 1
+    assert queue.get_results(make_batch().id) == {"C2": ("done", None)}
+
+
+def test_rate_limited_retry_is_certain(queue, pool):
+    response = type("Response", (), {"status_code": 429, "get": lambda self, key, default=None: "ratelimited"})()
+    recorder = Recorder(SlackApiError("ratelimited", response))
+    jobs.register("test", jobs.Handler(recorder.deliver, recorder.report, recorder.delivered))
+    queue.enqueue(make_batch(), ["C2"])
+
+    assert pool.run_once() and pool.run_once()
+    assert recorder.checks == [] and len(recorder.deliveries) == 2
+
+
+def test_claim_report_has_a_single_caller(queue):
+    batch = make_batch()
+    queue.enqueue(batch, ["C2", "C3"])
+    first = queue.claim()
+    queue.finish(first)
+    # a job is still pending
+    assert not queue.claim_report(batch.id)
+
+    queue.finish(queue.claim(), "channel_not_found")
+    assert queue.claim_report(batch.id)
+    assert not queue.claim_report(batch.id)
@@ -0,0 +1,49 @@
+import threading
+import time
+
+import pytest
+from slack_bolt import App, BoltRequest
+from slack_bolt.authorization import AuthorizeResult
+
+import listeners
+import main
+from benchmarks.fixtures import command, encode
+from utils.lazy import ResponseUrlStub, SelfInvokingLazyListenerRunner, SyncLazyListenerRunner
+
+
+def test_command_is_acknowledged_before_the_lazy_listener(monkeypatch):
+    release = threading.Event()
+
+    def get_help_message(context):
+        # slow config fetch
+        release.wait(5)
+        return f"help of {context}"
+
+    monkeypatch.setattr(listeners.commands, "get_help_message", get_help_message)
+    app = App(
+        authorize=lambda enterprise_id, team_id: AuthorizeResult(enterprise_id=enterprise_id, team_id=team_id, bot_token="xoxb-test"),
+        request_verification_enabled=False,
+        process_before_response=False,
+    )
+    listeners.listen(app)
+
+    with ResponseUrlStub() as stub:
+        payload = command("/choices", "help")
+        payload["response_url"] = stub.url
+        response = app.dispatch(BoltRequest(body=encode(payload)))
+        assert response.status == 200 and stub.messages == []
+
+        release.set()
+        deadline = time.monotonic() + 5
+        while not stub.messages and time.monotonic() < deadline:
+            time.sleep(0.01)
+    assert [message["text"] for message in stub.messages] == ["help of choices"]
+
+
+@pytest.mark.parametrize("url, runner", [("https://example.com/echo_bot", SelfInvokingLazyListenerRunner), (None, SyncLazyListenerRunner)])
+def test_faas_app_never_runs_lazy_listeners_in_threads(monkeypatch, url, runner):
+    if url:
+        monkeypatch.setenv("LAZY_FUNCTION_URL", url)
+    else:
+        monkeypatch.delenv("LAZY_FUNCTION_URL", raising=False)
+    assert isinstance(main.create_app().listener_runner.lazy_listener_runner, runner)
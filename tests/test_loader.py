@@ -0,0 +1,116 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils import loader
+
+
+class ConfigServer:
+    """
+    local stand-in for the remote config, answers If-None-Match with 304 and records the requests
+    """
+
+    def __init__(self, text: str):
+        self.text, self.etag, self.status = text, '"1"', 200
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self.headers.get("If-None-Match"))
+                if server.status != 200:
+                    self.send_response(server.status)
+                    self.end_headers()
+                elif self.headers.get("If-None-Match") == server.etag:
+                    self.send_response(304)
+                    self.end_headers()
+                else:
+                    body = server.text.encode()
+                    self.send_response(200)
+                    self.send_header("ETag", server.etag)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/config.yaml"
+
+    def update(self, text: str, etag: str) -> None:
+        self.text, self.etag = text, etag
+
+    def __enter__(self) -> "ConfigServer":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(loader, "_cache", {})
+    monkeypatch.setattr(loader, "_seeds", {})
+    with ConfigServer("name: first\n") as server:
+        yield server
+
+
+def revalidated(url: str) -> None:
+    """
+    wait for the background revalidation of the url
+    """
+    entry = loader._cache[(url, "_parse_yaml")]
+    deadline = time.monotonic() + 5
+    while entry["refreshing"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_fresh_file_is_served_from_the_cache(server):
+    assert loader.read_yaml(server.url) == {"name": "first"}
+    assert loader.read_yaml(server.url) is loader.read_yaml(server.url)
+    assert server.requests == [None]
+
+
+def test_stale_file_is_served_while_it_is_revalidated(server, monkeypatch):
+    monkeypatch.setattr(loader, "CACHE_TTL", 0.0)
+    first = loader.read_yaml(server.url)
+
+    # not modified, the snapshot is kept
+    assert loader.read_yaml(server.url) is first
+    revalidated(server.url)
+    assert server.requests == [None, '"1"']
+    assert loader.read_yaml(server.url) is first
+
+    # modified, the stale snapshot is served once more
+    revalidated(server.url)
+    server.update("name: second\n", '"2"')
+    assert loader.read_yaml(server.url) is first
+    revalidated(server.url)
+    assert loader.read_yaml(server.url) == {"name": "second"}
+    revalidated(server.url)
+
+
+def test_failed_revalidation_keeps_the_last_snapshot(server, monkeypatch):
+    monkeypatch.setattr(loader, "CACHE_TTL", 0.0)
+    first = loader.read_yaml(server.url)
+    server.status = 403
+    assert loader.read_yaml(server.url) is first
+    revalidated(server.url)
+    assert loader.read_yaml(server.url) is first
+    revalidated(server.url)
+
+
+def test_seed_is_served_before_the_first_fetch(server):
+    loader.seed(server.url, lambda: {"name": "snapshot"})
+    assert loader.read_yaml(server.url) == {"name": "snapshot"}
+    assert server.requests == []
+
+    # stale, revalidated on the next read
+    assert loader.read_yaml(server.url) == {"name": "snapshot"}
+    revalidated(server.url)
+    assert loader.read_yaml(server.url) == {"name": "first"}
@@ -0,0 +1,24 @@
+from utils import lookups
+
+
+def test_lru_cache_add_once_until_expired(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(lookups.time, "monotonic", lambda: now[0])
+    cache = lookups.LRUCache(2)
+
+    assert cache.add("a", 1, ttl=10)
+    assert not cache.add("a", 2, ttl=10)
+    assert cache.get("a") == 1
+
+    now[0] += 10
+    assert cache.get("a") is None
+    assert cache.add("a", 3, ttl=10)
+    assert cache.get("a") == 3
+
+
+def test_lru_cache_is_bounded():
+    cache = lookups.LRUCache(2)
+    for key in "abc":
+        cache.set(key, key, ttl=60)
+    assert cache.get("a") is None
+    assert cache.get("c") == "c"
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fixtures import BOT_USER_ID, CHANNEL_ID, TEAM_ID, FakeWebClient
+from utils import members
+
+
+class AsyncWebClient:
+    """
+    async wrapper of the fake client
+    """
+
+    def __init__(self, client: FakeWebClient):
+        self.client = client
+
+    async def conversations_members(self, **kwargs):
+        return self.client.conversations_members(**kwargs)
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    monkeypatch.setattr(members, "_cache", {})
+    monkeypatch.setattr(members, "PAGE_SIZE", 3)
+
+
+def calls(client: FakeWebClient) -> int:
+    return len([method for method, _ in client.calls if method == "conversations.members"])
+
+
+@pytest.mark.parametrize("runner", ["sync", "async"])
+def test_sampling_pass_fills_the_cache(runner):
+    client = FakeWebClient(token="xoxb-test")
+    exclude = lambda users: {BOT_USER_ID} & set(users)  # noqa: E731
+    if runner == "sync":
+        chosen = members.sample_members(client, TEAM_ID, CHANNEL_ID, 2, exclude)
+    else:
+        async def async_exclude(users):
+            return exclude(users)
+
+        chosen = asyncio.run(members.async_sample_members(AsyncWebClient(client), TEAM_ID, CHANNEL_ID, 2, async_exclude))
+
+    pages = calls(client)
+    assert len(chosen) == 2 and BOT_USER_ID not in chosen and pages > 1
+    # the bots are cached too, they are excluded when sampling
+    assert members._cache[(TEAM_ID, CHANNEL_ID)][1] == frozenset(client.members)
+
+    assert BOT_USER_ID not in members.sample_members(client, TEAM_ID, CHANNEL_ID, len(client.members), exclude)
+    assert members.get_members(client, TEAM_ID, CHANNEL_ID) == frozenset(client.members)
+    assert calls(client) == pages
@@ -0,0 +1,35 @@
+import pytest
+from slack_bolt import App, BoltRequest
+from slack_bolt.authorization import AuthorizeResult
+
+from benchmarks.fixtures import command, encode
+from listeners.commands import get_values
+from utils import metrics
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(metrics, "_metrics", {name: {} for name in metrics.METRICS})
+    app = App(
+        authorize=lambda enterprise_id, team_id: AuthorizeResult(enterprise_id=enterprise_id, team_id=team_id, bot_token="xoxb-test"),
+        request_verification_enabled=False,
+        process_before_response=True,
+    )
+    metrics.instrument(app)
+
+    @app.command("/echo")
+    def echo(ack, command):
+        ack()
+        # pops the command and the text from the body of the request
+        get_values(command, ["text", "context"])
+
+    return app
+
+
+def test_request_is_recorded_by_command(app):
+    app.dispatch(BoltRequest(body=encode(command("/echo", "hi"))))
+
+    requests = metrics._metrics["echo_request_duration_seconds"]
+    assert list(requests) == [(("lazy", "false"), ("listener", "/echo"))]
+    assert list(metrics._metrics["echo_ack_duration_seconds"]) == [(("listener", "/echo"),)]
+    assert 'echo_request_duration_seconds_count{lazy="false",listener="/echo"} 1' in metrics.render()
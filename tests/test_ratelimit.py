@@ -0,0 +1,55 @@
+import pytest
+
+from benchmarks.fixtures import CHANNEL_ID, TEAM_ID
+from utils import lookups, ratelimit
+
+
+@pytest.fixture(autouse=True)
+def buckets(monkeypatch):
+    monkeypatch.setattr(ratelimit, "_buckets", lookups.LRUCache(3))
+    monkeypatch.setattr(ratelimit, "_stats", {})
+
+
+def test_bucket_waits_once_the_burst_is_spent():
+    bucket = ratelimit.TokenBucket(rate=10.0, capacity=2)
+    assert bucket.reserve() == bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+    assert bucket.stats.calls == 4 and bucket.stats.waits == 2
+
+
+def test_paused_bucket_waits_for_the_retry_after():
+    bucket = ratelimit.TokenBucket(rate=10.0, capacity=5)
+    bucket.pause(3)
+    assert bucket.reserve() == pytest.approx(3, abs=0.01)
+    assert bucket.stats.rate_limited == 1
+
+
+def test_bucket_is_keyed_per_channel_for_chat_post_message():
+    bucket = ratelimit.get_bucket(TEAM_ID, "chat.postMessage", CHANNEL_ID)
+    assert ratelimit.get_bucket(TEAM_ID, "chat.postMessage", CHANNEL_ID) is bucket
+    assert ratelimit.get_bucket(TEAM_ID, "chat.postMessage", "C0000000002") is not bucket
+    assert (bucket.rate, bucket.capacity) == ratelimit.CHANNEL_LIMITED_METHODS["chat.postMessage"]
+
+    users = ratelimit.get_bucket(TEAM_ID, "users.list")
+    assert (users.rate, users.capacity) == (20 / 60, 20)
+
+
+def test_buckets_are_bounded_and_keep_their_metrics():
+    channels = [f"C{i:010d}" for i in range(10)]
+    for channel in channels:
+        ratelimit.get_bucket(TEAM_ID, "chat.postMessage", channel).reserve()
+
+    assert len(ratelimit._buckets.entries) == 3
+    # the least recently used buckets are dropped, the metrics of the method are kept
+    assert ratelimit._buckets.get((TEAM_ID, f"chat.postMessage:{channels[0]}")) is None
+    assert ratelimit.get_metrics() == {
+        (TEAM_ID, "chat.postMessage"): {"calls": 10, "waits": 0, "wait_seconds": 0.0, "rate_limited": 0}
+    }
+
+
+def test_idle_bucket_expires(monkeypatch):
+    monkeypatch.setattr(ratelimit, "BUCKET_TTL", 0.0)
+    bucket = ratelimit.get_bucket(TEAM_ID, "chat.update")
+    assert ratelimit.get_bucket(TEAM_ID, "chat.update") is not bucket
+    assert ratelimit.get_bucket(TEAM_ID, "chat.update").stats is bucket.stats
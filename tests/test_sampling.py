@@ -0,0 +1,18 @@
+import random
+
+from utils.sampling import Reservoir
+
+
+def test_reservoir_keeps_k_distinct_items():
+    reservoir: Reservoir[int] = Reservoir(5, random.Random(0))
+    for start in range(0, 10000, 1000):
+        reservoir.extend(range(start, start + 1000))
+    sample = reservoir.sample()
+    assert len(sample) == len(set(sample)) == 5
+    assert all(0 <= item < 10000 for item in sample)
+
+
+def test_reservoir_keeps_all_items_of_a_short_stream():
+    reservoir: Reservoir[int] = Reservoir(5)
+    reservoir.extend([1, 2, 3])
+    assert sorted(reservoir.sample()) == [1, 2, 3]
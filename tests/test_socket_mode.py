@@ -0,0 +1,40 @@
+import threading
+
+from slack_bolt import App
+from slack_bolt.authorization import AuthorizeResult
+from slack_sdk import WebClient
+
+import main_socket
+from benchmarks.fixtures import command
+from benchmarks.socket_mode_stub import SocketModeStub
+
+
+def test_ack_is_sent_on_the_socket_before_the_lazy_listener_finishes():
+    release, finished = threading.Event(), threading.Event()
+    app = App(
+        authorize=lambda enterprise_id, team_id: AuthorizeResult(enterprise_id=enterprise_id, team_id=team_id, bot_token="xoxb-test"),
+        request_verification_enabled=False,
+        process_before_response=False,
+    )
+
+    def slow_listener():
+        release.wait(5)
+        finished.set()
+
+    app.command("/echo")(ack=lambda ack: ack(), lazy=[slow_listener])
+
+    with SocketModeStub() as stub:
+        handlers = main_socket.connect(app, ["xapp-test"], concurrency=2, web_client=WebClient(base_url=stub.api_url))
+        try:
+            assert stub.wait_for_connections(1, timeout=5)
+            envelope_id = stub.send("slash_commands", command("/echo", "hi"))
+
+            ack = stub.wait_for_ack(envelope_id, timeout=5)
+            assert ack is not None and ack["envelope_id"] == envelope_id
+            assert not finished.is_set()
+            release.set()
+            assert finished.wait(5)
+        finally:
+            release.set()
+            for handler in handlers:
+                handler.close()
@@ -0,0 +1,43 @@
+import pytest
+
+from utils.text import Token, cut, get_channels, get_emojis, get_urls, get_users, tokenize
+
+TEXT = "hi <@U0123456789|kim> in <#C0123456789|general> :wave: see <https://example.com/a?b=1|docs> and <@W0123456789>"
+
+
+def test_tokenize_finds_the_entities_in_order():
+    tokens = tokenize(TEXT)
+    assert [(t.kind, t.value) for t in tokens] == [
+        ("user", "U0123456789"),
+        ("channel", "C0123456789"),
+        ("emoji", ":wave:"),
+        ("url", "https://example.com/a?b=1"),
+        ("user", "W0123456789"),
+    ]
+    assert all(isinstance(t, Token) for t in tokens)
+    assert TEXT[tokens[0].start : tokens[0].end] == "<@U0123456789|kim>"
+
+
+@pytest.mark.parametrize("text", ["", "plain text", "<@U123>", "<#X0123456789>", ": not an emoji :", "<ftp://example.com>"])
+def test_tokenize_ignores_the_plain_text(text):
+    assert tokenize(text) == []
+
+
+def test_getters_share_the_tokens():
+    tokens = tokenize(TEXT)
+    assert get_users(TEXT, tokens) == get_users(TEXT) == ["U0123456789", "W0123456789"]
+    assert get_channels(TEXT, tokens) == ["C0123456789"]
+    assert get_emojis(TEXT, tokens) == [":wave:"]
+    # the urls are kept escaped
+    assert get_urls(TEXT, tokens) == ["<https://example.com/a?b=1|docs>"]
+    # the tokens are trusted, not parsed again
+    assert get_users(TEXT, []) == []
+
+
+def test_cut_removes_the_entity_and_the_following_whitespaces():
+    text = "<#C0123456789>   hello <@U0123456789>"
+    channel, user = tokenize(text)
+    assert cut(text, channel) == "hello <@U0123456789>"
+    # kept if it isn't followed by whitespaces
+    assert cut(text, user) == text
+    assert cut("<#C0123456789>hello", tokenize("<#C0123456789>hello")[0]) == "<#C0123456789>hello"
@@ -0,0 +1,75 @@
+import gc
+import logging
+import threading
+import time
+from pathlib import Path
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+
+import auth
+import listeners
+import main_wsgi
+from utils import logs
+
+
+@pytest.fixture
+def application(tmp_path, monkeypatch):
+    # preloaded from the local files, as in development
+    secrets = tmp_path / "SECRETS"
+    secrets.write_text("INSTALLATIONS: []\n")
+    monkeypatch.setattr(auth, "SECRET_PATH", str(secrets))
+    monkeypatch.setattr(auth, "_registry", {})
+    monkeypatch.setattr(auth, "_registry_stat", None)
+    monkeypatch.setattr(listeners.commands, "YAML_FILE", str(Path(__file__).parent.parent / "config.yaml"))
+    # keep the logs of the other tests out of the background writer
+    monkeypatch.setattr(logs, "setup", lambda level: None)
+    monkeypatch.setattr(main_wsgi, "_draining", threading.Event())
+    application = main_wsgi.create_wsgi_app()
+    gc.unfreeze()
+    yield application
+    main_wsgi._executor.shutdown(wait=False)
+
+
+def get(application, path: str):
+    environ = {"PATH_INFO": path}
+    setup_testing_defaults(environ)
+    response = {}
+
+    def start_response(status, headers):
+        response.update(status=status, headers=dict(headers))
+
+    body = b"".join(application(environ, start_response))
+    return response["status"], response["headers"], body.decode()
+
+
+def test_health_check_fails_while_draining(application):
+    assert get(application, "/healthz")[::2] == ("200 OK", "ok")
+    main_wsgi.drain(timeout=1)
+    assert get(application, "/healthz")[::2] == ("503 Service Unavailable", "draining")
+
+
+def test_metrics_are_served_in_the_prometheus_format(application):
+    status, headers, _ = get(application, "/metrics")
+    assert status == "200 OK" and headers["Content-Type"] == "text/plain; version=0.0.4"
+
+
+def test_drain_waits_for_the_lazy_listeners(application):
+    finished = threading.Event()
+    main_wsgi._executor.submit(lambda: time.sleep(0.2) or finished.set())
+    main_wsgi.drain(timeout=5)
+    assert finished.is_set()
+    with pytest.raises(RuntimeError):
+        main_wsgi._executor.submit(print)
+
+
+def test_drain_is_bounded_by_the_timeout(application, caplog):
+    release = threading.Event()
+    main_wsgi._executor.submit(release.wait, 10)
+    started_at = time.monotonic()
+    with caplog.at_level(logging.WARNING):
+        main_wsgi.drain(timeout=0.2)
+    release.set()
+
+    assert time.monotonic() - started_at < 2
+    assert "Lazy listeners still running after the drain timeout" in caplog.text
@@ -0,0 +1,93 @@
+"""Block Kit templates as plain dicts
+
+The messages of the listeners are built from these templates instead of the
+`utils.models` objects, which validate and serialize (`to_dict`) on every
+call. The static parts are built once and shared between messages; only the
+dynamic fields are filled per request. The shared parts must not be modified.
+
+Each template renders the same JSON as the `utils.models` version it replaces.
+"""
+from typing import Any, Dict, List
+
+DIVIDER = {"type": "divider"}
+
+# the edit input/actions pair of the `edit_message` shortcut
+EDIT_LABEL = {"type": "plain_text", "text": "메시지 편집"}
+EDIT_ACTIONS = {
+    "type": "actions",
+    "elements": [
+        {
+            "type": "button",
+            "action_id": "cancel_edit",
+            "style": "danger",
+            "text": {"type": "plain_text", "text": ":x: 취소", "emoji": True},
+        },
+        {
+            "type": "button",
+            "action_id": "save_edit",
+            "style": "primary",
+            "text": {"type": "plain_text", "text": ":heavy_check_mark: 저장", "emoji": True},
+        },
+    ],
+}
+
+MEET_BUTTON_TEXT = {"type": "plain_text", "text": "Google Meet 참여하기"}
+
+
+def section(text: str) -> Dict[str, Any]:
+    """
+    section block of the mrkdwn text
+    """
+    return {"type": "section", "text": {"type": "mrkdwn", "text": text}}
+
+
+def footer(user_id: str, context: str) -> Dict[str, Any]:
+    """
+    context block of the user and the command
+    """
+    return {"type": "context", "elements": [{"type": "mrkdwn", "text": f"<@{user_id}>님이 `{context}`를 실행하였습니다."}]}
+
+
+def text_attachments(text: str) -> List[Dict[str, Any]]:
+    """
+    gray attachment of the mrkdwn text (mentioned channels of `/echo` and `/send`)
+    """
+    return [{"color": "#d0d0d0", "blocks": [section(text)]}]
+
+
+def metadata(event_type: str, event_payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    message metadata
+    """
+    return {"event_type": event_type, "event_payload": event_payload}
+
+
+def rand_blocks(members: list, user_id: str, context: str) -> List[Dict[str, Any]]:
+    """
+    blocks of the `/shuffle` and `/choices` message
+    """
+    text = "".join(f"{i}. <@{user}>\n" for i, user in enumerate(members, 1))
+    return [section(text), DIVIDER, footer(user_id, context)]
+
+
+def meet_blocks(link: str, user_id: str, context: str) -> List[Dict[str, Any]]:
+    """
+    blocks of the `/meet` message
+    """
+    button = {"type": "button", "action_id": "join_meet", "text": MEET_BUTTON_TEXT, "url": link}
+    return [{"type": "actions", "elements": [button]}, DIVIDER, footer(user_id, context)]
+
+
+def edit_blocks(text: str) -> List[Dict[str, Any]]:
+    """
+    blocks to edit the message
+    """
+    element = {
+        "type": "plain_text_input",
+        "action_id": "input",
+        "multiline": True,
+        "placeholder": EDIT_LABEL,
+        "initial_value": text,
+        "focus_on_load": True,
+    }
+    return [{"type": "input", "block_id": "edit_message", "element": element, "label": EDIT_LABEL}, EDIT_ACTIONS]
@@ -0,0 +1,105 @@
+"""Compiled snapshot of config.yaml
+
+`config.yaml` is validated and compiled to JSON at build time, so that a cold
+instance reads the config without fetching it from GitHub or parsing YAML:
+the snapshot seeds the cache of `utils.loader.read_remote`, which serves it
+and revalidates the remote file in the background.
+
+    python -m utils.config [config.yaml] [-o config.json]
+
+Exits with status 1 (and writes nothing) if the config is invalid.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from typing import Any, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_PATH = os.path.join(ROOT, "config.yaml")
+SNAPSHOT_PATH = os.environ.get("CONFIG_SNAPSHOT_PATH", os.path.join(ROOT, "config.json"))
+
+# contexts of `listeners.commands.get_help_message`, null for no help
+HELP_CONTEXTS = ("echo", "anonymous", "disguise", "cmd", "send", "choices")
+USER_ID_RE = re.compile(r"^[UW][A-Z0-9]{2,}$")
+
+
+def validate(config: Any) -> List[str]:
+    """
+    validate the config
+
+    Args:
+        config (Any): parsed config.yaml
+
+    Returns:
+        (list): errors, empty if the config is valid
+    """
+    if not isinstance(config, dict):
+        return ["the config must be a mapping"]
+
+    errors = []
+    user_ids = config.get("SLACK_BOT_USER_ID") or []
+    if not isinstance(user_ids, list):
+        errors.append("SLACK_BOT_USER_ID must be a list of user ids")
+    else:
+        errors += [f"SLACK_BOT_USER_ID: invalid user id {user_id!r}" for user_id in user_ids if not (isinstance(user_id, str) and USER_ID_RE.match(user_id))]
+
+    help_texts = config.get("help")
+    if not isinstance(help_texts, dict):
+        errors.append("help must be a mapping of the commands to their help texts")
+    else:
+        errors += [f"help: missing {context!r}" for context in HELP_CONTEXTS if context not in help_texts]
+        errors += [f"help.{context}: must be a text or null" for context, text in help_texts.items() if not (text is None or isinstance(text, str))]
+    return errors
+
+
+def compile_config(source: str = SOURCE_PATH, target: str = SNAPSHOT_PATH) -> List[str]:
+    """
+    validate the config and write its snapshot (replaced atomically)
+
+    Args:
+        source (str): path of config.yaml
+        target (str): path of the snapshot
+
+    Returns:
+        (list): errors, the snapshot is written only if there is none
+    """
+    from utils.loader import read_yaml
+
+    config = read_yaml(source)
+    if errors := validate(config):
+        return errors
+    temp = f"{target}.tmp"
+    with open(temp, "w") as f:
+        json.dump(config, f, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    os.replace(temp, target)
+    return []
+
+
+def load_snapshot(path: str = SNAPSHOT_PATH) -> Optional[dict]:
+    """
+    load the snapshot, None if it hasn't been built
+    """
+    try:
+        with open(path, "rb") as f:
+            return json.loads(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source", nargs="?", default=SOURCE_PATH, help="path of config.yaml")
+    parser.add_argument("-o", "--output", default=SNAPSHOT_PATH, help="path of the snapshot")
+    args = parser.parse_args()
+
+    if errors := compile_config(args.source, args.output):
+        print("\n".join(errors), file=sys.stderr)
+        return 1
+    print(f"{args.source} -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""Drop the retries of Slack for requests already being handled
+
+Slack retries a request that hasn't been acknowledged in 3 seconds, with the
+`X-Slack-Retry-Num` header (after ~0 s, 1 min and 5 min). A retry of a
+request seen in the last DEDUPE_WINDOW seconds by the process is answered
+200 right away, before the Bolt middleware (`authorize`, `auth.verify`, the
+YAML reads) and the listeners run again.
+
+The requests are fingerprinted by team and `event_id`, `trigger_id` or
+`action_ts`, in an LRU bounded by DEDUPE_CACHE_SIZE. Only requests carrying
+the retry header are dropped, and a request that failed (status >= 400 or
+an exception) is forgotten so that its retry is handled. The cache is local
+to the process: a retry reaching another worker is handled as usual.
+
+    app = App(...)
+    dedupe.instrument(app)  # first, to also log and time the dropped retries
+"""
+import os
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from slack_bolt.request import BoltRequest
+from slack_bolt.response import BoltResponse
+from utils import metrics
+from utils.lookups import LRUCache
+
+if TYPE_CHECKING:
+    from slack_bolt import App
+    from slack_bolt.async_app import AsyncApp
+    # the async stack pulls in aiohttp, keep it out of the sync cold start
+    from slack_bolt.request.async_request import AsyncBoltRequest
+
+# seconds a request is remembered (Slack's last retry comes after ~5 minutes)
+WINDOW = float(os.environ.get("DEDUPE_WINDOW", 360))
+# number of remembered requests
+CACHE_SIZE = int(os.environ.get("DEDUPE_CACHE_SIZE", 10000))
+
+_seen = LRUCache(CACHE_SIZE)
+
+
+def get_fingerprint(body: Dict[str, Any]) -> Optional[tuple]:
+    """
+    get the fingerprint of the request, the same for its retries
+
+    Args:
+        body (dict): parsed payload of the request
+
+    Returns:
+        (tuple): (team_id, id), None if the request has no unique id
+    """
+    team = body.get("team")
+    team_id = body.get("team_id") or (team.get("id") if isinstance(team, dict) else None)
+    if event_id := body.get("event_id"):
+        return team_id, event_id
+    if trigger_id := body.get("trigger_id"):
+        return team_id, trigger_id
+    # block actions don't always carry a trigger_id
+    actions = body.get("actions") or [{}]
+    if action_ts := body.get("action_ts") or actions[0].get("action_ts"):
+        return team_id, action_ts
+    return None
+
+
+def is_retry(req: BoltRequest) -> bool:
+    return bool(req.headers.get("x-slack-retry-num"))
+
+
+class Duplicate(Exception):
+    pass
+
+
+def check(req: Any) -> Optional[tuple]:
+    """
+    remember the request, raise `Duplicate` if it is a retry of a remembered one
+
+    Args:
+        req (BoltRequest | AsyncBoltRequest): request
+
+    Returns:
+        (tuple): fingerprint to forget if the request fails, None if it has none
+    """
+    if req.lazy_only or (fingerprint := get_fingerprint(req.body)) is None:
+        return None
+    if not _seen.add(fingerprint, True, WINDOW) and is_retry(req):
+        metrics.inc("echo_retries_dropped_total", listener=metrics.get_listener(req.body))
+        raise Duplicate(fingerprint)
+    return fingerprint
+
+
+def instrument(app: "App") -> "App":
+    """
+    answer the retries of the remembered requests before `app.dispatch`
+    """
+    dispatch = app.dispatch
+
+    def deduped_dispatch(req: BoltRequest) -> BoltResponse:
+        try:
+            fingerprint = check(req)
+        except Duplicate:
+            return BoltResponse(status=200, body="")
+        response = None
+        try:
+            response = dispatch(req)
+            return response
+        finally:
+            if fingerprint is not None and (response is None or response.status >= 400):
+                _seen.delete(fingerprint)
+
+    app.dispatch = deduped_dispatch  # type: ignore[method-assign]
+    return app
+
+
+def async_instrument(app: "AsyncApp") -> "AsyncApp":
+    """
+    async version of `instrument`
+    """
+    dispatch = app.async_dispatch
+
+    async def deduped_dispatch(req: "AsyncBoltRequest") -> BoltResponse:
+        try:
+            fingerprint = check(req)
+        except Duplicate:
+            return BoltResponse(status=200, body="")
+        response = None
+        try:
+            response = await dispatch(req)
+            return response
+        finally:
+            if fingerprint is not None and (response is None or response.status >= 400):
+                _seen.delete(fingerprint)
+
+    app.async_dispatch = deduped_dispatch  # type: ignore[method-assign]
+    return app
@@ -0,0 +1,370 @@
+"""Time bounded shell commands for `/>`
+
+The command runs in a child process restricted to a fresh temporary directory,
+an environment without the secrets of the app, and resource limits (CPU time,
+memory, file size, open files, processes). The shell spawned for the command
+waits on its stdin until the limits are set, so the command never runs
+without them. It is killed with its process group after CMD_TIMEOUT seconds.
+
+The output streams into a single message, updated every UPDATE_INTERVAL
+seconds with `chat.update`. Only the head and the tail of the output are kept
+in memory for the message. The full output is spooled to a temporary file
+(up to CMD_MAX_FILE_SIZE) and uploaded in the thread when it doesn't fit.
+
+    text = run(client, say, "ls -al", metadata)
+"""
+import asyncio
+import logging
+import os
+import shlex
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import slack_sdk
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+# seconds before the command is killed
+TIMEOUT = float(os.environ.get("CMD_TIMEOUT", 30))
+# max bytes of memory of the command
+MAX_MEMORY = int(os.environ.get("CMD_MAX_MEMORY", 256 * 1024 * 1024))
+# max bytes of the output uploaded as a file, the rest is dropped
+MAX_FILE_SIZE = int(os.environ.get("CMD_MAX_FILE_SIZE", 1024 * 1024))
+# max processes started by the command, over those the user of the app already has (Linux)
+MAX_PROCESSES = int(os.environ.get("CMD_MAX_PROCESSES", 32))
+# bytes of the head and the tail of the output shown in the message
+HEAD_SIZE, TAIL_SIZE = 1000, 2000
+# seconds between two updates of the message (chat.update is tier 3)
+UPDATE_INTERVAL = 2.0
+# bytes read from the pipe at once
+CHUNK_SIZE = 4096
+# bytes of the spooled output kept in memory before it moves to disk
+SPOOL_SIZE = 64 * 1024
+# seconds between two checks of the exit of the command (async)
+EXIT_POLL_INTERVAL = 0.05
+
+# environment of the command, nothing is inherited (tokens, secrets)
+ENV = {"PATH": "/usr/local/bin:/usr/bin:/bin", "LANG": "C.UTF-8", "LC_ALL": "C.UTF-8"}
+
+
+def get_process_count() -> int:
+    """
+    get the number of processes (threads included) of the user, which RLIMIT_NPROC applies to
+    """
+    uid, count = os.getuid(), 0
+    for pid in os.listdir("/proc"):
+        try:
+            if pid.isdigit() and os.stat(f"/proc/{pid}").st_uid == uid:
+                count += len(os.listdir(f"/proc/{pid}/task"))
+        except OSError:
+            pass  # exited meanwhile
+    return count
+
+
+def get_limits() -> Dict[int, int]:
+    """
+    get the resource limits of the command {RLIMIT_*: limit}
+    """
+    return {
+        resource.RLIMIT_CPU: int(TIMEOUT) + 1,
+        resource.RLIMIT_AS: MAX_MEMORY,
+        resource.RLIMIT_FSIZE: MAX_FILE_SIZE,
+        resource.RLIMIT_NOFILE: 64,
+        resource.RLIMIT_CORE: 0,
+        # counted over every process of the user, the limit only applies to those started by the command
+        resource.RLIMIT_NPROC: get_process_count() + MAX_PROCESSES,
+    }
+
+
+def get_command(command: str) -> str:
+    """
+    get the shell command to run: the shell waits for `release` before it runs the command
+
+    The limits are set by `limit_resources` meanwhile, or by `ulimit` where `prlimit` is not available
+    (no Python code runs between fork and exec, the process has threads).
+    """
+    if resource is None:
+        return command
+    if hasattr(resource, "prlimit"):
+        return f"read _; exec /bin/sh -c {shlex.quote(command)}"
+    cpu, memory, file_size = int(TIMEOUT) + 1, MAX_MEMORY // 1024, MAX_FILE_SIZE // 512
+    limits = f"ulimit -t {cpu}; ulimit -v {memory}; ulimit -f {file_size}; ulimit -n 64; ulimit -c 0"
+    return f"read _; {limits}; exec /bin/sh -c {shlex.quote(command)}"
+
+
+def limit_resources(pid: int) -> None:
+    """
+    set the resource limits of the spawned shell (Linux), inherited by the command and the processes it starts
+    """
+    if resource is None or not hasattr(resource, "prlimit"):
+        return
+    for kind, limit in get_limits().items():
+        try:
+            resource.prlimit(pid, kind, (limit, limit))
+        except (ProcessLookupError, PermissionError, ValueError):
+            pass
+
+
+def release(stdin: Any) -> None:
+    """
+    let the shell run the command once its limits are set, the command reads an empty stdin
+    """
+    if stdin is None:
+        return
+    try:
+        stdin.write(b"\n")
+        stdin.close()
+    except OSError:
+        pass  # the shell has exited
+
+
+def get_process_options(cwd: str) -> Dict[str, Any]:
+    """
+    get the options of the child process: restricted environment, own process group, stdin to `release` it
+    """
+    options: Dict[str, Any] = {"cwd": cwd, "env": {**ENV, "HOME": cwd, "TMPDIR": cwd}, "stdin": subprocess.DEVNULL}
+    if resource is not None:
+        options.update(start_new_session=True, stdin=subprocess.PIPE)
+    return options
+
+
+def kill(pid: int) -> None:
+    """
+    kill the command and the processes it has started
+    """
+    try:
+        if resource is not None:
+            os.killpg(pid, signal.SIGKILL)
+        else:
+            os.kill(pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class Output:
+    """
+    output of the command with bounded memory
+
+    - `head`, `tail`: first HEAD_SIZE and last TAIL_SIZE bytes, shown in the message
+    - `spool`: first MAX_FILE_SIZE bytes, in memory up to SPOOL_SIZE then on disk
+    """
+
+    def __init__(self):
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.size = 0
+        self.spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        self.lock = threading.Lock()
+
+    def write(self, chunk: bytes) -> None:
+        with self.lock:
+            if len(self.head) < HEAD_SIZE:
+                taken = HEAD_SIZE - len(self.head)
+                self.head += chunk[:taken]
+                chunk_tail = chunk[taken:]
+            else:
+                chunk_tail = chunk
+            self.tail += chunk_tail
+            del self.tail[:-TAIL_SIZE]
+            if (room := MAX_FILE_SIZE - self.size) > 0:
+                self.spool.write(chunk[:room])
+            self.size += len(chunk)
+
+    @property
+    def truncated(self) -> bool:
+        return self.size > HEAD_SIZE + TAIL_SIZE
+
+    def text(self) -> str:
+        """
+        get the output shown in the message, the middle is cut if it doesn't fit
+        """
+        with self.lock:
+            if not self.truncated:
+                return (self.head + self.tail).decode(errors="replace")
+            cut = self.size - HEAD_SIZE - TAIL_SIZE
+            return f"{self.head.decode(errors='replace')}\n... ({cut} bytes) ...\n{self.tail.decode(errors='replace')}"
+
+    def read(self) -> bytes:
+        """
+        get the spooled output (up to MAX_FILE_SIZE bytes)
+        """
+        with self.lock:
+            self.spool.seek(0)
+            return self.spool.read()
+
+    def close(self) -> None:
+        self.spool.close()
+
+
+def format_message(command: str, output: Output, status: Optional[str] = None) -> str:
+    """
+    get the message of the command
+
+    Args:
+        command (str): shell command
+        output (Output): output of the command
+        status (str): None while running, else the exit status
+
+    Returns:
+        (str): `$ {command}` and the output in a code block
+    """
+    footer = "\n:hourglass_flowing_sand: 실행 중..." if status is None else (f"\n{status}" if status else "")
+    return f"$ {command}\n```{output.text()}```{footer}"
+
+
+def get_status(returncode: Optional[int], timed_out: bool, output: Output) -> str:
+    """
+    get the status shown under the output ("" if the command has succeeded and the output fits)
+    """
+    notes = []
+    if timed_out:
+        notes.append(f":alarm_clock: {TIMEOUT:g}초가 지나 중단되었습니다.")
+    elif returncode:
+        notes.append(f":x: 종료 코드 {returncode}")
+    if output.truncated:
+        dropped = f", {MAX_FILE_SIZE} bytes까지" if output.size > MAX_FILE_SIZE else ""
+        notes.append(f":page_facing_up: 출력 {output.size} bytes 중 일부만 표시합니다. 전체 출력은 스레드의 파일을 확인하세요{dropped}.")
+    return "\n".join(notes)
+
+
+def _update(client: slack_sdk.web.client.WebClient, channel: str, ts: str, text: str, metadata: Dict[str, Any]) -> None:
+    metadata["event_payload"].update(text=text)
+    client.chat_update(channel=channel, ts=ts, text=text, metadata=metadata)
+
+
+def run(client: slack_sdk.web.client.WebClient, say: Callable[..., Any], command: str, metadata: Dict[str, Any]) -> str:
+    """
+    run the command and stream its output into a message
+
+    Args:
+        client (slack_sdk.web.client.WebClient): client of slack api
+        say (Say): say of the request, posts the message
+        command (str): shell command
+        metadata (dict): metadata of the message, its text is updated
+
+    Returns:
+        (str): final text of the message
+    """
+    output = Output()
+    text = format_message(command, output)
+    response = say(text=text, metadata=metadata)
+    channel, ts = response["channel"], response["ts"]
+
+    with tempfile.TemporaryDirectory() as cwd:
+        process = subprocess.Popen(get_command(command), shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **get_process_options(cwd))
+        limit_resources(process.pid)
+        release(process.stdin)
+
+        def read() -> None:
+            while chunk := process.stdout.read1(CHUNK_SIZE):  # type: ignore[union-attr]
+                output.write(chunk)
+
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+
+        deadline, timed_out = time.monotonic() + TIMEOUT, False
+        while True:
+            try:
+                process.wait(timeout=max(min(UPDATE_INTERVAL, deadline - time.monotonic()), 0))
+                break
+            except subprocess.TimeoutExpired:
+                if time.monotonic() >= deadline:
+                    kill(process.pid)
+                    process.wait()
+                    timed_out = True
+                    break
+            if (running := format_message(command, output)) != text:
+                text = running
+                _update(client, channel, ts, text, metadata)
+        # the processes started by the command may keep the pipe open
+        reader.join(1)
+        kill(process.pid)
+        process.stdout.close()  # type: ignore[union-attr]
+
+    text = format_message(command, output, get_status(process.returncode, timed_out, output))
+    _update(client, channel, ts, text, metadata)
+    if output.truncated:
+        try:
+            client.files_upload_v2(channel=channel, thread_ts=ts, content=output.read().decode(errors="replace"), filename="output.txt", title=f"$ {command}")
+        except Exception as e:
+            logger.warning(f"Failed to upload the output of {command!r}: {e}")
+    output.close()
+    return text
+
+
+async def wait_for_exit(process: "asyncio.subprocess.Process", timeout: float) -> bool:
+    """
+    wait until the process exits (`process.wait()` also waits for the processes it has started to close the pipe)
+
+    Returns:
+        (bool): True if it has exited
+    """
+    deadline = time.monotonic() + timeout
+    while process.returncode is None:
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(min(EXIT_POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+    return True
+
+
+async def async_run(client: "slack_sdk.web.async_client.AsyncWebClient", say: Callable[..., Any], command: str, metadata: Dict[str, Any]) -> str:
+    """
+    async version of `run`
+    """
+    output = Output()
+    text = format_message(command, output)
+    response = await say(text=text, metadata=metadata)
+    channel, ts = response["channel"], response["ts"]
+
+    async def update(text: str) -> None:
+        metadata["event_payload"].update(text=text)
+        await client.chat_update(channel=channel, ts=ts, text=text, metadata=metadata)
+
+    with tempfile.TemporaryDirectory() as cwd:
+        process = await asyncio.create_subprocess_shell(
+            get_command(command), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, **get_process_options(cwd)
+        )
+        limit_resources(process.pid)
+        release(process.stdin)
+
+        async def read() -> None:
+            while chunk := await process.stdout.read(CHUNK_SIZE):  # type: ignore[union-attr]
+                output.write(chunk)
+
+        reader = asyncio.ensure_future(read())
+        deadline, timed_out = time.monotonic() + TIMEOUT, False
+        while not await wait_for_exit(process, max(min(UPDATE_INTERVAL, deadline - time.monotonic()), 0)):
+            if time.monotonic() >= deadline:
+                kill(process.pid)
+                timed_out = True
+                break
+            if (running := format_message(command, output)) != text:
+                text = running
+                await update(text)
+        # the processes started by the command may keep the pipe open
+        await asyncio.wait([reader], timeout=1)
+        kill(process.pid)
+        reader.cancel()
+        try:
+            await asyncio.wait_for(process.wait(), 1)
+        except asyncio.TimeoutError:
+            pass  # a process that has left the group keeps the pipe, the exit status is known
+
+    text = format_message(command, output, get_status(process.returncode, timed_out, output))
+    await update(text)
+    if output.truncated:
+        try:
+            await client.files_upload_v2(channel=channel, thread_ts=ts, content=output.read().decode(errors="replace"), filename="output.txt", title=f"$ {command}")
+        except Exception as e:
+            logger.warning(f"Failed to upload the output of {command!r}: {e}")
+    output.close()
+    return text
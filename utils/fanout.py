@@ -0,0 +1,69 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable
+
+from slack_sdk.errors import SlackApiError
+
+logger = logging.getLogger(__name__)
+
+# number of concurrent Slack API calls per fan-out
+MAX_WORKERS = 8
+
+
+def fan_out(func: Callable[[str], Any], targets: Iterable[str], max_workers: int = MAX_WORKERS) -> Dict[str, str]:
+    """
+    call the function for each target concurrently
+
+    The rate limited (429) calls are retried by the client (`utils.ratelimit.RateLimitedWebClient`), not here.
+
+    Args:
+        func (callable): function calling the Slack API with a target (e.g. channel id)
+        targets (iterable): targets, repeated targets are called once
+        max_workers (int): maximum number of concurrent calls
+
+    Returns:
+        failures (dict): {target: error} of the failed targets
+    """
+    targets = list(dict.fromkeys(targets))  # dedupe, keep the order
+    if not targets:
+        return {}
+
+    failures = {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(targets))) as executor:
+        futures = {target: executor.submit(func, target) for target in targets}
+        for target, future in futures.items():
+            try:
+                future.result()
+            except SlackApiError as e:
+                failures[target] = e.response.get("error", "unknown_error")
+                logger.error(f"{target}: {failures[target]}")
+            except Exception as e:
+                failures[target] = type(e).__name__
+                logger.exception(f"{target}: {failures[target]}")
+    return failures
+
+
+async def async_fan_out(
+    func: Callable[[str], Awaitable[Any]], targets: Iterable[str], max_workers: int = MAX_WORKERS
+) -> Dict[str, str]:
+    """
+    async version of `fan_out`, the calls are gathered on the event loop
+    """
+    targets = list(dict.fromkeys(targets))  # dedupe, keep the order
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def call(target: str) -> Any:
+        async with semaphore:
+            return await func(target)
+
+    failures = {}
+    results = await asyncio.gather(*(call(target) for target in targets), return_exceptions=True)
+    for target, result in zip(targets, results):
+        if isinstance(result, SlackApiError):
+            failures[target] = result.response.get("error", "unknown_error")
+            logger.error(f"{target}: {failures[target]}")
+        elif isinstance(result, Exception):
+            failures[target] = type(result).__name__
+            logger.error(f"{target}: {failures[target]}", exc_info=result)
+    return failures
@@ -0,0 +1,481 @@
+"""Durable job queue for the broadcasts (`/send`)
+
+A broadcast is a batch of delivery jobs, one per target channel, stored in
+SQLite (WAL mode, JOBS_DB_PATH) so the deliveries survive an interrupted or
+timed out request. The listener only enqueues the batch and returns, and the
+`WorkerPool` threads drain the queue. On Cloud Functions neither holds (the
+queue is in memory and the threads are throttled after the response), so the
+listener waits for the batch there (DRAIN_TIMEOUT):
+
+- each job is claimed with a lease, a job whose worker died is claimed again
+  once its lease has expired
+- transient errors (network, 5xx, `internal_error`, ...) are retried with an
+  exponential backoff, up to JOBS_MAX_ATTEMPTS attempts
+- the idempotency key of the job (`{batch_id}:{target}`) dedupes the enqueue of
+  a repeated request, and is checked (`Handler.delivered`) before a job whose
+  previous attempt has an unknown outcome (expired lease, network error or 5xx
+  after the request may have been processed) is delivered again
+- once every job of the batch is done or failed, the report is sent to the
+  sender once (response_url, or an ephemeral message once it has expired)
+
+    jobs.register("send", Handler(deliver=..., report=...))
+    jobs.enqueue(jobs.Batch(...), targets, client)
+"""
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+from utils import metrics
+from utils.store import Store
+
+logger = logging.getLogger(__name__)
+
+# set by the Cloud Functions runtime: /tmp is the memory of the instance, and the threads are throttled after the response
+ON_CLOUD_FUNCTIONS = "FUNCTION_TARGET" in os.environ
+# path of the queue, on a persistent disk to resume the jobs after a restart
+DB_PATH = os.environ.get("JOBS_DB_PATH", os.path.join(tempfile.gettempdir(), "echo-jobs.sqlite3"))
+# number of worker threads
+WORKERS = int(os.environ.get("JOBS_WORKERS", 4))
+# attempts of a job before it fails
+MAX_ATTEMPTS = int(os.environ.get("JOBS_MAX_ATTEMPTS", 5))
+# seconds the listener waits for its batch (0: return right away), within the 60 s timeout of a Cloud Function by default
+DRAIN_TIMEOUT = float(os.environ.get("JOBS_DRAIN_TIMEOUT", 50 if ON_CLOUD_FUNCTIONS else 0))
+# seconds a claimed job is reserved for its worker
+LEASE = 120.0
+# (base, max) seconds of the retry backoff
+BACKOFF = (2.0, 300.0)
+# seconds between two polls of an idle worker
+POLL_INTERVAL = 1.0
+# seconds the reported batches are kept
+RETENTION = 86400.0
+
+# errors of the Slack API worth retrying, the others fail the job right away
+RETRYABLE_ERRORS = {"internal_error", "fatal_error", "service_unavailable", "request_timeout", "ratelimited"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    enterprise_id TEXT,
+    team_id TEXT,
+    user_id TEXT,
+    channel_id TEXT,
+    response_url TEXT,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    reported_at REAL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    batch_id TEXT NOT NULL REFERENCES batches(id) ON DELETE CASCADE,
+    key TEXT NOT NULL UNIQUE,
+    target TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_at REAL NOT NULL,
+    error TEXT,
+    uncertain INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_status_run_at ON jobs (status, run_at);
+CREATE INDEX IF NOT EXISTS jobs_batch_id ON jobs (batch_id, status);
+"""
+
+
+class Batch(NamedTuple):
+    id: str  # e.g. `send:{trigger_id}`, the same request is enqueued once
+    kind: str  # name of the registered `Handler`
+    enterprise_id: Optional[str]
+    team_id: Optional[str]
+    user_id: str  # sender, the report is sent to them
+    channel_id: str
+    response_url: Optional[str]
+    payload: Dict[str, Any]  # shared by the jobs of the batch (e.g. the message)
+    created_at: float
+
+
+class Job(NamedTuple):
+    id: int
+    batch_id: str
+    key: str  # idempotency key, `{batch_id}:{target}`
+    target: str  # e.g. channel id
+    attempts: int  # including this one
+    uncertain: bool  # a previous attempt may have been delivered (expired lease, network error, 5xx)
+
+
+class Handler(NamedTuple):
+    deliver: Callable[[WebClient, Batch, Job], Any]
+    # (batch, {target: error} of the failed jobs, number of jobs) -> report text (None: no report)
+    report: Callable[[Batch, Dict[str, str], int], Optional[str]]
+    # check if an uncertain job has been delivered
+    delivered: Optional[Callable[[WebClient, Batch, Job], bool]] = None
+
+
+_handlers: Dict[str, Handler] = {}
+
+
+def register(kind: str, handler: Handler) -> None:
+    """
+    register the handler of the batches of the kind
+    """
+    _handlers[kind] = handler
+
+
+class JobQueue(Store):
+    """
+    jobs stored in SQLite
+    """
+
+    SCHEMA = SCHEMA
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        # queues created before the `uncertain` column
+        if "uncertain" not in {row[1] for row in self.connect().execute("PRAGMA table_info(jobs)")}:
+            self.connect().execute("ALTER TABLE jobs ADD COLUMN uncertain INTEGER NOT NULL DEFAULT 0")
+
+    def enqueue(self, batch: Batch, targets: Iterable[str]) -> int:
+        """
+        enqueue a job for each target, the jobs already enqueued (same key) are ignored
+
+        Returns:
+            (int): number of new jobs
+        """
+        now = time.time()
+        with self.transaction() as db:
+            db.execute(
+                "INSERT OR IGNORE INTO batches (id, kind, enterprise_id, team_id, user_id, channel_id, response_url, payload, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*batch[:7], json.dumps(batch.payload, ensure_ascii=False), batch.created_at),
+            )
+            rows = [(batch.id, f"{batch.id}:{target}", target, now) for target in dict.fromkeys(targets)]
+            before = db.total_changes
+            db.executemany("INSERT OR IGNORE INTO jobs (batch_id, key, target, run_at) VALUES (?, ?, ?, ?)", rows)
+            return db.total_changes - before
+
+    def claim(self) -> Optional[Job]:
+        """
+        claim the next due job, pending or with an expired lease
+        """
+        now = time.time()
+        with self.transaction() as db:
+            row = db.execute(
+                "SELECT id, batch_id, key, target, attempts, status, uncertain FROM jobs"
+                " WHERE status IN ('pending', 'running') AND run_at <= ? ORDER BY run_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, run_at = ? WHERE id = ?", (now + LEASE, row[0]))
+        return Job(*row[:4], attempts=row[4] + 1, uncertain=row[5] == "running" or bool(row[6]))
+
+    def retry(self, job: Job, error: str, delay: float, uncertain: bool = False) -> None:
+        """
+        put the job back in the queue after the delay
+
+        Args:
+            uncertain (bool): the attempt may have been delivered, checked before the next one (kept once set)
+        """
+        with self.transaction() as db:
+            db.execute(
+                "UPDATE jobs SET status = 'pending', run_at = ?, error = ?, uncertain = ? WHERE id = ?",
+                (time.time() + delay, error, job.uncertain or uncertain, job.id),
+            )
+
+    def finish(self, job: Job, error: Optional[str] = None) -> None:
+        with self.transaction() as db:
+            db.execute("UPDATE jobs SET status = ?, error = ? WHERE id = ?", ("failed" if error else "done", error, job.id))
+
+    def get_batch(self, batch_id: str) -> Optional[Batch]:
+        row = self.connect().execute(
+            "SELECT id, kind, enterprise_id, team_id, user_id, channel_id, response_url, payload, created_at FROM batches WHERE id = ?",
+            (batch_id,),
+        ).fetchone()
+        return Batch(*row[:7], payload=json.loads(row[7]), created_at=row[8]) if row else None
+
+    def get_results(self, batch_id: str) -> Dict[str, Tuple[str, Optional[str]]]:
+        """
+        get {target: (status, error)} of the jobs of the batch
+        """
+        rows = self.connect().execute("SELECT target, status, error FROM jobs WHERE batch_id = ? ORDER BY id", (batch_id,))
+        return {target: (status, error) for target, status, error in rows}
+
+    def has_jobs(self) -> bool:
+        """
+        check if any job is pending or running (left by a previous process)
+        """
+        row = self.connect().execute("SELECT 1 FROM jobs WHERE status IN ('pending', 'running') LIMIT 1").fetchone()
+        return row is not None
+
+    def is_done(self, batch_id: str) -> bool:
+        row = self.connect().execute(
+            "SELECT 1 FROM jobs WHERE batch_id = ? AND status IN ('pending', 'running') LIMIT 1", (batch_id,)
+        ).fetchone()
+        return row is None
+
+    def claim_report(self, batch_id: str) -> bool:
+        """
+        mark the batch as reported if all of its jobs are done or failed
+
+        Returns:
+            (bool): True for the single caller who should send the report
+        """
+        with self.transaction() as db:
+            cursor = db.execute(
+                "UPDATE batches SET reported_at = ? WHERE id = ? AND reported_at IS NULL"
+                " AND NOT EXISTS (SELECT 1 FROM jobs WHERE batch_id = ? AND status IN ('pending', 'running'))",
+                (time.time(), batch_id, batch_id),
+            )
+            return cursor.rowcount == 1
+
+    def purge(self, before: float) -> int:
+        """
+        delete the batches reported before the time, with their jobs
+        """
+        with self.transaction() as db:
+            return db.execute("DELETE FROM batches WHERE reported_at < ?", (before,)).rowcount
+
+
+def get_backoff(attempts: int) -> float:
+    """
+    get the seconds before the next attempt
+    """
+    base, cap = BACKOFF
+    return min(base * 2 ** (attempts - 1), cap)
+
+
+def _get_error(e: Exception) -> Tuple[str, bool, bool]:
+    """
+    get the error of the failed attempt, whether it is worth retrying, and whether it may have been delivered
+
+    A network error (e.g. read timeout, connection reset) or a 5xx may come after Slack has processed the request.
+    """
+    if isinstance(e, SlackApiError):
+        error = e.response.get("error") or "unknown_error"
+        return error, e.response.status_code >= 500 or error in RETRYABLE_ERRORS, e.response.status_code >= 500
+    return type(e).__name__, True, True
+
+
+class WorkerPool:
+    """
+    threads draining the queue
+
+        pool = get_pool()
+        pool.start()
+        pool.wait(batch_id, timeout=60)
+    """
+
+    def __init__(self, queue: JobQueue, workers: int = WORKERS):
+        self.queue = queue
+        self.workers = workers
+        self.threads: List[threading.Thread] = []
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        # {(enterprise_id, team_id): client} registered by the listeners
+        self.clients: Dict[Tuple[Optional[str], Optional[str]], WebClient] = {}
+        self.purged_at = 0.0
+
+    def start(self) -> "WorkerPool":
+        """
+        start the workers if they are not running, and wake them up
+        """
+        with self.lock:
+            self.threads = [thread for thread in self.threads if thread.is_alive()]
+            self.stopping.clear()
+            for i in range(len(self.threads), self.workers):
+                thread = threading.Thread(target=self.work, name=f"jobs-worker-{i}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+        self.wakeup.set()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        stop the workers after their current job, the other jobs stay in the queue
+        """
+        self.stopping.set()
+        self.wakeup.set()
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def wait(self, batch_id: str, timeout: float) -> bool:
+        """
+        wait until every job of the batch is done or failed
+
+        Returns:
+            (bool): True if the batch has been drained
+        """
+        deadline = time.monotonic() + timeout
+        while not self.queue.is_done(batch_id):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(min(0.1, max(deadline - time.monotonic(), 0)))
+        return True
+
+    def work(self) -> None:
+        while not self.stopping.is_set():
+            if self.run_once():
+                continue
+            self.purge_if_due()
+            self.wakeup.wait(POLL_INTERVAL)
+            self.wakeup.clear()
+
+    def run_once(self) -> bool:
+        """
+        claim and run the next due job
+
+        Returns:
+            (bool): True if a job has been run
+        """
+        try:
+            job = self.queue.claim()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to claim a job: {e}")
+            return False
+        if job is None:
+            return False
+        self.run(job)
+        return True
+
+    def get_client(self, batch: Batch) -> WebClient:
+        """
+        get the client of the team: registered by the listener, or built from the installation
+        """
+        if (client := self.clients.get((batch.enterprise_id, batch.team_id))) is not None:
+            return client
+
+        import auth
+        from utils.ratelimit import get_client
+
+        installation = auth.get_installation(batch.enterprise_id, batch.team_id) or {}
+        return get_client(WebClient(token=installation.get("bot_token")), batch.team_id)
+
+    def run(self, job: Job) -> None:
+        if (batch := self.queue.get_batch(job.batch_id)) is None or (handler := _handlers.get(batch.kind)) is None:
+            logger.error(f"No handler for the job {job.key}")
+            self.queue.finish(job, "no_handler")
+            return
+
+        try:
+            client = self.get_client(batch)
+            if not (job.uncertain and handler.delivered and handler.delivered(client, batch, job)):
+                handler.deliver(client, batch, job)
+        except Exception as e:
+            error, retryable, uncertain = _get_error(e)
+            if retryable and job.attempts < MAX_ATTEMPTS:
+                logger.warning(f"{job.key}: {error}, retrying (attempt {job.attempts}/{MAX_ATTEMPTS})")
+                metrics.inc("echo_jobs_total", kind=batch.kind, result="retried")
+                self.queue.retry(job, error, get_backoff(job.attempts), uncertain)
+                return
+            logger.error(f"{job.key}: {error}")
+            metrics.inc("echo_jobs_total", kind=batch.kind, result="failed")
+            self.queue.finish(job, error)
+        else:
+            metrics.inc("echo_jobs_total", kind=batch.kind, result="done")
+            self.queue.finish(job)
+
+        if self.queue.claim_report(batch.id):
+            self.report(batch, handler)
+
+    def report(self, batch: Batch, handler: Handler) -> None:
+        """
+        send the report of the batch to the sender
+        """
+        results = self.queue.get_results(batch.id)
+        failures = {target: error or "unknown_error" for target, (status, error) in results.items() if status == "failed"}
+        if not (text := handler.report(batch, failures, len(results))):
+            return
+
+        from slack_sdk.webhook import WebhookClient
+
+        try:
+            # response_url expires after 30 minutes
+            if batch.response_url and WebhookClient(batch.response_url).send(text=text, response_type="ephemeral").status_code == 200:
+                return
+        except Exception as e:
+            logger.warning(f"Failed to send the report of {batch.id} to the response_url: {e}")
+        try:
+            self.get_client(batch).chat_postEphemeral(channel=batch.channel_id, user=batch.user_id, text=text)
+        except Exception as e:
+            logger.error(f"Failed to send the report of {batch.id}: {e}")
+
+    def purge_if_due(self) -> None:
+        if time.monotonic() - self.purged_at < RETENTION / 24:
+            return
+        self.purged_at = time.monotonic()
+        try:
+            self.queue.purge(time.time() - RETENTION)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to purge the reported batches: {e}")
+
+
+_pool: Optional[WorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> WorkerPool:
+    """
+    get the worker pool of the process, the queue is opened on the first call
+    """
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = WorkerPool(JobQueue(DB_PATH))
+    return _pool
+
+
+def enqueue(batch: Batch, targets: Iterable[str], client: Optional[WebClient] = None) -> WorkerPool:
+    """
+    enqueue the batch and start the workers
+
+    Args:
+        batch (Batch): batch of the request
+        targets (iterable): targets of the jobs, repeated targets are enqueued once
+        client (WebClient): client of the team for the workers (default: built from the installation)
+
+    Returns:
+        (WorkerPool): pool running the jobs
+    """
+    pool = get_pool()
+    if client is not None:
+        pool.clients[(batch.enterprise_id, batch.team_id)] = client
+    added = pool.queue.enqueue(batch, targets)
+    logger.info(f"Enqueued {added} jobs of {batch.id}")
+    return pool.start()
+
+
+def stop(timeout: Optional[float] = None) -> None:
+    """
+    stop the workers of the process after their current job, the other jobs stay in the queue
+    """
+    if _pool is not None:
+        _pool.stop(timeout)
+
+
+def resume() -> Optional[WorkerPool]:
+    """
+    start the workers if the queue file has jobs left by a previous process (call it at boot, after fork)
+
+    Returns:
+        (WorkerPool): pool running the jobs, None if there is none
+    """
+    if not os.path.exists(DB_PATH):
+        return None
+    try:
+        pool = get_pool()
+        if not pool.queue.has_jobs():
+            return None
+    except sqlite3.Error as e:
+        logger.error(f"Failed to open the queue {DB_PATH}: {e}")
+        return None
+    logger.info(f"Resuming the jobs of {DB_PATH}")
+    return pool.start()
@@ -0,0 +1,97 @@
+"""Lazy listener runners and a local response_url stand-in
+
+Slash commands are acknowledged by a cheap ack function and the slow work is
+done by Bolt lazy listeners (see `listeners.listen`). On FaaS the instance may
+be throttled once the HTTP response is returned, so `SelfInvokingLazyListenerRunner`
+runs each lazy listener in a new invocation of the function instead of a
+background thread, like Bolt's `LambdaLazyListenerRunner` does on AWS Lambda.
+Without the URL of the function, `SyncLazyListenerRunner` runs them before the
+response instead.
+"""
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List
+
+from slack_bolt.lazy_listener import LazyListenerRunner
+from slack_bolt.request import BoltRequest
+
+# (connect, read) timeout of the self invocation, the response is never awaited
+INVOKE_TIMEOUT = (3.05, 0.5)
+
+
+class SelfInvokingLazyListenerRunner(LazyListenerRunner):
+    """
+    run lazy listeners by re-sending the signed request to the function itself
+
+    The copied request keeps Slack's signature headers, so `auth.verify` accepts it,
+    and `x-slack-bolt-lazy-only` makes Bolt skip the ack function and run only
+    the named lazy listener.
+    """
+
+    def __init__(self, url: str, logger: logging.Logger):
+        self.url = url
+        self.logger = logger
+
+    def start(self, function: Callable[..., None], request: BoltRequest) -> None:
+        import requests
+
+        headers = {k: v[0] for k, v in request.headers.items() if v and k not in ("host", "content-length")}
+        headers["x-slack-bolt-lazy-only"] = "1"
+        headers["x-slack-bolt-lazy-function-name"] = request.lazy_function_name
+        try:
+            requests.post(self.url, data=request.raw_body.encode("utf-8"), headers=headers, timeout=INVOKE_TIMEOUT)
+        except requests.exceptions.ReadTimeout:
+            pass  # the invoked function keeps running
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"Failed to invoke the lazy listener {request.lazy_function_name}: {e}")
+
+
+class SyncLazyListenerRunner(LazyListenerRunner):
+    """
+    run lazy listeners synchronously in the current thread (FaaS without self invocation, benchmarks)
+    """
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+
+    def start(self, function: Callable[..., None], request: BoltRequest) -> None:
+        self.run(function, request)
+
+
+class ResponseUrlStub:
+    """
+    local stand-in for Slack's response_url, records every message posted to it
+
+        with ResponseUrlStub() as stub:
+            body["response_url"] = stub.url
+            ...
+            stub.messages  # [{"text": ..., "response_type": ...}, ...]
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.messages: List[dict] = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                stub.messages.append(json.loads(self.rfile.read(length) or b"{}"))
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_port}/"
+
+    def __enter__(self) -> "ResponseUrlStub":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
@@ -1,35 +1,207 @@
-def read_yaml(path: str) -> dict:
+import functools
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+
+from utils import metrics
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+# seconds to serve the remote file from the cache before revalidating it
+CACHE_TTL = float(os.environ.get("CONFIG_CACHE_TTL", 60))
+# (connect, read) timeout of the remote request
+TIMEOUT = (3.05, 10)
+# keep-alive connection pool of the remote requests
+POOL_CONNECTIONS = 4  # number of hosts
+POOL_MAXSIZE = 16  # connections per host
+
+_session = None
+_session_lock = threading.Lock()
+
+# {(path, parser): {"data": Any, "etag": str, "fetched_at": float, "refreshing": bool}}
+_cache: Dict[tuple, Dict[str, Any]] = {}
+_cache_lock = threading.Lock()
+# {path: loader of its snapshot} used instead of the first fetch (see `seed`)
+_seeds: Dict[str, Callable[[], Optional[Any]]] = {}
+# {path: ((st_ino, st_mtime_ns, st_size), data)} of the local files
+_files: Dict[str, Tuple[tuple, Any]] = {}
+
+
+def _after_fork() -> None:
+    """
+    drop the state of the parent that the forked process can't share: pooled connections, revalidating threads
+    """
+    global _session, _session_lock, _cache_lock
+
+    _session, _session_lock, _cache_lock = None, threading.Lock(), threading.Lock()
+    for entry in _cache.values():
+        entry["refreshing"] = False
+
+
+# the cache itself is kept, the forked workers share it copy-on-write
+os.register_at_fork(after_in_child=_after_fork)
+
+
+@functools.lru_cache(maxsize=None)
+def get_yaml_loader() -> type:
+    """
+    get the safe loader of PyYAML, the C one (libyaml) if available
+    """
+    import yaml
+
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def _parse_yaml(text: Any) -> Any:
     import yaml
-    from yaml.loader import SafeLoader
 
+    return yaml.load(text, Loader=get_yaml_loader())
+
+
+def _parse_json(text: str) -> Any:
+    import json
+
+    return json.loads(text)
+
+
+def get_session() -> "requests.Session":
+    """
+    get the keep-alive session shared by the remote requests
+    """
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_CONNECTIONS,
+                    pool_maxsize=POOL_MAXSIZE,
+                    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504), allowed_methods=("GET",)),
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _request(path: str, etag: str = "") -> Any:
+    headers = {
+        "Accept": "application/vnd.github.v3.raw",
+        "Authorization": os.environ.get("GITHUB_ACCESS_TOKEN"),
+    }
+    if etag:
+        headers["If-None-Match"] = etag
+    r = get_session().get(path, headers=headers, timeout=TIMEOUT)
+    r.raise_for_status()
+    return r
+
+
+def _revalidate(key: tuple, parse: Callable[[str], Any]) -> None:
+    """
+    revalidate the cached remote file with its etag, keep the last good snapshot on failure
+    """
+    path, _ = key
+    entry = _cache[key]
+    try:
+        r = _request(path, entry["etag"])
+        if r.status_code != 304:
+            entry.update(data=parse(r.text), etag=r.headers.get("ETag", ""))
+    except Exception as e:
+        logger.warning(f"Failed to revalidate {path}, serving the last snapshot: {e}")
+    finally:
+        entry.update(fetched_at=time.monotonic(), refreshing=False)
+
+
+def read_remote(path: str, parse: Callable[[str], Any]) -> Any:
+    """
+    read the remote file through the cache
+
+    - fresh (younger than CACHE_TTL): served from the cache
+    - stale: served from the cache while revalidating in the background (If-None-Match)
+    - missing: fetched synchronously
+
+    Args:
+        path (str): url of the file
+        parse (callable): parser of the response text
+
+    Returns:
+        (Any): parsed data (shared between callers, do not modify)
+    """
+    key = (path, parse.__name__)
+    metrics.cache_lookup("config", key in _cache)
+    if (entry := _cache.get(key)) is None:
+        with _cache_lock:
+            if (entry := _cache.get(key)) is None:
+                if (load := _seeds.get(path)) is not None and (data := load()) is not None:
+                    # served right away, stale so that it is revalidated in the background
+                    entry = {"data": data, "etag": "", "fetched_at": -CACHE_TTL, "refreshing": False}
+                else:
+                    r = _request(path)
+                    entry = {
+                        "data": parse(r.text),
+                        "etag": r.headers.get("ETag", ""),
+                        "fetched_at": time.monotonic(),
+                        "refreshing": False,
+                    }
+                _cache[key] = entry
+        return entry["data"]
+
+    if time.monotonic() - entry["fetched_at"] >= CACHE_TTL and not entry["refreshing"]:
+        with _cache_lock:
+            if entry["refreshing"]:
+                return entry["data"]
+            entry["refreshing"] = True
+        threading.Thread(target=_revalidate, args=(key, parse), daemon=True).start()
+    return entry["data"]
+
+
+def seed(path: str, load: Callable[[], Optional[Any]]) -> None:
+    """
+    serve the remote file from a local snapshot until it is first revalidated
+
+    Args:
+        path (str): url of the file
+        load (callable): loader of the snapshot (e.g. `utils.config.load_snapshot`), None if missing
+    """
+    _seeds[path] = load
+
+
+def read_file(path: str, parse: Callable[[Any], Any]) -> Any:
+    """
+    read the local file, parsed again only if it has been changed
+    """
+    st = os.stat(path)
+    stat = (st.st_ino, st.st_mtime_ns, st.st_size)
+    if (entry := _files.get(path)) is not None and entry[0] == stat:
+        return entry[1]
+    with open(path, "rb") as f:
+        data = parse(f.read())
+    _files[path] = (stat, data)
+    return data
+
+
+def read_yaml(path: str) -> dict:
     if path.startswith("http"):
-        import os
-        import requests
-
-        headers = {
-            "Accept": "application/vnd.github.v3.raw",
-            "Authorization": os.environ.get("GITHUB_ACCESS_TOKEN"),
-        }
-        r = requests.get(path, headers=headers)
-        return yaml.load(r.text, Loader=SafeLoader)
+        return read_remote(path, _parse_yaml)
     else:
-        with open(path) as f:
-            return yaml.load(f, Loader=SafeLoader)
+        return read_file(path, _parse_yaml)
 
 
 def read_json(path: str) -> dict:
-    import json
-
     if path.startswith("http"):
-        import os
-        import requests
-
-        headers = {
-            "Accept": "application/vnd.github.v3.raw",
-            "Authorization": os.environ.get("GITHUB_ACCESS_TOKEN"),
-        }
-        r = requests.get(path, headers=headers)
-        return r.json()
+        return read_remote(path, _parse_json)
     else:
+        import json
+
         with open(path) as f:
             return json.load(f)
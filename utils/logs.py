@@ -0,0 +1,209 @@
+"""Asynchronous structured logging
+
+`setup()` routes every log record through a `QueueHandler`: the request thread
+only enqueues the record, and a background `QueueListener` formats and writes
+it as a JSON line (parsed by Cloud Logging).
+
+`instrument(app)` logs one summary per request (team, user, channel, listener,
+status, duration). The full payload is only attached to the sampled requests
+(LOG_PAYLOAD_SAMPLE_RATE) and to the failed ones. The summary and a redacted
+copy of the payload (tokens, response_url, long strings truncated) are taken
+before dispatch, since the listeners change the body they are given; the
+writer thread only serializes them.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from slack_bolt.request import BoltRequest
+from slack_bolt.response import BoltResponse
+from utils.metrics import get_listener
+
+if TYPE_CHECKING:
+    # the async stack pulls in aiohttp, keep it out of the sync cold start
+    from slack_bolt import App
+    from slack_bolt.async_app import AsyncApp
+    from slack_bolt.request.async_request import AsyncBoltRequest
+
+logger = logging.getLogger(__name__)
+
+# ratio of the successful requests logged with their payload
+SAMPLE_RATE = float(os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", 0.01))
+# max length of each string in the logged payload
+MAX_FIELD_LENGTH = int(os.environ.get("LOG_MAX_FIELD_LENGTH", 256))
+# max length of the logged payload (json)
+MAX_PAYLOAD_LENGTH = int(os.environ.get("LOG_MAX_PAYLOAD_LENGTH", 4096))
+
+# keys whose values are never logged
+REDACTED_KEYS = {"token", "bot_token", "user_token", "signing_secret", "client_secret", "response_url", "authorization"}
+TOKEN_RE = re.compile(r"xox[a-z]-[0-9A-Za-z-]+|https://hooks\.slack\.com/\S+")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def redact(value: Any, max_length: int = MAX_FIELD_LENGTH) -> Any:
+    """
+    copy the payload without the secrets, with the long strings truncated
+
+    Args:
+        value (Any): payload (dict, list or scalar)
+        max_length (int): max length of each string
+
+    Returns:
+        (Any): redacted copy of the payload
+    """
+    if isinstance(value, dict):
+        return {k: "[REDACTED]" if k.lower() in REDACTED_KEYS else redact(v, max_length) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v, max_length) for v in value]
+    if isinstance(value, str):
+        value = TOKEN_RE.sub("[REDACTED]", value)
+        return value if len(value) <= max_length else f"{value[:max_length]}...({len(value)} chars)"
+    return value
+
+
+def summarize(body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    get the fields of the request summary
+
+    Args:
+        body (dict): body of the request
+
+    Returns:
+        (dict): team, enterprise, user, channel, listener and type of the request
+    """
+    team, user, channel = body.get("team"), body.get("user"), body.get("channel")
+    event = body.get("event") or {}
+    return {
+        "team": body.get("team_id") or (team.get("id") if isinstance(team, dict) else team),
+        "enterprise": body.get("enterprise_id") or (body.get("enterprise") or {}).get("id"),
+        "user": body.get("user_id") or (user.get("id") if isinstance(user, dict) else user) or event.get("user"),
+        "channel": body.get("channel_id") or (channel.get("id") if isinstance(channel, dict) else channel) or event.get("channel"),
+        "listener": get_listener(body),
+        "type": body.get("type") or ("slash_command" if "command" in body else None),
+    }
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    format the record as a JSON line: severity, message, logger, its `fields` and its `payload` (already redacted)
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"severity": record.levelname, "message": record.getMessage(), "logger": record.name}
+        entry.update(getattr(record, "fields", None) or {})
+        if (payload := getattr(record, "payload", None)) is not None:
+            text = json.dumps(payload, ensure_ascii=False, default=str)
+            entry["payload"] = text if len(text) <= MAX_PAYLOAD_LENGTH else f"{text[:MAX_PAYLOAD_LENGTH]}...({len(text)} chars)"
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup(level: int = logging.INFO) -> None:
+    """
+    route the logs of the process through the queue and its background writer (once)
+
+    Args:
+        level (int): level of the root logger
+    """
+    global _listener
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _listener is not None:
+        return
+
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    writer = logging.StreamHandler(sys.stdout)
+    writer.setFormatter(StructuredFormatter())
+    _listener = logging.handlers.QueueListener(records, writer, respect_handler_level=True)
+    _listener.start()
+    # flush the queued records on exit
+    atexit.register(_listener.stop)
+
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(records))
+
+
+def _after_fork() -> None:
+    """
+    restart the background writer in the forked process, the thread of the parent doesn't survive fork
+    """
+    global _listener
+
+    if _listener is not None:
+        _listener = None
+        setup(logging.getLogger().level)
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def log_request(fields: Dict[str, Any], payload: Any, duration: float, status: int, lazy: bool, error: Optional[BaseException] = None) -> None:
+    """
+    log the summary of the request, with its payload if sampled or failed
+
+    Args:
+        fields (dict): summary of the request (`summarize`)
+        payload (Any): redacted copy of the body (`redact`)
+    """
+    failed = error is not None or status >= 500
+    fields = {**fields, "status": status, "lazy": lazy, "duration_ms": round(duration * 1000, 3)}
+    extra: Dict[str, Any] = {"fields": fields}
+    if failed or random.random() < SAMPLE_RATE:
+        extra["payload"] = payload
+    logger.log(logging.ERROR if failed else logging.INFO, "request", extra=extra, exc_info=error)
+
+
+def instrument(app: "App") -> "App":
+    """
+    log the summary of every request handled by the app (around `app.dispatch`)
+    """
+    dispatch = app.dispatch
+
+    def logged_dispatch(req: BoltRequest) -> BoltResponse:
+        # before dispatch: the listeners get the body itself and change it (`get_values` pops the command)
+        fields, payload = summarize(req.body), redact(req.body)
+        started_at, response, error = time.perf_counter(), None, None
+        try:
+            response = dispatch(req)
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            log_request(fields, payload, time.perf_counter() - started_at, response.status if response else 500, req.lazy_only, error)
+
+    app.dispatch = logged_dispatch  # type: ignore[method-assign]
+    return app
+
+
+def async_instrument(app: "AsyncApp") -> "AsyncApp":
+    """
+    async version of `instrument`
+    """
+    dispatch = app.async_dispatch
+
+    async def logged_dispatch(req: "AsyncBoltRequest") -> BoltResponse:
+        # before dispatch: the listeners get the body itself and change it (`get_values` pops the command)
+        fields, payload = summarize(req.body), redact(req.body)
+        started_at, response, error = time.perf_counter(), None, None
+        try:
+            response = await dispatch(req)
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            log_request(fields, payload, time.perf_counter() - started_at, response.status if response else 500, req.lazy_only, error)
+
+    app.async_dispatch = logged_dispatch  # type: ignore[method-assign]
+    return app
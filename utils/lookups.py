@@ -0,0 +1,368 @@
+"""Read-through cache of the Slack lookup methods
+
+- `lookup`: responses of `users.info`, `conversations.info`, `emoji.list` and
+  `conversations.open` (the DM channel of a set of users never changes),
+  keyed by (team_id, method, arguments) in an LRU bounded by LOOKUP_CACHE_SIZE,
+  each method with its own TTL (`METHOD_TTLS`)
+- `get_user_index`: compact {user_id: UserFlag value} index of the team, preloaded
+  in bulk from `users.list` and refreshed in the background once stale. Bots
+  and deactivated users are detected from it (`UserIndex.excluded`), and users
+  missing from it (joined since the preload) are looked up with `users.info`.
+"""
+import asyncio
+import enum
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, NamedTuple, Optional
+
+import slack_sdk
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# seconds to serve the responses of each method from the cache
+METHOD_TTLS = {
+    "users.info": 3600,
+    "conversations.info": 600,
+    "emoji.list": 3600,
+    "conversations.open": 86400,
+}
+# number of cached responses
+CACHE_SIZE = int(os.environ.get("LOOKUP_CACHE_SIZE", 4096))
+# seconds before the user index of a team is refreshed in the background
+USERS_TTL = float(os.environ.get("USERS_CACHE_TTL", 3600))
+# page size of users.list (tier 2, keep the number of pages small)
+PAGE_SIZE = 1000
+
+
+class UserFlag(enum.IntFlag):
+    BOT = 1  # bots, apps and Slackbot
+    DELETED = 2  # deactivated
+    RESTRICTED = 4  # guests
+
+
+def get_flags(user: Dict[str, Any]) -> UserFlag:
+    """
+    get the flags of the user object (users.info, users.list)
+    """
+    flags = UserFlag(0)
+    if user.get("is_bot") or user.get("is_app_user") or user.get("id") == "USLACKBOT":
+        flags |= UserFlag.BOT
+    if user.get("deleted"):
+        flags |= UserFlag.DELETED
+    if user.get("is_restricted") or user.get("is_ultra_restricted"):
+        flags |= UserFlag.RESTRICTED
+    return flags
+
+
+class LRUCache:
+    """
+    LRU cache whose entries expire after their TTL
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # {key: (expires_at, value)}
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self.lock:
+            if (entry := self.entries.get(key)) is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def add(self, key: Hashable, value: Any, ttl: float) -> bool:
+        """
+        set the entry only if the key is missing or expired (atomic get and set)
+
+        Returns:
+            (bool): True if the entry has been set
+        """
+        with self.lock:
+            if (entry := self.entries.get(key)) is not None and entry[0] > time.monotonic():
+                return False
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+            return True
+
+    def delete(self, key: Hashable) -> None:
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+_responses = LRUCache(CACHE_SIZE)
+
+
+def _key(team_id: Optional[str], method: str, kwargs: Dict[str, Any]) -> tuple:
+    return (team_id, method, *sorted(kwargs.items()))
+
+
+def lookup(client: slack_sdk.web.client.WebClient, team_id: Optional[str], method: str, **kwargs) -> Dict[str, Any]:
+    """
+    call the lookup method through the cache
+
+    Args:
+        client (slack_sdk.web.client.WebClient): client of slack api
+        team_id (str): team id of the client
+        method (str): `users.info` | `conversations.info` | `emoji.list` | `conversations.open`
+        kwargs: arguments of the method (e.g. `user=...`)
+
+    Returns:
+        (dict): data of the response (shared between callers, do not modify)
+    """
+    key = _key(team_id, method, kwargs)
+    data = _responses.get(key)
+    metrics.cache_lookup(method, data is not None)
+    if data is None:
+        data = getattr(client, method.replace(".", "_"))(**kwargs).data
+        _responses.set(key, data, METHOD_TTLS.get(method, 60))
+    return data
+
+
+def get_dm_channel(client: slack_sdk.web.client.WebClient, team_id: Optional[str], users: Iterable[str]) -> str:
+    """
+    get the id of the DM (1 user) or group DM (2 to 8 users) of the users with the bot, opened once
+
+    Args:
+        client (slack_sdk.web.client.WebClient): client of slack api
+        team_id (str): team id of the client
+        users (iterable): user ids
+
+    Returns:
+        (str): channel id
+    """
+    return lookup(client, team_id, "conversations.open", users=",".join(sorted(set(users))))["channel"]["id"]
+
+
+async def async_get_dm_channel(client: "slack_sdk.web.async_client.AsyncWebClient", team_id: Optional[str], users: Iterable[str]) -> str:
+    """
+    async version of `get_dm_channel`
+    """
+    return (await async_lookup(client, team_id, "conversations.open", users=",".join(sorted(set(users)))))["channel"]["id"]
+
+
+async def async_lookup(client: "slack_sdk.web.async_client.AsyncWebClient", team_id: Optional[str], method: str, **kwargs) -> Dict[str, Any]:
+    """
+    async version of `lookup`, shares the cache with it
+    """
+    key = _key(team_id, method, kwargs)
+    data = _responses.get(key)
+    metrics.cache_lookup(method, data is not None)
+    if data is None:
+        data = (await getattr(client, method.replace(".", "_"))(**kwargs)).data
+        _responses.set(key, data, METHOD_TTLS.get(method, 60))
+    return data
+
+
+class UserIndex(NamedTuple):
+    fetched_at: float
+    flags: Dict[str, int]  # {user_id: UserFlag value} of every user of the team
+    excluded: FrozenSet[str]  # bots and deactivated users
+
+
+def _build_index(pages) -> UserIndex:
+    flags = {user["id"]: int(get_flags(user)) for page in pages for user in page}
+    return UserIndex(time.monotonic(), flags, _excluded(flags))
+
+
+def _excluded(flags: Dict[str, int]) -> FrozenSet[str]:
+    return frozenset(user for user, user_flags in flags.items() if user_flags & (UserFlag.BOT | UserFlag.DELETED))
+
+
+def iter_user_pages(client: slack_sdk.web.client.WebClient):
+    """
+    iterate over the pages of users.list following the cursor
+    """
+    cursor = None
+    while True:
+        response = client.users_list(limit=PAGE_SIZE, cursor=cursor)
+        yield response.get("members", [])
+        if not (cursor := response.get("response_metadata", {}).get("next_cursor")):
+            return
+
+
+async def async_iter_user_pages(client: "slack_sdk.web.async_client.AsyncWebClient"):
+    """
+    async version of `iter_user_pages`
+    """
+    cursor = None
+    while True:
+        response = await client.users_list(limit=PAGE_SIZE, cursor=cursor)
+        yield response.get("members", [])
+        if not (cursor := response.get("response_metadata", {}).get("next_cursor")):
+            return
+
+
+# {team_id: UserIndex}
+_indexes: Dict[Optional[str], UserIndex] = {}
+_indexes_lock = threading.Lock()
+_refreshing: set = set()
+# {team_id: lock} held while the first index of the team is built, other teams aren't blocked
+_build_locks: Dict[Optional[str], threading.Lock] = {}
+# {team_id: task} building the first index of the team on the event loop
+_builds: Dict[Optional[str], "asyncio.Task[UserIndex]"] = {}
+
+
+def _get_build_lock(team_id: Optional[str]) -> threading.Lock:
+    with _indexes_lock:
+        return _build_locks.setdefault(team_id, threading.Lock())
+
+
+def _refresh(client: slack_sdk.web.client.WebClient, team_id: Optional[str]) -> None:
+    try:
+        _indexes[team_id] = _build_index(iter_user_pages(client))
+    except Exception as e:
+        logger.warning(f"Failed to refresh the users of {team_id}, serving the last index: {e}")
+    finally:
+        _refreshing.discard(team_id)
+
+
+def _is_stale(index: UserIndex, team_id: Optional[str]) -> bool:
+    """
+    check if the index should be refreshed, and mark it as refreshing
+    """
+    if time.monotonic() - index.fetched_at < USERS_TTL:
+        return False
+    with _indexes_lock:
+        if team_id in _refreshing:
+            return False
+        _refreshing.add(team_id)
+    return True
+
+
+def get_user_index(client: slack_sdk.web.client.WebClient, team_id: Optional[str]) -> UserIndex:
+    """
+    get the user index of the team, preloaded from users.list on the first call
+
+    Args:
+        client (slack_sdk.web.client.WebClient): client of slack api
+        team_id (str): team id of the client
+
+    Returns:
+        (UserIndex): flags of the users, served stale while refreshing in the background
+    """
+    index = _indexes.get(team_id)
+    metrics.cache_lookup("users.list", index is not None)
+    if index is None:
+        with _get_build_lock(team_id):
+            if (index := _indexes.get(team_id)) is None:
+                index = _indexes[team_id] = _build_index(iter_user_pages(client))
+    elif _is_stale(index, team_id):
+        threading.Thread(target=_refresh, args=(client, team_id), daemon=True).start()
+    return index
+
+
+async def async_get_user_index(client: "slack_sdk.web.async_client.AsyncWebClient", team_id: Optional[str]) -> UserIndex:
+    """
+    async version of `get_user_index`, shares the index with it
+    """
+
+    async def build() -> UserIndex:
+        return _build_index([page async for page in async_iter_user_pages(client)])
+
+    async def refresh() -> None:
+        try:
+            _indexes[team_id] = await build()
+        except Exception as e:
+            logger.warning(f"Failed to refresh the users of {team_id}, serving the last index: {e}")
+        finally:
+            _refreshing.discard(team_id)
+
+    index = _indexes.get(team_id)
+    metrics.cache_lookup("users.list", index is not None)
+    if index is None:
+        # concurrent cold requests of the team wait for the same users.list scan
+        if (task := _builds.get(team_id)) is None:
+            task = _builds[team_id] = asyncio.ensure_future(build())
+            task.add_done_callback(lambda _: _builds.pop(team_id, None))
+        index = await asyncio.shield(task)
+        _indexes.setdefault(team_id, index)
+    elif _is_stale(index, team_id):
+        asyncio.ensure_future(refresh())
+    return index
+
+
+def _add_user(team_id: Optional[str], user_id: str, user_flags: UserFlag) -> None:
+    with _indexes_lock:
+        if (index := _indexes.get(team_id)) is not None:
+            index.flags[user_id] = int(user_flags)
+            if user_flags & (UserFlag.BOT | UserFlag.DELETED):
+                _indexes[team_id] = index._replace(excluded=index.excluded | {user_id})
+
+
+def get_user_flags(client: slack_sdk.web.client.WebClient, team_id: Optional[str], user_id: str) -> UserFlag:
+    """
+    get the flags of the user from the index, or users.info if the user is not in it
+
+    Args:
+        client (slack_sdk.web.client.WebClient): client of slack api
+        team_id (str): team id of the user
+        user_id (str): user id
+
+    Returns:
+        (UserFlag): flags of the user
+    """
+    index = get_user_index(client, team_id)
+    if (user_flags := index.flags.get(user_id)) is not None:
+        return UserFlag(user_flags)
+    user_flags = get_flags(lookup(client, team_id, "users.info", user=user_id).get("user", {}))
+    _add_user(team_id, user_id, user_flags)
+    return user_flags
+
+
+async def async_get_user_flags(client: "slack_sdk.web.async_client.AsyncWebClient", team_id: Optional[str], user_id: str) -> UserFlag:
+    """
+    async version of `get_user_flags`
+    """
+    index = await async_get_user_index(client, team_id)
+    if (user_flags := index.flags.get(user_id)) is not None:
+        return UserFlag(user_flags)
+    user_flags = get_flags((await async_lookup(client, team_id, "users.info", user=user_id)).get("user", {}))
+    _add_user(team_id, user_id, user_flags)
+    return user_flags
+
+
+def get_excluded_users(client: slack_sdk.web.client.WebClient, team_id: Optional[str], user_ids: Iterable[str] = ()) -> FrozenSet[str]:
+    """
+    get the bots and the deactivated users of the team
+
+    Args:
+        client (slack_sdk.web.client.WebClient): client of slack api
+        team_id (str): team id of the users
+        user_ids (iterable): users to check, those missing from the index are looked up with users.info
+
+    Returns:
+        (frozenset): excluded user ids of the index and of `user_ids`
+    """
+    index = get_user_index(client, team_id)
+    missing = [user_id for user_id in user_ids if user_id not in index.flags]
+    excluded = {user_id for user_id in missing if get_user_flags(client, team_id, user_id) & (UserFlag.BOT | UserFlag.DELETED)}
+    return index.excluded | excluded
+
+
+async def async_get_excluded_users(
+    client: "slack_sdk.web.async_client.AsyncWebClient", team_id: Optional[str], user_ids: Iterable[str] = ()
+) -> FrozenSet[str]:
+    """
+    async version of `get_excluded_users`
+    """
+    index = await async_get_user_index(client, team_id)
+    missing = [user_id for user_id in user_ids if user_id not in index.flags]
+    flags = await asyncio.gather(*(async_get_user_flags(client, team_id, user_id) for user_id in missing))
+    return index.excluded | {user_id for user_id, user_flags in zip(missing, flags) if user_flags & (UserFlag.BOT | UserFlag.DELETED)}
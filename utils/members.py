@@ -0,0 +1,196 @@
+import os
+import random
+import threading
+import time
+from typing import AbstractSet, AsyncIterator, Awaitable, Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+import slack_sdk
+from utils import metrics
+from utils.sampling import Reservoir
+
+# seconds to serve the members of a channel from the cache
+MEMBERS_TTL = float(os.environ.get("MEMBERS_CACHE_TTL", 300))
+# page size of conversations.members (max 1000)
+PAGE_SIZE = 1000
+
+# {(team_id, channel_id): (fetched_at, members)}
+_cache: Dict[Tuple[str, str], Tuple[float, FrozenSet[str]]] = {}
+_cache_lock = threading.Lock()
+
+
+def iter_member_pages(client: slack_sdk.web.client.WebClient, channel_id: str) -> Iterator[List[str]]:
+    """
+    iterate over the pages of the channel members following the cursor
+
+    Args:
+        client (slack_sdk.web.client.WebClient): client of slack api
+        channel_id (str): channel id to get members
+
+    Returns:
+        (iterator): pages of member ids
+    """
+    cursor = None
+    while True:
+        response = client.conversations_members(channel=channel_id, limit=PAGE_SIZE, cursor=cursor)
+        yield response.get("members", [])
+        if not (cursor := response.get("response_metadata", {}).get("next_cursor")):
+            return
+
+
+def _lookup(key: Tuple[str, str]) -> Optional[FrozenSet[str]]:
+    """
+    get the cached members of the channel if they are fresh
+    """
+    entry = _cache.get(key)
+    hit = bool(entry and time.monotonic() - entry[0] < MEMBERS_TTL)
+    metrics.cache_lookup("members", hit)
+    return entry[1] if hit else None
+
+
+def _store(key: Tuple[str, str], fetched_at: float, members: FrozenSet[str]) -> None:
+    """
+    cache the members of the channel fetched at the time
+    """
+    with _cache_lock:
+        # keep the entry if it has been refreshed meanwhile
+        if (entry := _cache.get(key)) is None or entry[0] < fetched_at:
+            _cache[key] = (fetched_at, members)
+
+
+def _sample_cached(members: FrozenSet[str], k: int, excluded: AbstractSet[str]) -> List[str]:
+    population = [user for user in members if user not in excluded]
+    return random.sample(population, min(k, len(population)))
+
+
+def get_members(client: slack_sdk.web.client.WebClient, team_id: str, channel_id: str) -> FrozenSet[str]:
+    """
+    get all members of the channel, served from the cache for MEMBERS_TTL seconds
+
+    Args:
+        client (slack_sdk.web.client.WebClient): client of slack api
+        team_id (str): team id of the channel
+        channel_id (str): channel id to get members
+
+    Returns:
+        (frozenset): member ids of the channel
+    """
+    key = (team_id, channel_id)
+    if (members := _lookup(key)) is not None:
+        return members
+
+    fetched_at = time.monotonic()
+    members = frozenset(user for page in iter_member_pages(client, channel_id) for user in page)
+    _store(key, fetched_at, members)
+    return members
+
+
+def sample_members(
+    client: slack_sdk.web.client.WebClient,
+    team_id: str,
+    channel_id: str,
+    k: int,
+    exclude: Callable[[List[str]], AbstractSet[str]] = lambda users: frozenset(),
+) -> List[str]:
+    """
+    choose k members of the channel at random without replacement
+
+    - cached: sampled from the cached members
+    - otherwise: the pages are streamed through a reservoir in one pass, which also fills the cache for the
+      next calls (and `/shuffle`)
+
+    Args:
+        client (slack_sdk.web.client.WebClient): client of slack api
+        team_id (str): team id of the channel
+        channel_id (str): channel id to choose members
+        k (int): number of members to choose (all of them if the channel has fewer)
+        exclude (callable): gets the member ids never chosen among the given ones (e.g. bots)
+
+    Returns:
+        (list): chosen member ids in random order
+    """
+    key = (team_id, channel_id)
+    if (members := _lookup(key)) is not None:
+        return _sample_cached(members, k, exclude(list(members)))
+
+    fetched_at = time.monotonic()
+    fetched: List[str] = []
+    reservoir: Reservoir[str] = Reservoir(k)
+    for page in iter_member_pages(client, channel_id):
+        fetched.extend(page)
+        excluded = exclude(page)
+        reservoir.extend([user for user in page if user not in excluded])
+    _store(key, fetched_at, frozenset(fetched))
+    return reservoir.sample()
+
+
+async def async_iter_member_pages(client: "slack_sdk.web.async_client.AsyncWebClient", channel_id: str) -> AsyncIterator[List[str]]:
+    """
+    async version of `iter_member_pages`
+    """
+    cursor = None
+    while True:
+        response = await client.conversations_members(channel=channel_id, limit=PAGE_SIZE, cursor=cursor)
+        yield response.get("members", [])
+        if not (cursor := response.get("response_metadata", {}).get("next_cursor")):
+            return
+
+
+async def async_get_members(client: "slack_sdk.web.async_client.AsyncWebClient", team_id: str, channel_id: str) -> FrozenSet[str]:
+    """
+    async version of `get_members`, shares the cache with it
+    """
+    key = (team_id, channel_id)
+    if (members := _lookup(key)) is not None:
+        return members
+
+    fetched_at = time.monotonic()
+    members = frozenset([user async for page in async_iter_member_pages(client, channel_id) for user in page])
+    _store(key, fetched_at, members)
+    return members
+
+
+async def _exclude_none(users: List[str]) -> AbstractSet[str]:
+    return frozenset()
+
+
+async def async_sample_members(
+    client: "slack_sdk.web.async_client.AsyncWebClient",
+    team_id: str,
+    channel_id: str,
+    k: int,
+    exclude: Callable[[List[str]], Awaitable[AbstractSet[str]]] = _exclude_none,
+) -> List[str]:
+    """
+    async version of `sample_members`
+    """
+    key = (team_id, channel_id)
+    if (members := _lookup(key)) is not None:
+        return _sample_cached(members, k, await exclude(list(members)))
+
+    fetched_at = time.monotonic()
+    fetched: List[str] = []
+    reservoir: Reservoir[str] = Reservoir(k)
+    async for page in async_iter_member_pages(client, channel_id):
+        fetched.extend(page)
+        excluded = await exclude(page)
+        reservoir.extend([user for user in page if user not in excluded])
+    _store(key, fetched_at, frozenset(fetched))
+    return reservoir.sample()
+
+
+def add_member(team_id: str, channel_id: str, user_id: str) -> None:
+    """
+    add the member to the cached channel (on `member_joined_channel`)
+    """
+    with _cache_lock:
+        if entry := _cache.get((team_id, channel_id)):
+            _cache[(team_id, channel_id)] = (entry[0], entry[1] | {user_id})
+
+
+def remove_member(team_id: str, channel_id: str, user_id: str) -> None:
+    """
+    remove the member from the cached channel (on `member_left_channel`)
+    """
+    with _cache_lock:
+        if entry := _cache.get((team_id, channel_id)):
+            _cache[(team_id, channel_id)] = (entry[0], entry[1] - {user_id})
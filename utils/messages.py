@@ -0,0 +1,210 @@
+"""Local index of the messages sent by the bot
+
+Every message posted by `say` (and by the `/send` workers) is recorded as
+(team, channel, ts, event_type, author) in SQLite (MESSAGES_DB_PATH), so the
+messages can be found again without reading the channel history, e.g. to be
+deleted in bulk by `/echo purge`. The author is the user who triggered the
+message, also for the anonymous ones.
+
+`index_messages` is a global middleware replacing `say` with `IndexedSay`,
+register it after `utils.ratelimit.rate_limit` (which replaces the client).
+"""
+import functools
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from slack_bolt.context.say import Say
+from slack_bolt.request import BoltRequest
+from slack_bolt.response import BoltResponse
+from slack_sdk import WebClient
+from utils.store import Store
+
+if TYPE_CHECKING:
+    # the async stack pulls in aiohttp, keep it out of the sync cold start
+    from slack_bolt.request.async_request import AsyncBoltRequest
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = os.environ.get("MESSAGES_DB_PATH", os.path.join(tempfile.gettempdir(), "echo-messages.sqlite3"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    team_id TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    event_type TEXT,
+    author TEXT,
+    PRIMARY KEY (team_id, channel_id, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS messages_author ON messages (team_id, author, ts);
+"""
+
+
+class Message(NamedTuple):
+    team_id: str
+    channel_id: str
+    ts: str
+    event_type: Optional[str]  # event_type of the metadata (echo, send, rand, meet)
+    author: Optional[str]  # user who triggered the message
+
+
+class MessageIndex(Store):
+    """
+    messages of the bot stored in SQLite
+    """
+
+    SCHEMA = SCHEMA
+
+    def add(self, message: Message) -> None:
+        with self.transaction() as db:
+            db.execute("INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?)", message)
+
+    def remove(self, team_id: str, messages: Iterable[Tuple[str, str]]) -> int:
+        """
+        remove the messages [(channel_id, ts)] of the team
+
+        Returns:
+            (int): number of removed messages
+        """
+        with self.transaction() as db:
+            before = db.total_changes
+            db.executemany("DELETE FROM messages WHERE team_id = ? AND channel_id = ? AND ts = ?", ((team_id, *m) for m in messages))
+            return db.total_changes - before
+
+    def find(
+        self,
+        team_id: str,
+        channels: Iterable[str] = (),
+        authors: Iterable[str] = (),
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 1000,
+    ) -> List[Message]:
+        """
+        find the messages of the team, newest first
+
+        Args:
+            team_id (str): team id
+            channels (iterable): channel ids (all channels if empty)
+            authors (iterable): user ids of the authors (all authors if empty)
+            since (float): unix time of the oldest message
+            until (float): unix time of the newest message
+            limit (int): max number of messages
+
+        Returns:
+            (list): messages
+        """
+        where, args = ["team_id = ?"], [team_id]
+        for column, values in (("channel_id", list(channels)), ("author", list(authors))):
+            if values:
+                where.append(f"{column} IN ({', '.join('?' * len(values))})")
+                args += values
+        # ts is `{seconds}.{microseconds}`, cast it to compare with the time
+        if since is not None:
+            where.append("CAST(ts AS REAL) >= ?")
+            args.append(since)
+        if until is not None:
+            where.append("CAST(ts AS REAL) <= ?")
+            args.append(until)
+        rows = self.connect().execute(
+            f"SELECT * FROM messages WHERE {' AND '.join(where)} ORDER BY CAST(ts AS REAL) DESC LIMIT ?", (*args, limit)
+        )
+        return [Message(*row) for row in rows]
+
+
+_index: Optional[MessageIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> MessageIndex:
+    """
+    get the message index of the process, opened on the first call
+    """
+    global _index
+
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = MessageIndex(DB_PATH)
+    return _index
+
+
+def record(response: Any, team_id: Optional[str], author: Optional[str], metadata: Optional[Dict[str, Any]] = None) -> None:
+    """
+    record the message posted by chat.postMessage, never raises
+
+    Args:
+        response (SlackResponse): response of chat.postMessage
+        team_id (str): team id of the client
+        author (str): user who triggered the message
+        metadata (dict): metadata of the message
+    """
+    try:
+        if not (team_id and response.get("ok") and (ts := response.get("ts"))):
+            return
+        event_type = (metadata or response.get("message", {}).get("metadata") or {}).get("event_type")
+        get_index().add(Message(team_id, response.get("channel"), ts, event_type, author))
+    except (sqlite3.Error, AttributeError) as e:
+        logger.warning(f"Failed to index the message: {e}")
+
+
+class IndexedSay(Say):
+    """
+    `say` recording the sent messages in the index
+    """
+
+    def __init__(self, client: WebClient, channel: Optional[str], team_id: Optional[str], author: Optional[str]):
+        super().__init__(client=client, channel=channel)
+        self.team_id = team_id
+        self.author = author
+
+    def __call__(self, *args, **kwargs):
+        response = super().__call__(*args, **kwargs)
+        metadata = kwargs.get("metadata")
+        record(response, self.team_id, self.author, metadata if isinstance(metadata, dict) else None)
+        return response
+
+
+def index_messages(req: BoltRequest, resp: BoltResponse, next: Callable[[], BoltResponse]) -> BoltResponse:
+    """
+    global middleware recording the messages sent by `say` in the index
+    """
+    # built from the current client, like Bolt's `say` (see `utils.ratelimit.rate_limit`)
+    req.context["say"] = IndexedSay(req.context.client, req.context.channel_id, req.context.team_id, req.context.user_id)
+    return next()
+
+
+@functools.lru_cache(maxsize=None)
+def get_async_say_class() -> type:
+    """
+    get the async version of `IndexedSay` (defined lazily, the async stack imports aiohttp)
+    """
+    import asyncio
+
+    from slack_bolt.context.say.async_say import AsyncSay
+
+    class AsyncIndexedSay(AsyncSay):
+        def __init__(self, client, channel: Optional[str], team_id: Optional[str], author: Optional[str]):
+            super().__init__(client=client, channel=channel)
+            self.team_id = team_id
+            self.author = author
+
+        async def __call__(self, *args, **kwargs):
+            response = await super().__call__(*args, **kwargs)
+            metadata = kwargs.get("metadata")
+            await asyncio.to_thread(record, response, self.team_id, self.author, metadata if isinstance(metadata, dict) else None)
+            return response
+
+    return AsyncIndexedSay
+
+
+async def async_index_messages(req: "AsyncBoltRequest", resp: BoltResponse, next: Callable[[], Awaitable[BoltResponse]]) -> BoltResponse:
+    """
+    async version of `index_messages`
+    """
+    req.context["say"] = get_async_say_class()(req.context.client, req.context.channel_id, req.context.team_id, req.context.user_id)
+    return await next()
@@ -0,0 +1,327 @@
+"""Per-listener metrics
+
+`instrument(app)` registers the global middleware `record_metrics` and records
+the latency of every request and of its ack() by listener (`/echo`, `/send`,
+`save_edit`, ...). The clients of `utils.ratelimit` record the outbound Slack
+API calls by method, and the caches (config, installations, channel members,
+clients) record their hits and misses, and `utils.jobs` the attempts of the queued deliveries.
+
+- dev server: `render()` in the Prometheus text format, served on `/metrics` by `main.py`
+- Cloud Function: `dump_if_due()` writes `snapshot()` to the structured logs every METRICS_DUMP_INTERVAL seconds
+"""
+import bisect
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, TextIO, Tuple
+
+from slack_bolt.context.ack import Ack
+from slack_bolt.request import BoltRequest
+from slack_bolt.response import BoltResponse
+
+if TYPE_CHECKING:
+    # the async stack pulls in aiohttp, keep it out of the sync cold start
+    from slack_bolt import App
+    from slack_bolt.async_app import AsyncApp
+    from slack_bolt.request.async_request import AsyncBoltRequest
+
+# upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# seconds between two dumps to the structured logs (0 to disable)
+DUMP_INTERVAL = float(os.environ.get("METRICS_DUMP_INTERVAL", 60))
+
+# {name: (kind, description)}
+METRICS = {
+    "echo_request_duration_seconds": ("histogram", "Latency of the requests by listener (lazy: invocation running a lazy listener)"),
+    "echo_ack_duration_seconds": ("histogram", "Latency from the request to ack() by listener"),
+    "echo_slack_api_duration_seconds": ("histogram", "Latency of the Slack Web API calls by method and result"),
+    "echo_cache_requests_total": ("counter", "Lookups of the caches by result (hit|miss)"),
+    "echo_jobs_total": ("counter", "Attempts of the queued jobs by kind and result (done|retried|failed)"),
+    "echo_retries_dropped_total": ("counter", "Retries of Slack dropped as duplicates by listener"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    latency histogram with fixed buckets (`BUCKETS`)
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        counts, total = [], 0
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+
+# {name: {labels: Histogram or count}}
+_metrics: Dict[str, Dict[Labels, Any]] = {name: {} for name in METRICS}
+_lock = threading.Lock()
+_dumped_at = time.monotonic()
+
+
+def observe(name: str, seconds: float, **labels: str) -> None:
+    """
+    record the latency in the histogram of the labels
+    """
+    key = tuple(sorted(labels.items()))
+    with _lock:
+        if (histogram := _metrics[name].get(key)) is None:
+            histogram = _metrics[name][key] = Histogram()
+        histogram.observe(seconds)
+
+
+def inc(name: str, amount: float = 1, **labels: str) -> None:
+    """
+    increase the counter of the labels
+    """
+    key = tuple(sorted(labels.items()))
+    with _lock:
+        _metrics[name][key] = _metrics[name].get(key, 0) + amount
+
+
+def cache_lookup(cache: str, hit: bool) -> None:
+    """
+    record a lookup of the cache
+    """
+    inc("echo_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def get_hit_ratios() -> Dict[str, float]:
+    """
+    get the hit ratio of each cache
+
+    Returns:
+        (dict): {cache: hits / lookups}
+    """
+    lookups: Dict[str, List[float]] = {}
+    with _lock:
+        for labels, count in _metrics["echo_cache_requests_total"].items():
+            label = dict(labels)
+            hits_and_total = lookups.setdefault(label["cache"], [0, 0])
+            hits_and_total[0] += count if label["result"] == "hit" else 0
+            hits_and_total[1] += count
+    return {cache: hits / total for cache, (hits, total) in lookups.items() if total}
+
+
+def get_listener(body: Dict[str, Any]) -> str:
+    """
+    get the name of the listener of the request
+
+    Args:
+        body (dict): body of the request
+
+    Returns:
+        (str): command (`/echo`), action_id, callback_id or event type
+    """
+    if command := body.get("command"):
+        return command
+    if actions := body.get("actions"):
+        return actions[0].get("action_id", "")
+    if callback_id := body.get("callback_id"):
+        return callback_id
+    if event := body.get("event"):
+        return event.get("type", "")
+    return body.get("type", "")
+
+
+class TimedAck(Ack):
+    """
+    ack() recording the latency from the start of the request
+    """
+
+    def __init__(self, listener: str, started_at: float):
+        super().__init__()
+        self.listener = listener
+        self.started_at = started_at
+
+    def __call__(self, *args, **kwargs) -> BoltResponse:
+        response = super().__call__(*args, **kwargs)
+        observe("echo_ack_duration_seconds", time.perf_counter() - self.started_at, listener=self.listener)
+        return response
+
+
+def record_metrics(req: BoltRequest, resp: BoltResponse, next: Callable[[], BoltResponse]) -> BoltResponse:
+    """
+    global middleware timing the ack() of the listener
+    """
+    started_at = req.context.get("metrics_started_at") or time.perf_counter()
+    req.context["ack"] = TimedAck(get_listener(req.body), started_at)
+    return next()
+
+
+def instrument(app: "App") -> "App":
+    """
+    register `record_metrics` and time the whole request
+
+    Bolt runs the listeners after the middleware has returned, so the latency
+    of the request is recorded around `app.dispatch` (ack and lazy listeners included).
+    Call it before registering the other middleware to time them too.
+    """
+    dispatch = app.dispatch
+
+    def timed_dispatch(req: BoltRequest) -> BoltResponse:
+        # before dispatch: the listeners get the body itself, and `get_values` pops the command from it
+        listener = get_listener(req.body)
+        req.context["metrics_started_at"] = started_at = time.perf_counter()
+        try:
+            return dispatch(req)
+        finally:
+            lazy = "true" if req.lazy_only else "false"
+            observe("echo_request_duration_seconds", time.perf_counter() - started_at, listener=listener, lazy=lazy)
+
+    app.dispatch = timed_dispatch  # type: ignore[method-assign]
+    app.middleware(record_metrics)
+    return app
+
+
+@functools.lru_cache(maxsize=None)
+def get_async_ack_class() -> type:
+    """
+    get the async version of `TimedAck` (defined lazily, the async stack imports aiohttp)
+    """
+    from slack_bolt.context.ack.async_ack import AsyncAck
+
+    class TimedAsyncAck(AsyncAck):
+        def __init__(self, listener: str, started_at: float):
+            super().__init__()
+            self.listener = listener
+            self.started_at = started_at
+
+        async def __call__(self, *args, **kwargs) -> BoltResponse:
+            response = await super().__call__(*args, **kwargs)
+            observe("echo_ack_duration_seconds", time.perf_counter() - self.started_at, listener=self.listener)
+            return response
+
+    return TimedAsyncAck
+
+
+async def async_record_metrics(req: "AsyncBoltRequest", resp: BoltResponse, next: Callable[[], Awaitable[BoltResponse]]) -> BoltResponse:
+    """
+    async version of `record_metrics`
+    """
+    started_at = req.context.get("metrics_started_at") or time.perf_counter()
+    req.context["ack"] = get_async_ack_class()(get_listener(req.body), started_at)
+    return await next()
+
+
+def async_instrument(app: "AsyncApp") -> "AsyncApp":
+    """
+    async version of `instrument`
+    """
+    dispatch = app.async_dispatch
+
+    async def timed_dispatch(req: "AsyncBoltRequest") -> BoltResponse:
+        listener = get_listener(req.body)
+        req.context["metrics_started_at"] = started_at = time.perf_counter()
+        try:
+            return await dispatch(req)
+        finally:
+            observe("echo_request_duration_seconds", time.perf_counter() - started_at, listener=listener, lazy="false")
+
+    app.async_dispatch = timed_dispatch  # type: ignore[method-assign]
+    app.middleware(async_record_metrics)
+    return app
+
+
+def _format_labels(labels: Labels, **extra: str) -> str:
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def render() -> str:
+    """
+    get the metrics in the Prometheus text format
+
+    Returns:
+        (str): metrics, with the cache hit ratios and the rate limiter waits
+    """
+    from utils.ratelimit import get_metrics
+
+    lines = []
+    with _lock:
+        for name, (kind, description) in METRICS.items():
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+            for labels, value in sorted(_metrics[name].items()):
+                if kind == "counter":
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+                    continue
+                for le, count in zip((*BUCKETS, "+Inf"), value.cumulative()):
+                    lines.append(f"{name}_bucket{_format_labels(labels, le=str(le))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {value.sum:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value.count}")
+
+    lines += ["# HELP echo_cache_hit_ratio Hits over lookups of the caches", "# TYPE echo_cache_hit_ratio gauge"]
+    lines += [f'echo_cache_hit_ratio{{cache="{cache}"}} {ratio:.4f}' for cache, ratio in sorted(get_hit_ratios().items())]
+
+    waits = get_metrics()
+    lines += ["# HELP echo_rate_limit_wait_seconds_total Time waited for the rate limiter by method", "# TYPE echo_rate_limit_wait_seconds_total counter"]
+    lines += [f'echo_rate_limit_wait_seconds_total{{team_id="{team}",method="{method}"}} {m["wait_seconds"]:.6f}' for (team, method), m in sorted(waits.items())]
+    lines += ["# HELP echo_rate_limited_total Rate limited (429) responses by method", "# TYPE echo_rate_limited_total counter"]
+    lines += [f'echo_rate_limited_total{{team_id="{team}",method="{method}"}} {m["rate_limited"]:g}' for (team, method), m in sorted(waits.items())]
+    return "\n".join(lines) + "\n"
+
+
+def snapshot() -> Dict[str, Any]:
+    """
+    get a summary of the metrics for the structured logs
+
+    Returns:
+        (dict): {histogram name: [{labels, count, sum, mean}], "cache_hit_ratio": {cache: ratio}}
+    """
+    summary: Dict[str, Any] = {}
+    with _lock:
+        for name, (kind, _) in METRICS.items():
+            if kind != "histogram":
+                continue
+            summary[name] = [
+                {**dict(labels), "count": h.count, "sum": round(h.sum, 6), "mean": round(h.sum / h.count, 6)}
+                for labels, h in sorted(_metrics[name].items())
+            ]
+    summary["cache_hit_ratio"] = get_hit_ratios()
+    return summary
+
+
+def dump(stream: Optional[TextIO] = None) -> None:
+    """
+    write the snapshot as a structured log entry (a JSON line, parsed by Cloud Logging)
+    """
+    entry = {"severity": "INFO", "message": "metrics", "metrics": snapshot()}
+    (stream or sys.stdout).write(json.dumps(entry) + "\n")
+
+
+def dump_if_due(stream: Optional[TextIO] = None) -> bool:
+    """
+    dump the snapshot if DUMP_INTERVAL seconds have passed since the last dump
+
+    Returns:
+        (bool): True if dumped
+    """
+    global _dumped_at
+
+    if not DUMP_INTERVAL or time.monotonic() - _dumped_at < DUMP_INTERVAL:
+        return False
+    with _lock:
+        if time.monotonic() - _dumped_at < DUMP_INTERVAL:
+            return False
+        _dumped_at = time.monotonic()
+    dump(stream)
+    return True
@@ -7,55 +7,80 @@ To learn more about Block Kit, please check the following resources and tools:
 * https://api.slack.com/block-kit
 * https://api.slack.com/reference/block-kit/blocks
 * https://app.slack.com/block-kit-builder
+
+The aliases are resolved lazily (PEP 562): `slack_sdk.models` is imported on
+the first attribute access instead of at import time.
 """
 
-# basic_components
-from slack_sdk.models.blocks import ConfirmObject as confirm  # noqa
-from slack_sdk.models.blocks import Option as option # noqa
-from slack_sdk.models.blocks import OptionGroup as option_groups # noqa
-from slack_sdk.models.blocks import TextObject as text # noqa
-from slack_sdk.models.blocks import PlainTextObject as plain_text  # noqa
-from slack_sdk.models.blocks import MarkdownTextObject as mrkdwn  # noqa
-from slack_sdk.models.blocks.basic_components import DispatchActionConfig as dispatch_action_config  # noqa
-from slack_sdk.models.blocks import ConversationFilter as filter # noqa
-
-# block_elements
-from slack_sdk.models.blocks import ButtonElement as button  # noqa
-from slack_sdk.models.blocks import CheckboxesElement as checkboxes  # noqa
-from slack_sdk.models.blocks import DatePickerElement as datepicker  # noqa
-from slack_sdk.models.blocks import ImageElement as image # noqa
-from slack_sdk.models.blocks import StaticMultiSelectElement as multi_static_select # noqa
-from slack_sdk.models.blocks import ExternalDataMultiSelectElement as multi_external_select # noqa
-from slack_sdk.models.blocks import UserMultiSelectElement  as multi_users_select # noqa
-from slack_sdk.models.blocks import ConversationMultiSelectElement as multi_conversations_select # noqa
-from slack_sdk.models.blocks import ChannelMultiSelectElement as multi_channels_select # noqa
-from slack_sdk.models.blocks import OverflowMenuElement as overflow # noqa
-from slack_sdk.models.blocks import PlainTextInputElement as plain_text_input # noqa
-from slack_sdk.models.blocks import RadioButtonsElement as radio_buttons # noqa
-from slack_sdk.models.blocks import StaticSelectElement as static_select # noqa
-from slack_sdk.models.blocks import ExternalDataSelectElement as external_select # noqa
-from slack_sdk.models.blocks import UserSelectElement as users_select # noqa
-from slack_sdk.models.blocks import ConversationSelectElement as conversations_select # noqa
-from slack_sdk.models.blocks import ChannelSelectElement as channels_select # noqa
-from slack_sdk.models.blocks import TimePickerElement as timepicker # noqa
-
-# blocks
-from slack_sdk.models.blocks import ActionsBlock as Actions  # noqa
-from slack_sdk.models.blocks import CallBlock as Call  # noqa
-from slack_sdk.models.blocks import ContextBlock as Context  # noqa
-from slack_sdk.models.blocks import DividerBlock as Divider  # noqa
-from slack_sdk.models.blocks import FileBlock as File  # noqa
-from slack_sdk.models.blocks import HeaderBlock as Header  # noqa
-from slack_sdk.models.blocks import ImageBlock as Image  # noqa
-from slack_sdk.models.blocks import InputBlock as Input  # noqa
-from slack_sdk.models.blocks import SectionBlock as Section  # noqa
-
-# attachments
-from slack_sdk.models.attachments import BlockAttachment as block_attachment  # noqa
-from slack_sdk.models.attachments import InteractiveAttachment as interactive_attachment  # noqa
-
-# views
-from slack_sdk.models.views import View  # noqa
-
-# metadata
-from slack_sdk.models.metadata import Metadata as metadata  # noqa
+import importlib
+
+_BLOCKS = "slack_sdk.models.blocks"
+
+_ALIASES = {
+    # basic_components
+    "confirm": (_BLOCKS, "ConfirmObject"),
+    "option": (_BLOCKS, "Option"),
+    "option_groups": (_BLOCKS, "OptionGroup"),
+    "text": (_BLOCKS, "TextObject"),
+    "plain_text": (_BLOCKS, "PlainTextObject"),
+    "mrkdwn": (_BLOCKS, "MarkdownTextObject"),
+    "dispatch_action_config": ("slack_sdk.models.blocks.basic_components", "DispatchActionConfig"),
+    "filter": (_BLOCKS, "ConversationFilter"),
+
+    # block_elements
+    "button": (_BLOCKS, "ButtonElement"),
+    "checkboxes": (_BLOCKS, "CheckboxesElement"),
+    "datepicker": (_BLOCKS, "DatePickerElement"),
+    "image": (_BLOCKS, "ImageElement"),
+    "multi_static_select": (_BLOCKS, "StaticMultiSelectElement"),
+    "multi_external_select": (_BLOCKS, "ExternalDataMultiSelectElement"),
+    "multi_users_select": (_BLOCKS, "UserMultiSelectElement"),
+    "multi_conversations_select": (_BLOCKS, "ConversationMultiSelectElement"),
+    "multi_channels_select": (_BLOCKS, "ChannelMultiSelectElement"),
+    "overflow": (_BLOCKS, "OverflowMenuElement"),
+    "plain_text_input": (_BLOCKS, "PlainTextInputElement"),
+    "radio_buttons": (_BLOCKS, "RadioButtonsElement"),
+    "static_select": (_BLOCKS, "StaticSelectElement"),
+    "external_select": (_BLOCKS, "ExternalDataSelectElement"),
+    "users_select": (_BLOCKS, "UserSelectElement"),
+    "conversations_select": (_BLOCKS, "ConversationSelectElement"),
+    "channels_select": (_BLOCKS, "ChannelSelectElement"),
+    "timepicker": (_BLOCKS, "TimePickerElement"),
+
+    # blocks
+    "Actions": (_BLOCKS, "ActionsBlock"),
+    "Call": (_BLOCKS, "CallBlock"),
+    "Context": (_BLOCKS, "ContextBlock"),
+    "Divider": (_BLOCKS, "DividerBlock"),
+    "File": (_BLOCKS, "FileBlock"),
+    "Header": (_BLOCKS, "HeaderBlock"),
+    "Image": (_BLOCKS, "ImageBlock"),
+    "Input": (_BLOCKS, "InputBlock"),
+    "Section": (_BLOCKS, "SectionBlock"),
+
+    # attachments
+    "block_attachment": ("slack_sdk.models.attachments", "BlockAttachment"),
+    "interactive_attachment": ("slack_sdk.models.attachments", "InteractiveAttachment"),
+
+    # views
+    "View": ("slack_sdk.models.views", "View"),
+
+    # metadata
+    "metadata": ("slack_sdk.models.metadata", "Metadata"),
+}
+
+__all__ = list(_ALIASES)
+
+
+def __getattr__(name: str):
+    try:
+        module, attr = _ALIASES[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module), attr)
+    globals()[name] = value  # resolve once, later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_ALIASES))
@@ -0,0 +1,345 @@
+"""Client-side rate limiting of the Slack Web API
+
+Every call acquires a token from a bucket keyed by (team_id, method), seeded
+with the method's tier (https://api.slack.com/docs/rate-limits). Calls wait
+for a token instead of failing, and a 429 pauses the bucket for `Retry-After`
+seconds before the call is retried. The buckets are kept in an LRU (chat.postMessage
+has one per channel) and dropped once idle for BUCKET_TTL seconds, by then they are full again.
+"""
+import asyncio
+import functools
+import logging
+import ssl
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from slack_bolt.request import BoltRequest
+from slack_bolt.response import BoltResponse
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+from utils import metrics
+from utils.lookups import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# requests per minute of each tier
+TIERS = {1: 1, 2: 20, 3: 50, 4: 100}
+
+# tier of the methods used by the listeners (tier 3 for the others)
+METHOD_TIERS = {
+    "chat.delete": 3,
+    "chat.update": 3,
+    "conversations.info": 3,
+    "conversations.members": 4,
+    "conversations.open": 3,
+    "emoji.list": 2,
+    "files.getUploadURLExternal": 4,
+    "files.completeUploadExternal": 4,
+    "users.info": 4,
+    "users.list": 2,
+}
+
+# chat.postMessage is limited to about 1 message per second per channel, with short bursts
+CHANNEL_LIMITED_METHODS = {"chat.postMessage": (1.0, 5)}  # (tokens per second, burst)
+
+# number of retries after a rate limited (429) response
+MAX_RETRIES = 3
+# number of cached clients (one per bot token)
+MAX_CLIENTS = 256
+# number of token buckets, and seconds before an idle one is dropped (longer than a refill of any bucket)
+MAX_BUCKETS = 4096
+BUCKET_TTL = 600.0
+
+
+class BucketStats:
+    """
+    wait time metrics of the buckets of a (team_id, method), kept when the buckets are dropped
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.rate_limited = 0
+        self.lock = threading.Lock()
+
+    def record(self, wait: float) -> None:
+        with self.lock:
+            self.calls += 1
+            if wait > 0:
+                self.waits += 1
+                self.wait_seconds += wait
+
+    def record_rate_limited(self) -> None:
+        with self.lock:
+            self.rate_limited += 1
+
+
+class TokenBucket:
+    """
+    token bucket refilled at `rate` tokens per second, holding at most `capacity` tokens
+    """
+
+    def __init__(self, rate: float, capacity: float, stats: Optional[BucketStats] = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+        self.stats = stats or BucketStats()
+
+    def reserve(self) -> float:
+        """
+        take a token (possibly in advance)
+
+        Returns:
+            (float): seconds to wait before using the token
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            wait = max(0.0 if self.tokens >= 0 else -self.tokens / self.rate, self.paused_until - now)
+        self.stats.record(wait)
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        """
+        stop handing out tokens for the seconds (`Retry-After`)
+        """
+        self.stats.record_rate_limited()
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = min(self.tokens, 0)
+
+
+# {(team_id, method or method:channel): TokenBucket}
+_buckets = LRUCache(MAX_BUCKETS)
+_buckets_lock = threading.Lock()
+# {(team_id, method): BucketStats}
+_stats: Dict[Tuple[str, str], BucketStats] = {}
+
+
+def get_bucket(team_id: Optional[str], method: str, channel: Optional[str] = None) -> TokenBucket:
+    """
+    get the token bucket of the team and the method (and the channel for chat.postMessage)
+    """
+    if method in CHANNEL_LIMITED_METHODS:
+        key = (team_id or "", f"{method}:{channel or ''}")
+        rate, capacity = CHANNEL_LIMITED_METHODS[method]
+    else:
+        key = (team_id or "", method)
+        per_minute = TIERS[METHOD_TIERS.get(method, 3)]
+        rate, capacity = per_minute / 60, per_minute
+    with _buckets_lock:
+        if (bucket := _buckets.get(key)) is None:
+            stats = _stats.setdefault((key[0], method), BucketStats())
+            bucket = TokenBucket(rate, capacity, stats)
+        # the TTL is renewed by every call, only the idle buckets expire
+        _buckets.set(key, bucket, BUCKET_TTL)
+    return bucket
+
+
+def get_metrics() -> Dict[Tuple[str, str], Dict[str, float]]:
+    """
+    get the wait time metrics per (team_id, method)
+
+    Returns:
+        (dict): {(team_id, method): {"calls", "waits", "wait_seconds", "rate_limited"}}
+    """
+    return {
+        key: {"calls": stats.calls, "waits": stats.waits, "wait_seconds": stats.wait_seconds, "rate_limited": stats.rate_limited}
+        for key, stats in list(_stats.items())
+    }
+
+
+def _get_channel(kwargs: dict) -> Optional[str]:
+    for args in (kwargs.get("json"), kwargs.get("data"), kwargs.get("params")):
+        if isinstance(args, dict) and args.get("channel"):
+            return args["channel"]
+    return None
+
+
+def _retry_after(e: SlackApiError) -> Optional[float]:
+    if e.response.status_code != 429:
+        return None
+    return float(e.response.headers.get("Retry-After", 1))
+
+
+class RateLimitedWebClient(WebClient):
+    """
+    WebClient waiting for the token bucket of (team_id, method) before every call
+    """
+
+    def __init__(self, *args, rate_limit_team_id: Optional[str] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rate_limit_team_id = rate_limit_team_id
+
+    def __deepcopy__(self, memo):
+        # shared by the requests of the team (lazy listeners deep-copy the request)
+        return self
+
+    def api_call(self, api_method: str, **kwargs):  # type: ignore[override]
+        bucket = get_bucket(self.rate_limit_team_id, api_method, _get_channel(kwargs))
+        for attempt in range(MAX_RETRIES + 1):
+            if (wait := bucket.reserve()) > 0:
+                time.sleep(wait)
+            started_at, result = time.perf_counter(), "ok"
+            try:
+                return super().api_call(api_method, **kwargs)
+            except SlackApiError as e:
+                result = e.response.get("error") or "error"
+                if (retry_after := _retry_after(e)) is None or attempt == MAX_RETRIES:
+                    raise
+                logger.warning(f"{api_method} is rate limited, retrying after {retry_after} seconds")
+                bucket.pause(retry_after)
+            except Exception as e:
+                result = type(e).__name__
+                raise
+            finally:
+                metrics.observe("echo_slack_api_duration_seconds", time.perf_counter() - started_at, method=api_method, result=result)
+
+
+_ssl_context: Optional[ssl.SSLContext] = None
+
+# {(client class, token, team_id, *ids of the extra arguments): client}
+_clients: "OrderedDict[tuple, WebClient]" = OrderedDict()
+_clients_lock = threading.Lock()
+
+
+def get_ssl_context() -> ssl.SSLContext:
+    """
+    get the SSL context shared by the clients (the CA certificates are loaded once)
+    """
+    global _ssl_context
+
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context()
+    return _ssl_context
+
+
+def build_client(client: WebClient, team_id: Optional[str], cls: type = RateLimitedWebClient, **kwargs) -> WebClient:
+    """
+    copy the client of the request into a rate limited client
+    """
+    return cls(
+        **kwargs,
+        token=client.token,
+        base_url=client.base_url,
+        timeout=client.timeout,
+        ssl=client.ssl or get_ssl_context(),
+        proxy=client.proxy,
+        headers=dict(client.headers),
+        team_id=team_id,
+        logger=client.logger,
+        retry_handlers=client.retry_handlers,
+        rate_limit_team_id=team_id,
+    )
+
+
+def get_client(client: WebClient, team_id: Optional[str], cls: type = RateLimitedWebClient, **kwargs) -> WebClient:
+    """
+    get the rate limited client of the bot token, reused by the requests of the team
+
+    Args:
+        client (WebClient): client of the request (built by Bolt with the authorized token)
+        team_id (str): team id of the request
+        cls (type): class of the client
+        kwargs: extra arguments of the client (e.g. `session` of AsyncWebClient)
+
+    Returns:
+        (WebClient): cached client of (cls, token, team_id)
+    """
+    key = (cls, client.token, team_id, *map(id, kwargs.values()))
+    with _clients_lock:
+        if (cached := _clients.get(key)) is not None:
+            _clients.move_to_end(key)
+    metrics.cache_lookup("clients", cached is not None)
+    if cached is not None:
+        return cached
+    cached = build_client(client, team_id, cls, **kwargs)
+    with _clients_lock:
+        cached = _clients.setdefault(key, cached)
+        while len(_clients) > MAX_CLIENTS:
+            _clients.popitem(last=False)
+    return cached
+
+
+def rate_limit(req: BoltRequest, resp: BoltResponse, next: Callable[[], BoltResponse]) -> BoltResponse:
+    """
+    global middleware replacing the client of the request (and `say`) with a rate limited one
+    """
+    req.context["client"] = get_client(req.context.client, req.context.team_id)
+    # `say` is built from the previous client when the earlier middleware is called, rebuild it lazily
+    req.context.pop("say", None)
+    return next()
+
+
+@functools.lru_cache(maxsize=None)
+def get_async_client_class() -> type:
+    """
+    get the async version of `RateLimitedWebClient` (defined lazily, AsyncWebClient imports aiohttp)
+    """
+    from slack_sdk.web.async_client import AsyncWebClient
+
+    class AsyncRateLimitedWebClient(AsyncWebClient):
+        def __init__(self, *args, rate_limit_team_id: Optional[str] = None, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.rate_limit_team_id = rate_limit_team_id
+
+        def __deepcopy__(self, memo):
+            return self
+
+        async def api_call(self, api_method: str, **kwargs):  # type: ignore[override]
+            bucket = get_bucket(self.rate_limit_team_id, api_method, _get_channel(kwargs))
+            for attempt in range(MAX_RETRIES + 1):
+                if (wait := bucket.reserve()) > 0:
+                    await asyncio.sleep(wait)
+                started_at, result = time.perf_counter(), "ok"
+                try:
+                    return await super().api_call(api_method, **kwargs)
+                except SlackApiError as e:
+                    result = e.response.get("error") or "error"
+                    if (retry_after := _retry_after(e)) is None or attempt == MAX_RETRIES:
+                        raise
+                    logger.warning(f"{api_method} is rate limited, retrying after {retry_after} seconds")
+                    bucket.pause(retry_after)
+                except Exception as e:
+                    result = type(e).__name__
+                    raise
+                finally:
+                    metrics.observe("echo_slack_api_duration_seconds", time.perf_counter() - started_at, method=api_method, result=result)
+
+    return AsyncRateLimitedWebClient
+
+
+_aiohttp_session = None
+
+
+def get_aiohttp_session():
+    """
+    get the keep-alive aiohttp session shared by the async clients (call it in the event loop)
+    """
+    global _aiohttp_session
+
+    if _aiohttp_session is None or _aiohttp_session.closed:
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit=100, limit_per_host=32, ssl=get_ssl_context(), keepalive_timeout=30)
+        _aiohttp_session = aiohttp.ClientSession(connector=connector)
+    return _aiohttp_session
+
+
+async def async_rate_limit(req, resp: BoltResponse, next) -> BoltResponse:
+    """
+    async version of `rate_limit`
+    """
+    req.context["client"] = get_client(
+        req.context.client, req.context.team_id, get_async_client_class(), session=get_aiohttp_session()
+    )
+    req.context.pop("say", None)
+    return await next()
@@ -0,0 +1,73 @@
+"""Uniform sampling without replacement over a stream
+
+`Reservoir` keeps k items chosen uniformly at random from a stream of unknown
+length, fed page by page (Li's Algorithm L). Only the k items are kept, and
+the random skips make the cost grow with k * log(n / k) instead of n random
+draws, so it stays flat for long streams (e.g. the members of a large channel).
+"""
+import math
+import random
+from typing import Generic, Iterable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Reservoir(Generic[T]):
+    """
+    k items sampled uniformly without replacement from the items fed to `extend`
+
+        reservoir = Reservoir(3)
+        for page in pages:
+            reservoir.extend(page)
+        reservoir.sample()  # 3 items in random order (all of them if there are fewer)
+    """
+
+    def __init__(self, k: int, rng: Optional[random.Random] = None):
+        self.k = max(k, 0)
+        self.rng = rng if rng is not None else random.Random()
+        self.items: List[T] = []
+        self.w = 1.0
+        self.skip = 0  # items to skip before the next replacement
+
+    def _uniform(self) -> float:
+        # in (0, 1), log() of it is finite
+        while not (u := self.rng.random()):
+            pass
+        return u
+
+    def _advance(self) -> None:
+        self.w *= math.exp(math.log(self._uniform()) / self.k)
+        self.skip = math.floor(math.log(self._uniform()) / math.log1p(-self.w))
+
+    def extend(self, items: Iterable[T]) -> None:
+        """
+        feed the next items of the stream
+
+        Args:
+            items (iterable): next items (a page), kept in memory only while fed
+        """
+        if not self.k:
+            return
+        page = items if isinstance(items, list) else list(items)
+        i = 0
+        if len(self.items) < self.k:
+            i = self.k - len(self.items)
+            self.items.extend(page[:i])
+            if len(self.items) < self.k:
+                return
+            self._advance()
+
+        while i + self.skip < len(page):
+            i += self.skip
+            self.items[self.rng.randrange(self.k)] = page[i]
+            i += 1
+            self._advance()
+        self.skip -= len(page) - i
+
+    def sample(self) -> List[T]:
+        """
+        get the sampled items in random order
+        """
+        items = self.items[:]
+        self.rng.shuffle(items)
+        return items
@@ -0,0 +1,55 @@
+"""Local SQLite stores (WAL mode) shared by the threads of the process
+
+Each thread uses its own connection in autocommit mode, and the writes are
+grouped by `transaction()` (`BEGIN IMMEDIATE`, the write lock is taken up front
+so concurrent writers wait on `busy_timeout` instead of failing on upgrade).
+"""
+import sqlite3
+import threading
+
+
+class Store:
+    """
+    SQLite database with a connection per thread
+
+        class Notes(Store):
+            SCHEMA = "CREATE TABLE IF NOT EXISTS notes (id INTEGER PRIMARY KEY, text TEXT)"
+
+        with Notes(path).transaction() as db:
+            db.execute("INSERT INTO notes (text) VALUES (?)", ("hi",))
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()
+        self.connect().executescript(self.SCHEMA)
+
+    def connect(self) -> sqlite3.Connection:
+        if (db := getattr(self.local, "db", None)) is None:
+            # autocommit, the transactions are opened explicitly by `transaction`
+            db = self.local.db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA foreign_keys=ON")
+        return db
+
+    def transaction(self) -> "Transaction":
+        return Transaction(self.connect())
+
+
+class Transaction:
+    """
+    `BEGIN IMMEDIATE` ... `COMMIT`, or `ROLLBACK` on error
+    """
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
@@ -1,73 +1,121 @@
 import re
+from typing import List, NamedTuple, Optional
 
 
-def get_channels(text: str) -> list:
+class Token(NamedTuple):
+    """
+    entity found in the text
+
+    - kind (str): channel|user|emoji|url
+    - value (str): Cxxxxxxxxxx|Uxxxxxxxxxx|:emoji:|https://...
+    - start (int): start index of the entity in the text
+    - end (int): end index of the entity in the text
+    """
+
+    kind: str
+    value: str
+    start: int
+    end: int
+
+
+# Slack escapes mentions and links as <#C…|name>, <@U…|name> and <https://…|label>
+_TOKEN_RE = re.compile(
+    r"<(?:#(?P<channel>[CG][A-Z0-9]{8,})|@(?P<user>[UW][A-Z0-9]{8,})|(?P<url>https?://[^\s|>]+))(?:\|[^>]*)?>"
+    r"|(?P<emoji>:[^\s:<>]+:)"
+)
+
+
+def tokenize(text: str) -> List[Token]:
+    """
+    get all entities from the text in a single pass
+
+    Args:
+        text (str): the text to be parsed
+
+    Returns:
+        tokens (list): the list of entities in order of appearance
+    """
+    if not text:
+        return []
+    # tuple.__new__ skips the keyword handling of Token.__new__ (hot path on long messages)
+    return [
+        tuple.__new__(Token, (kind := match.lastgroup, match[kind], match.start(), match.end()))  # type: ignore
+        for match in _TOKEN_RE.finditer(text)
+    ]
+
+
+def cut(text: str, token: Token) -> str:
+    """
+    cut the entity and the following whitespaces out of the text
+
+    Args:
+        text (str): the text the token was found in
+        token (Token): the entity to cut
+
+    Returns:
+        (str): the text without the entity (unchanged if the entity isn't followed by whitespaces)
+    """
+    rest = text[token.end :]
+    if rest[:1].isspace():
+        return text[: token.start] + rest.lstrip()
+    return text
+
+
+def get_channels(text: str, tokens: Optional[List[Token]] = None) -> list:
     """
     get mentioned channels from the text
 
     Args:
         text (str): the text to be parsed
+        tokens (list): tokens of the text if already parsed
 
     Returns:
         channels (list): the list of mentioned channels
     """
-    # if the text is not empty, return the list of mentioned channels id from the text (if exist)
-    # else return an empty list
-    if text and (channels := re.findall(r"[C|G][A-Z0-9]{10}", text)):
-        return channels  # ['Cxxxxxxxxxx', ...]: list
-    else:
-        return []
+    tokens = tokenize(text) if tokens is None else tokens
+    return [t.value for t in tokens if t.kind == "channel"]  # ['Cxxxxxxxxxx', ...]: list
 
 
-def get_emojis(text: str) -> list:
+def get_emojis(text: str, tokens: Optional[List[Token]] = None) -> list:
     """
     get emojis from the text
 
     Args:
         text (str): the text to be parsed
+        tokens (list): tokens of the text if already parsed
 
     Returns:
         emojis (list): the list of emojis in text
     """
-    # if the text is not empty, return the list of emojis from the text (if exist)
-    # else return an empty list
-    if text and (emojis := re.findall(r":[^\s]+:", text)):
-        return emojis  # [':emoji:', ...]: list
-    else:
-        return []
+    tokens = tokenize(text) if tokens is None else tokens
+    return [t.value for t in tokens if t.kind == "emoji"]  # [':emoji:', ...]: list
 
 
-def get_urls(text: str) -> list:
+def get_urls(text: str, tokens: Optional[List[Token]] = None) -> list:
     """
     get urls from the text
 
     Args:
         text (str): the text to be parsed
+        tokens (list): tokens of the text if already parsed
 
     Returns:
         urls (list): the list of urls in text
     """
-    # if the text is not empty, return the list of urls from the text (if exist)
-    # else return an empty list
-    if text and (urls := re.findall(r"<https?://[^\s]+>", text)):
-        return urls  # ['<https://...>', ...]: list
-    else:
-        return []
+    tokens = tokenize(text) if tokens is None else tokens
+    return [text[t.start : t.end] for t in tokens if t.kind == "url"]  # ['<https://...>', ...]: list
 
 
-def get_users(text: str) -> list:
+def get_users(text: str, tokens: Optional[List[Token]] = None) -> list:
     """
     get mentioned users from the text
 
     Args:
         text (str): the text to be parsed
+        tokens (list): tokens of the text if already parsed
 
     Returns:
         users (list): the list of mentioned users
     """
-    # if the text is not empty, return the list of mentioned users id from the text (if exist)
-    # else return an empty list
-    if text and (users := re.findall(r"U[A-Z0-9]{10}", text)):
-        return users  # ['Uxxxxxxxxxx', ...]: list
-    else:
-        return []
+    tokens = tokenize(text) if tokens is None else tokens
+    return [t.value for t in tokens if t.kind == "user"]  # ['Uxxxxxxxxxx', ...]: list